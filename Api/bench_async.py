@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Side-by-side load test of the API in DB_MODE=sync and DB_MODE=async.
+
+Starts one uvicorn worker per mode against the configured MySQL database,
+drives it with a fixed number of concurrent clients and prints req/s and
+latency percentiles for each mode.
+
+Usage:
+    python bench_async.py --path /patients/ --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(base_url, path, concurrency, duration, json_body=None):
+    """Hammer base_url+path with concurrency clients for duration seconds (POST json_body if given)"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if json_body is None:
+                        response = await client.get(path)
+                    else:
+                        response = await client.post(path, json=json_body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def wait_until_ready(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/pool/stats", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+def benchmark_mode(mode, args):
+    env = dict(os.environ, DB_MODE=mode)
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    try:
+        wait_until_ready(base_url)
+        # Short warm-up so both modes start with a filled pool
+        asyncio.run(run_load(base_url, args.path, args.concurrency, 2))
+        return asyncio.run(run_load(base_url, args.path, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/patients/", help="Endpoint to request")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per mode")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the benchmark server")
+    parser.add_argument("--modes", default="sync,async", help="Comma-separated DB_MODE values")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"Benchmarking DB_MODE={mode} ...")
+        results[mode] = benchmark_mode(mode, args)
+
+    print(f"\nGET {args.path} with {args.concurrency} concurrent clients, {args.duration:.0f}s per mode")
+    print(f"{'mode':<8}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Per-patient lookup benchmark: foreign key index versus (patient_id, id DESC).
+
+Runs against a scratch database on the configured MySQL server (it is
+dropped and recreated, so never point this at real data):
+
+1. applies 0001_initial_schema only, so medical_tests and diagnosis carry
+   just the implicit foreign key index on patient_id
+2. fills patients, medical_tests and diagnosis with synthetic rows
+   (INSERT ... SELECT on the server, one transaction per million rows)
+3. times the per-patient queries behind the API endpoints
+4. applies the remaining migrations (0002 adds the composite indexes),
+   reports how long the index build took and times the queries again
+
+Before timing the indexed run, EXPLAIN must show that every query uses its
+composite index without a filesort; the script exits non-zero otherwise.
+
+Usage:
+    python bench_indexes.py --database liver_index_bench --rows 10000000 --patients 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import pymysql
+
+from schema_migrations import apply_migrations, discover_migrations
+
+# Query name: (SQL, index that must serve it once 0002 is applied)
+QUERIES = {
+    "latest test": (
+        "SELECT * FROM medical_tests WHERE patient_id = %s ORDER BY test_id DESC LIMIT 1",
+        "idx_medical_tests_patient_latest",
+    ),
+    "test history": (
+        "SELECT * FROM medical_tests WHERE patient_id = %s AND test_id < %s ORDER BY test_id DESC LIMIT 100",
+        "idx_medical_tests_patient_latest",
+    ),
+    "latest diagnosis": (
+        "SELECT * FROM diagnosis WHERE patient_id = %s ORDER BY diagnosis_id DESC LIMIT 1",
+        "idx_diagnosis_patient_latest",
+    ),
+    "diagnosis history": (
+        "SELECT * FROM diagnosis WHERE patient_id = %s AND diagnosis_id < %s ORDER BY diagnosis_id DESC LIMIT 100",
+        "idx_diagnosis_patient_latest",
+    ),
+}
+
+BLOCK = 1000000
+# 0 .. BLOCK - 1 from six cross-joined copies of the digits table
+SEQUENCE = (
+    "SELECT a.d + 10 * b.d + 100 * c.d + 1000 * e.d + 10000 * f.d + 100000 * g.d AS n "
+    "FROM bench_digits a CROSS JOIN bench_digits b CROSS JOIN bench_digits c "
+    "CROSS JOIN bench_digits e CROSS JOIN bench_digits f CROSS JOIN bench_digits g"
+)
+
+
+def connect_kwargs(database):
+    return {
+        "host": os.getenv("DATABASE_HOST", "localhost"),
+        "user": os.getenv("DATABASE_USER", "root"),
+        "password": os.getenv("DATABASE_PASSWORD", "StrongPassword123!"),
+        "database": database,
+    }
+
+
+def reset_database(kwargs):
+    server_kwargs = {k: v for k, v in kwargs.items() if k != "database"}
+    connection = pymysql.connect(**server_kwargs)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{kwargs['database']}`")
+            cursor.execute(f"CREATE DATABASE `{kwargs['database']}`")
+    finally:
+        connection.close()
+
+
+def fill(connection, rows, patients):
+    """Synthetic rows; each patient gets about rows / patients tests and diagnoses, interleaved by id"""
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TABLE bench_digits (d TINYINT PRIMARY KEY)")
+        cursor.execute("INSERT INTO bench_digits VALUES (0), (1), (2), (3), (4), (5), (6), (7), (8), (9)")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0, UNIQUE_CHECKS = 0")
+        for offset in range(0, max(rows, patients), BLOCK):
+            started = time.perf_counter()
+            if offset < patients:
+                cursor.execute(
+                    "INSERT INTO patients (patient_id, age, gender) "
+                    f"SELECT {offset} + n + 1, 20 + n % 60, IF(n % 2, '1', '0') FROM ({SEQUENCE}) s "
+                    f"WHERE {offset} + n < {patients}"
+                )
+            if offset < rows:
+                # A stride coprime to most patient counts spreads each patient's rows over the table
+                patient = f"1 + (({offset} + n) * 7919) % {patients}"
+                cursor.execute(
+                    "INSERT INTO medical_tests (test_id, patient_id, total_bilirubin, direct_bilirubin, "
+                    "alkaline_phosphotase, alamine_aminotransferase, aspartate_aminotransferase, "
+                    "total_proteins, albumin, albumin_and_globulin_ratio) "
+                    f"SELECT {offset} + n + 1, {patient}, RAND() * 10, RAND() * 5, 100 + n % 900, 10 + n % 200, "
+                    f"10 + n % 300, 5 + RAND() * 4, 2 + RAND() * 3, 0.5 + RAND() "
+                    f"FROM ({SEQUENCE}) s WHERE {offset} + n < {rows}"
+                )
+                cursor.execute(
+                    "INSERT INTO diagnosis (diagnosis_id, patient_id, diagnosis) "
+                    f"SELECT {offset} + n + 1, {patient}, n % 2 FROM ({SEQUENCE}) s WHERE {offset} + n < {rows}"
+                )
+            connection.commit()
+            print(f"  rows {offset:,}..{min(offset + BLOCK, max(rows, patients)):,} "
+                  f"in {time.perf_counter() - started:.1f}s")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1, UNIQUE_CHECKS = 1")
+        cursor.execute("DROP TABLE bench_digits")
+        cursor.execute("ANALYZE TABLE patients, medical_tests, diagnosis")
+        cursor.fetchall()
+
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [c[0] for c in cursor.description]
+    return dict(zip(columns, cursor.fetchone()))
+
+
+def check_plans(cursor, patient_id, before_id):
+    """EXPLAIN every query; returns the failures (query uses another index or sorts)"""
+    failures = []
+    for name, (sql, index) in QUERIES.items():
+        plan = explain(cursor, sql, query_params(sql, patient_id, before_id))
+        extra = plan.get("Extra") or ""
+        print(f"  {name:<18} type={str(plan['type']):<6} key={plan['key']} rows={plan['rows']} extra={extra}")
+        if plan["key"] != index or "filesort" in extra.lower():
+            failures.append(name)
+    return failures
+
+
+def query_params(sql, patient_id, before_id):
+    return (patient_id, before_id) if sql.count("%s") == 2 else (patient_id,)
+
+
+def time_queries(cursor, patient_ids, before_id):
+    """Median and p99 latency in ms per query over the given patients"""
+    results = {}
+    for name, (sql, _) in QUERIES.items():
+        timings = []
+        for patient_id in patient_ids:
+            start = time.perf_counter()
+            cursor.execute(sql, query_params(sql, patient_id, before_id))
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = (statistics.median(timings) * 1000, timings[int(len(timings) * 0.99) - 1] * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="liver_index_bench")
+    parser.add_argument("--rows", type=int, default=10000000, help="Synthetic medical_tests and diagnosis rows")
+    parser.add_argument("--patients", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=1000, help="Random patients timed per query")
+    args = parser.parse_args()
+    if args.database == os.getenv("DATABASE_NAME", "liver_disease_db"):
+        parser.error("Refusing to drop the application database; pick a scratch --database")
+
+    kwargs = connect_kwargs(args.database)
+    migrations = discover_migrations()
+    reset_database(kwargs)
+    connection = pymysql.connect(**kwargs)
+    try:
+        apply_migrations(connection, migrations[:1])
+        print(f"Filling {args.rows:,} tests and diagnoses for {args.patients:,} patients")
+        fill(connection, args.rows, args.patients)
+
+        rng = random.Random(42)
+        patient_ids = [rng.randint(1, args.patients) for _ in range(args.queries)]
+        # Second history page of a typical patient: everything below the table midpoint
+        before_id = args.rows // 2
+        with connection.cursor() as cursor:
+            print("\nForeign key index only:")
+            check_plans(cursor, patient_ids[0], before_id)
+            baseline = time_queries(cursor, patient_ids, before_id)
+
+            started = time.perf_counter()
+            apply_migrations(connection, migrations)
+            print(f"\nComposite indexes built in {time.perf_counter() - started:.1f}s:")
+            failures = check_plans(cursor, patient_ids[0], before_id)
+            indexed = time_queries(cursor, patient_ids, before_id)
+    finally:
+        connection.close()
+
+    print(f"\n{'query':<20}{'fk p50 ms':>12}{'fk p99 ms':>12}{'idx p50 ms':>12}{'idx p99 ms':>12}")
+    for name in QUERIES:
+        print(f"{name:<20}{baseline[name][0]:>12.3f}{baseline[name][1]:>12.3f}"
+              f"{indexed[name][0]:>12.3f}{indexed[name][1]:>12.3f}")
+    if failures:
+        print(f"\nEXPLAIN check failed for: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nEXPLAIN check passed: every query is an index range scan without a filesort")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Cost of the /metrics instrumentation: the API with metrics on vs off.
+
+First times the primitives (one histogram observation, one statement
+lookup). Then, for every --paths endpoint:
+
+1. The app is imported, started against the configured MySQL database and
+   called directly through ASGI, one request after another, so no HTTP
+   client competes for the CPU. Blocks of --block requests alternate
+   between metrics off and on in the same process, which keeps the
+   difference between runs of separate processes (larger than the effect)
+   out of the result. Off is what METRICS_ENABLED=0 gives: no middleware
+   and no-op observations. The median difference between neighbouring off
+   and on blocks is the CPU time the instrumentation adds per request.
+2. A uvicorn worker with METRICS_ENABLED=0 is driven over HTTP by
+   --concurrency clients for --duration seconds, and its CPU time per
+   request is read from /proc/<pid>/stat (Linux): what a request really
+   costs the server, HTTP parsing and socket I/O included.
+
+The overhead is the added CPU time of 1. relative to the cost per request
+of 2.; relative to the in-process request alone (no HTTP) it is an upper
+bound. --no-http skips 2.
+
+Usage:
+    python bench_metrics.py --paths "/patients/?limit=100" /predict/patients/1 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The in-process benchmark needs the instrumentation built in to switch it off
+os.environ["METRICS_ENABLED"] = "1"
+
+from bench_async import run_load, wait_until_ready  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def micro(n=200000):
+    """Nanoseconds per observation and per statement lookup (cached by query text)"""
+    import metrics
+
+    histogram = metrics.Histogram("bench_seconds", "", ["route"])
+    child = histogram.labels("/patients/")
+    start = time.perf_counter()
+    for _ in range(n):
+        child.observe(0.003)
+    observe_ns = (time.perf_counter() - start) / n * 1e9
+    start = time.perf_counter()
+    for _ in range(n):
+        histogram.labels("/patients/").observe(0.003)
+    labelled_ns = (time.perf_counter() - start) / n * 1e9
+    query = "SELECT * FROM patients WHERE patient_id > %s ORDER BY patient_id LIMIT %s"
+    start = time.perf_counter()
+    for _ in range(n):
+        metrics.statement_metrics(query)
+    statement_ns = (time.perf_counter() - start) / n * 1e9
+    return observe_ns, labelled_ns, statement_ns
+
+
+async def call_asgi(app, path):
+    """One GET through the app's ASGI interface; returns the status"""
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": route, "raw_path": route.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def middleware_stacks(app):
+    """The app's middleware stack with and without MetricsMiddleware"""
+    from metrics import MetricsMiddleware
+
+    with_metrics = app.build_middleware_stack()
+    user_middleware = app.user_middleware
+    app.user_middleware = [m for m in user_middleware if m.cls is not MetricsMiddleware]
+    without_metrics = app.build_middleware_stack()
+    app.user_middleware = user_middleware
+    return {False: without_metrics, True: with_metrics}
+
+
+async def benchmark_asgi(app, paths, args):
+    """CPU microseconds per request with metrics off and on, per path"""
+    import metrics
+
+    stacks = middleware_stacks(app)
+    await app.router.startup()
+    results = []
+    try:
+        for path in paths:
+            print(f"GET {path} ...")
+            # Warm-up, with metrics on so every label set exists
+            for _ in range(args.block):
+                status = await call_asgi(app, path)
+            if status != 200:
+                raise RuntimeError(f"GET {path} returned {status}")
+            cpu = {False: [], True: []}
+            blocks = max(1, args.requests // args.block // 2)
+            for _ in range(blocks):
+                for enabled in (False, True):
+                    metrics.METRICS_ENABLED = enabled
+                    app.middleware_stack = stacks[enabled]
+                    start = time.process_time()
+                    for _ in range(args.block):
+                        await call_asgi(app, path)
+                    cpu[enabled].append((time.process_time() - start) / args.block * 1e6)
+            metrics.METRICS_ENABLED = True
+            app.middleware_stack = stacks[True]
+            # Medians of the blocks and of the paired off/on differences, so a
+            # block slowed down by something else on the machine does not count
+            results.append((path, {
+                False: statistics.median(cpu[False]),
+                "added": statistics.median(on - off for off, on in zip(cpu[False], cpu[True])),
+            }))
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def http_cpu_per_request(path, args):
+    """Server CPU microseconds per request over HTTP, metrics off"""
+    env = dict(os.environ, METRICS_ENABLED="0")
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.app, "--port", str(args.port), "--log-level", "warning"],
+        cwd=HERE, env=env,
+    )
+    try:
+        wait_until_ready(base_url)
+        asyncio.run(run_load(base_url, path, args.concurrency, 2))
+        cpu_before = cpu_seconds(server.pid)
+        result = asyncio.run(run_load(base_url, path, args.concurrency, args.duration))
+        cpu = cpu_seconds(server.pid) - cpu_before
+    finally:
+        server.terminate()
+        server.wait()
+    return cpu / max(result["requests"], 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", nargs="+",
+                        default=["/patients/?limit=100", "/medical_tests/patient/1", "/predict/patients/1"])
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per path, half of them with metrics on")
+    parser.add_argument("--block", type=int, default=50, help="Requests per off/on block")
+    parser.add_argument("--no-http", action="store_true", help="Skip the HTTP cost per request")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of HTTP load per path")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--app", default="main:app", help="App module")
+    args = parser.parse_args()
+
+    observe_ns, labelled_ns, statement_ns = micro()
+    print(f"observe: {observe_ns:.0f} ns, labels() + observe: {labelled_ns:.0f} ns, "
+          f"statement lookup: {statement_ns:.0f} ns")
+
+    module, _, name = args.app.partition(":")
+    app = getattr(__import__(module), name)
+    results = asyncio.run(benchmark_asgi(app, args.paths, args))
+    http_cpu = {}
+    if not args.no_http:
+        for path in args.paths:
+            print(f"GET {path} over HTTP ...")
+            http_cpu[path] = http_cpu_per_request(path, args)
+
+    print(f"\nCPU us per request (medians over blocks); in-process: {args.requests} sequential requests "
+          f"per path in blocks of {args.block}; HTTP: {args.concurrency} clients for {args.duration:.0f}s, metrics off")
+    print(f"{'path':<28}{'off':>9}{'on':>9}{'added':>9}{'% in-proc':>11}{'HTTP':>9}{'% HTTP':>9}")
+    for path, values in results:
+        off, added = values[False], values["added"]
+        line = f"{path:<28}{off:>9.1f}{off + added:>9.1f}{added:>9.1f}{added / off * 100:>10.1f}%"
+        if path in http_cpu:
+            line += f"{http_cpu[path]:>9.0f}{added / http_cpu[path] * 100:>8.1f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
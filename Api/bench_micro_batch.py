@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency of single-record predictions, with and without micro-batching.
+
+Loads the model the API serves and runs --concurrency asyncio clients in one
+event loop. Each client scores one random record after another for
+--duration seconds:
+
+- direct: every record is its own model_service.predict call in the
+  threadpool (what POST /predict did)
+- SIZE:WAIT: records go through a MicroBatcher with max_batch_size SIZE and
+  max_wait_ms WAIT, as POST /predict does now
+
+The prediction cache is disabled, so every record is scored. HTTP is left
+out to measure the scheduling and model cost only.
+
+Usage:
+    python bench_micro_batch.py --concurrency 1 16 64 --configs 16:1 64:2 128:5
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from micro_batcher import MicroBatcher
+from model_service import model_service
+from prediction_cache import PredictionCache
+
+
+def predict_records(records):
+    # Same as main.predict_records, without importing the API and its database layer
+    labels, probabilities, _ = model_service.predict(records)
+    return [
+        {"prediction": int(label), "probability": float(probability)}
+        for label, probability in zip(labels, probabilities)
+    ]
+
+
+def random_record(rng):
+    return {
+        "age": rng.randint(4, 90),
+        "gender": rng.choice(["Male", "Female"]),
+        "total_bilirubin": rng.uniform(0.4, 75),
+        "direct_bilirubin": rng.uniform(0.1, 19.7),
+        "alkaline_phosphotase": rng.uniform(63, 2110),
+        "alamine_aminotransferase": rng.uniform(10, 2000),
+        "aspartate_aminotransferase": rng.uniform(10, 4929),
+        "total_proteins": rng.uniform(2.7, 9.6),
+        "albumin": rng.uniform(0.9, 5.5),
+        "albumin_and_globulin_ratio": rng.uniform(0.3, 2.8),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(score, concurrency, duration, seed=0):
+    """concurrency clients calling score(record) back to back for duration seconds"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client(index):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            record = random_record(rng)
+            start = time.perf_counter()
+            await score(record)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def benchmark(args):
+    async def direct(record):
+        return (await run_in_threadpool(predict_records, [record]))[0]
+
+    modes = [("direct", None)]
+    for config in args.configs:
+        size, wait = config.split(":")
+        modes.append((config, (int(size), float(wait))))
+
+    print(f"{'clients':>8}  {'mode':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean batch':>12}")
+    for concurrency in args.concurrency:
+        for name, batch_config in modes:
+            if batch_config is None:
+                score, batcher = direct, None
+            else:
+                batcher = MicroBatcher(predict_records, batch_config[0], batch_config[1], args.max_in_flight)
+                score = batcher.submit
+            # Warm up the threadpool and the model
+            await run_load(score, concurrency, 0.2)
+            if batcher is not None:
+                batcher.items = batcher.batches = 0
+            result = await run_load(score, concurrency, args.duration, seed=1)
+            mean_batch = batcher.stats()["mean_batch_size"] if batcher is not None else 1.0
+            print(f"{concurrency:>8}  {name:<10}{result['requests']:>10}{result['rps']:>10.0f}"
+                  f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{mean_batch:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--configs", nargs="+", default=["16:1", "64:2", "128:5"],
+                        help="max_batch_size:max_wait_ms pairs to compare")
+    parser.add_argument("--max-in-flight", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--model", default=None, help="Model artifact directory or pickle (default: the API's model)")
+    args = parser.parse_args()
+
+    model_service.load(args.model)
+    model_service.cache = PredictionCache(max_size=0)
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
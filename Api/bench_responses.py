@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Encoding time and response size of a list endpoint page.
+
+Builds --rows synthetic medical_tests rows, shaped like the DictCursor rows
+GET /medical_tests/ returns, and times turning the page into a response body:
+
+- fastapi: jsonable_encoder + JSONResponse (what returning the dict did)
+- json: json_responses.dumps with the standard json module
+- orjson: json_responses.dumps with orjson
+- + gzip / + br: orjson followed by compression at the configured level
+
+It checks that every path produces the same JSON, and prints the median time
+per page and the body size for each.
+
+Usage:
+    python bench_responses.py --rows 1000 10000 --runs 20
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import json_responses
+
+
+def synthetic_page(n_rows, seed=0):
+    rng = random.Random(seed)
+    rows = [{
+        "test_id": i,
+        "patient_id": rng.randint(1, n_rows),
+        "total_bilirubin": round(rng.uniform(0.4, 75), 1),
+        "direct_bilirubin": round(rng.uniform(0.1, 19.7), 1),
+        "alkaline_phosphotase": rng.randint(63, 2110),
+        "alamine_aminotransferase": rng.randint(10, 2000),
+        "aspartate_aminotransferase": rng.randint(10, 4929),
+        "total_proteins": round(rng.uniform(2.7, 9.6), 1),
+        "albumin": round(rng.uniform(0.9, 5.5), 1),
+        "albumin_and_globulin_ratio": round(rng.uniform(0.3, 2.8), 2),
+    } for i in range(1, n_rows + 1)]
+    return {"medical_tests": rows, "next_after_id": n_rows}
+
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def fastapi_body(page):
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def stdlib_body(page):
+    orjson, json_responses.orjson = json_responses.orjson, None
+    try:
+        return json_responses.dumps(page)
+    finally:
+        json_responses.orjson = orjson
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = [("fastapi", fastapi_body), ("json", stdlib_body)]
+    if json_responses.orjson is not None:
+        paths.append(("orjson", json_responses.dumps))
+    encoders = [("gzip", "gzip")] + ([("br", "br")] if json_responses.brotli is not None else [])
+
+    print(f"{'rows':>7}  {'path':<14}{'ms/page':>10}{'bytes':>12}{'vs fastapi':>12}")
+    for n_rows in args.rows:
+        page = synthetic_page(n_rows)
+        expected = json.loads(fastapi_body(page))
+        baseline_ms = None
+        for name, encode in paths:
+            ms, body = timed(lambda: encode(page), args.runs)
+            if json.loads(body) != expected:
+                raise SystemExit(f"{name} produced different JSON")
+            baseline_ms = baseline_ms or ms
+            print(f"{n_rows:>7}  {name:<14}{ms:>10.2f}{len(body):>12,}{baseline_ms / ms:>11.1f}x")
+
+        # Compression on top of the fastest encoder
+        body = json_responses.dumps(page)
+        encode_ms, _ = timed(lambda: json_responses.dumps(page), args.runs)
+        for name, encoding in encoders:
+            ms, compressed = timed(lambda: json_responses.compress(body, encoding), args.runs)
+            print(f"{n_rows:>7}  {'+ ' + name:<14}{encode_ms + ms:>10.2f}{len(compressed):>12,}"
+                  f"{baseline_ms / (encode_ms + ms):>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
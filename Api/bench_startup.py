@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: replaying sqlSchema.sql + data.sql versus migrations.
+
+Runs against a scratch database on the configured MySQL server (it is
+dropped and recreated, so never point this at real data) and times:
+
+- legacy: the old startup path, which split both files on ';' and executed
+  and committed every statement on each boot
+- migrations: run_migrations() on the startup path; the seed load that the
+  API now does in the background is timed separately
+
+for a first boot (empty database) and a restart (everything already loaded).
+
+Usage:
+    python bench_startup.py --database liver_disease_bench --runs 3
+"""
+import argparse
+import os
+import statistics
+import time
+
+import pymysql
+
+from schema_migrations import SEED_FILE, load_seed, run_migrations
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def connect_kwargs(database):
+    return {
+        "host": os.getenv("DATABASE_HOST", "localhost"),
+        "user": os.getenv("DATABASE_USER", "root"),
+        "password": os.getenv("DATABASE_PASSWORD", "StrongPassword123!"),
+        "database": database,
+        "cursorclass": pymysql.cursors.DictCursor,
+    }
+
+
+def reset_database(kwargs):
+    server_kwargs = {k: v for k, v in kwargs.items() if k != "database"}
+    connection = pymysql.connect(**server_kwargs)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{kwargs['database']}`")
+            cursor.execute(f"CREATE DATABASE `{kwargs['database']}`")
+    finally:
+        connection.close()
+
+
+def legacy_initialize(kwargs):
+    """The previous initialize_database(): naive split, one commit per statement"""
+    errors = 0
+    for sql_file in ("sqlSchema.sql", "data.sql"):
+        connection = pymysql.connect(**kwargs)
+        cursor = connection.cursor()
+        with open(os.path.join(BASE_DIR, sql_file), 'r') as file:
+            # The schema file hard-codes the database name
+            sql_script = file.read().replace("liver_disease_db", kwargs["database"])
+        for statement in [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]:
+            try:
+                cursor.execute(statement)
+                connection.commit()
+            except pymysql.Error:
+                errors += 1
+        cursor.close()
+        connection.close()
+    return errors
+
+
+def migrations_initialize(kwargs):
+    """New startup path; returns (startup seconds, seed seconds)"""
+    start = time.perf_counter()
+    run_migrations(kwargs)
+    startup = time.perf_counter() - start
+
+    connection = pymysql.connect(**kwargs)
+    try:
+        start = time.perf_counter()
+        load_seed(connection, SEED_FILE)
+        seed = time.perf_counter() - start
+    finally:
+        connection.close()
+    return startup, seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="liver_disease_bench")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    if args.database == os.getenv("DATABASE_NAME", "liver_disease_db"):
+        parser.error("Refusing to drop the application database; pick a scratch --database")
+
+    kwargs = connect_kwargs(args.database)
+    results = {key: [] for key in ("legacy_first", "legacy_restart", "new_first", "new_seed",
+                                   "new_restart", "new_restart_seed")}
+    legacy_errors = []
+
+    for _ in range(args.runs):
+        reset_database(kwargs)
+        start = time.perf_counter()
+        legacy_initialize(kwargs)
+        results["legacy_first"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        legacy_errors.append(legacy_initialize(kwargs))
+        results["legacy_restart"].append(time.perf_counter() - start)
+
+        reset_database(kwargs)
+        startup, seed = migrations_initialize(kwargs)
+        results["new_first"].append(startup)
+        results["new_seed"].append(seed)
+        startup, seed = migrations_initialize(kwargs)
+        results["new_restart"].append(startup)
+        results["new_restart_seed"].append(seed)
+
+    ms = {key: statistics.median(values) * 1000 for key, values in results.items()}
+    print(f"{'path':<12}{'first boot ms':>16}{'restart ms':>14}{'background seed ms':>22}")
+    print(f"{'legacy':<12}{ms['legacy_first']:>16.1f}{ms['legacy_restart']:>14.1f}{'-':>22}")
+    print(f"{'migrations':<12}{ms['new_first']:>16.1f}{ms['new_restart']:>14.1f}"
+          f"{ms['new_seed']:>13.1f} / {ms['new_restart_seed']:.1f}")
+    print(f"\nLegacy restart: {statistics.median(legacy_errors)} failing statements per boot "
+          "(duplicate rows); background seed is first boot / restart")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Memory per worker and throughput as gunicorn workers are added.
+
+For every --workers count, with the app and model preloaded in the master
+and without (--preload on off), starts `gunicorn -c gunicorn_conf.py main:app`
+against the configured MySQL database, drives POST /predict from
+--client-processes load generator processes and then reads the memory of
+the master and every worker from /proc/<pid>/smaps_rollup (Linux):
+
+- RSS: resident pages, shared ones counted in full in every process
+- PSS: shared pages split between the processes that map them; the sum over
+  all processes is what the service really uses
+- USS: pages only that process has, i.e. what one more worker costs
+
+Usage:
+    python bench_workers.py --workers 1 2 4 8 --concurrency 256 --duration 15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from bench_async import run_load, wait_until_ready
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+RECORD = {
+    "age": 45, "gender": "Male", "total_bilirubin": 1.2, "direct_bilirubin": 0.3,
+    "alkaline_phosphotase": 200, "alamine_aminotransferase": 30, "aspartate_aminotransferase": 40,
+    "total_proteins": 6.8, "albumin": 3.3, "albumin_and_globulin_ratio": 0.9,
+}
+
+
+def memory_kb(pid):
+    """RSS, PSS and USS of a process in kB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_for_workers(pid, count, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if len(children(pid)) == count:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"gunicorn did not start {count} workers")
+
+
+def client_load(args):
+    base_url, path, concurrency, duration = args
+    return asyncio.run(run_load(base_url, path, concurrency, duration, json_body=RECORD))
+
+
+def drive(base_url, args, duration):
+    """Run the load from several processes so the client is not the bottleneck"""
+    per_process = max(1, args.concurrency // args.client_processes)
+    with multiprocessing.Pool(args.client_processes) as pool:
+        results = pool.map(client_load, [(base_url, args.path, per_process, duration)] * args.client_processes)
+    return {
+        "requests": sum(r["requests"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "rps": sum(r["rps"] for r in results),
+        "p99_ms": max(r["p99_ms"] for r in results),
+    }
+
+
+def benchmark(workers, preload, args):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PRELOAD_APP="1" if preload else "0",
+               BIND=f"127.0.0.1:{args.port}", LOG_LEVEL="warning", MAX_REQUESTS="0")
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", args.app], cwd=HERE, env=env,
+    )
+    try:
+        wait_for_workers(server.pid, workers)
+        wait_until_ready(base_url)
+        drive(base_url, args, 2)
+        result = drive(base_url, args, args.duration)
+        # After the load, so pages the workers wrote to have been copied
+        worker_memory = [memory_kb(pid) for pid in children(server.pid)]
+        master_memory = memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    result["worker_rss_mb"] = sum(m["rss"] for m in worker_memory) / len(worker_memory) / 1024
+    result["worker_uss_mb"] = sum(m["uss"] for m in worker_memory) / len(worker_memory) / 1024
+    result["total_pss_mb"] = (master_memory["pss"] + sum(m["pss"] for m in worker_memory)) / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--preload", nargs="+", choices=["on", "off"], default=["on", "off"])
+    parser.add_argument("--path", default="/predict", help="Endpoint to POST a record to")
+    parser.add_argument("--concurrency", type=int, default=256, help="Concurrent clients over all processes")
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per run")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--app", default="main:app", help="App module for gunicorn")
+    args = parser.parse_args()
+
+    results = []
+    for preload in args.preload:
+        for workers in args.workers:
+            print(f"Benchmarking {workers} workers, preload {preload} ...")
+            results.append((workers, preload, benchmark(workers, preload == "on", args)))
+
+    print(f"\nPOST {args.path}, {args.concurrency} concurrent clients, {args.duration:.0f}s per run "
+          f"({multiprocessing.cpu_count()} CPUs)")
+    print(f"{'workers':>8}{'preload':>9}{'req/s':>10}{'p99 ms':>10}{'errors':>8}"
+          f"{'RSS/worker':>12}{'USS/worker':>12}{'total PSS':>11}")
+    for workers, preload, r in results:
+        print(f"{workers:>8}{preload:>9}{r['rps']:>10.0f}{r['p99_ms']:>10.1f}{r['errors']:>8}"
+              f"{r['worker_rss_mb']:>10.1f}MB{r['worker_uss_mb']:>10.1f}MB{r['total_pss_mb']:>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
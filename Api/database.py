@@ -0,0 +1,293 @@
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import pymysql
+from starlette.concurrency import run_in_threadpool
+
+from db_pool import ConnectionPool, PoolExhaustedError, pool_max_size
+from metrics import TimedCursorMixin, timed_statement
+
+try:
+    import aiomysql
+except ImportError:  # Only needed when DB_MODE=async
+    aiomysql = None
+
+if aiomysql is not None:
+    class _TimedDictCursor(TimedCursorMixin, aiomysql.DictCursor):
+        pass
+
+    class _TimedSSDictCursor(TimedCursorMixin, aiomysql.SSDictCursor):
+        time_fetch = True
+
+
+class _AsyncConnection:
+    """A checked-out aiomysql connection whose commits and rollbacks are timed"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *cursors):
+        return self._connection.cursor(*cursors)
+
+    async def commit(self):
+        await timed_statement("commit", self._connection.commit())
+
+    async def rollback(self):
+        await timed_statement("rollback", self._connection.rollback())
+
+
+class AsyncMySQLDatabase:
+    """
+    asyncio-native data access layer backed by an aiomysql pool.
+
+    Connections are checked out with `async with database.acquire() as conn`
+    and expose the aiomysql API (`async with conn.cursor() as cur`,
+    `await cur.execute(...)`, `await conn.commit()`).
+    """
+
+    mode = "async"
+
+    def __init__(self, connect_kwargs, min_size=2, max_size=50, wait_timeout=5.0,
+                 recycle_seconds=3600, max_uses=1000, ping_interval=5.0):
+        if aiomysql is None:
+            raise RuntimeError("DB_MODE=async requires the aiomysql package")
+
+        kwargs = dict(connect_kwargs)
+        kwargs["db"] = kwargs.pop("database", None)
+        kwargs["cursorclass"] = _TimedDictCursor
+        self.connect_kwargs = kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.recycle_seconds = recycle_seconds
+        self.max_uses = max_uses
+        self.ping_interval = ping_interval
+        self.SSDictCursor = _TimedSSDictCursor
+
+        self._pool = None
+        self._last_used = weakref.WeakKeyDictionary()
+        self._uses = weakref.WeakKeyDictionary()
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def open(self):
+        if self._pool is None:
+            self._pool = await aiomysql.create_pool(
+                minsize=self.min_size,
+                maxsize=self.max_size,
+                pool_recycle=self.recycle_seconds,
+                autocommit=False,
+                **self.connect_kwargs,
+            )
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    async def checkout(self):
+        """Wait up to wait_timeout for a healthy connection"""
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            connection = await asyncio.wait_for(self._pool.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise PoolExhaustedError(
+                f"No database connection available after {self.wait_timeout:.1f}s "
+                f"({self._pool.size - self._pool.freesize}/{self.max_size} in use)"
+            )
+        finally:
+            self._waiting -= 1
+
+        # Health-check connections that sat idle long enough to have been dropped
+        last_used = self._last_used.get(connection)
+        if last_used is None or time.monotonic() - last_used > self.ping_interval:
+            try:
+                await connection.ping(reconnect=True)
+            except Exception:
+                self._pool.release(connection)
+                raise
+
+        waited = time.monotonic() - start
+        self._checkouts += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        return _AsyncConnection(connection)
+
+    async def release(self, connection):
+        connection = connection._connection
+        uses = self._uses.get(connection, 0) + 1
+        self._uses[connection] = uses
+        try:
+            # Drop uncommitted work and stale snapshots before the next checkout
+            if connection.get_transaction_status():
+                await connection.rollback()
+        except Exception:
+            connection.close()
+        if self.max_uses and uses >= self.max_uses and not connection.closed:
+            # The pool replaces a closed connection on a later checkout
+            connection.close()
+        if connection.closed:
+            self._discarded += 1
+        self._last_used[connection] = time.monotonic()
+        self._pool.release(connection)
+
+    @asynccontextmanager
+    async def acquire(self):
+        connection = await self.checkout()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+    def stats(self):
+        pool = self._pool
+        size = pool.size if pool else 0
+        idle = pool.freesize if pool else 0
+        checkouts = self._checkouts
+        return {
+            "mode": self.mode,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiting": self._waiting,
+            "checkouts": checkouts,
+            "timeouts": self._timeouts,
+            "discarded": self._discarded,
+            "avg_wait_ms": (self._total_wait / checkouts * 1000) if checkouts else 0.0,
+            "max_wait_ms": self._max_wait * 1000,
+        }
+
+
+class _ThreadedCursor:
+    """Awaitable facade over a blocking pymysql cursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def execute(self, query, args=None):
+        return await run_in_threadpool(self._cursor.execute, query, args)
+
+    async def executemany(self, query, args):
+        return await run_in_threadpool(self._cursor.executemany, query, args)
+
+    async def fetchone(self):
+        return await run_in_threadpool(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        return await run_in_threadpool(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await run_in_threadpool(self._cursor.fetchall)
+
+    async def close(self):
+        await run_in_threadpool(self._cursor.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class _TimedThreadedCursor(TimedCursorMixin, _ThreadedCursor):
+    pass
+
+
+class _TimedThreadedSSCursor(TimedCursorMixin, _ThreadedCursor):
+    time_fetch = True
+
+
+class _ThreadedConnection:
+    """Awaitable facade over a pooled pymysql connection"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, cursorclass=None):
+        cursor = self._connection.cursor(cursorclass)
+        if isinstance(cursor, pymysql.cursors.SSCursor):
+            return _TimedThreadedSSCursor(cursor)
+        return _TimedThreadedCursor(cursor)
+
+    async def commit(self):
+        await timed_statement("commit", run_in_threadpool(self._connection.commit))
+
+    async def rollback(self):
+        await timed_statement("rollback", run_in_threadpool(self._connection.rollback))
+
+
+class ThreadedMySQLDatabase:
+    """
+    Same interface as AsyncMySQLDatabase, backed by the blocking ConnectionPool.
+
+    Every driver call runs in the threadpool, so this mode behaves like the
+    original `def` handlers and is kept for comparison and as a fallback.
+    """
+
+    mode = "sync"
+    SSDictCursor = pymysql.cursors.SSDictCursor
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def open(self):
+        await run_in_threadpool(self.pool.open)
+
+    async def close(self):
+        await run_in_threadpool(self.pool.close)
+
+    async def checkout(self):
+        return _ThreadedConnection(await run_in_threadpool(self.pool.acquire))
+
+    async def release(self, connection):
+        await run_in_threadpool(connection._connection.close)
+
+    @asynccontextmanager
+    async def acquire(self):
+        connection = await self.checkout()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+    def stats(self):
+        return dict(self.pool.stats(), mode=self.mode)
+
+
+def create_database(connect_kwargs):
+    """Build the data access layer selected by DB_MODE (async or sync)"""
+    mode = os.getenv("DB_MODE", "async").lower()
+    if mode == "sync":
+        return ThreadedMySQLDatabase(ConnectionPool.from_env(connect_kwargs))
+    if mode == "async":
+        max_size = pool_max_size(50)
+        return AsyncMySQLDatabase(
+            connect_kwargs,
+            min_size=min(int(os.getenv("DB_POOL_MIN_SIZE", "2")), max_size),
+            max_size=max_size,
+            wait_timeout=float(os.getenv("DB_POOL_WAIT_TIMEOUT", "5")),
+            recycle_seconds=float(os.getenv("DB_POOL_RECYCLE_SECONDS", "3600")),
+            max_uses=int(os.getenv("DB_POOL_MAX_USES", "1000")),
+            ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", "5")),
+        )
+    raise ValueError(f"Unknown DB_MODE {mode!r}; expected 'async' or 'sync'")
@@ -0,0 +1,284 @@
+import os
+import threading
+import time
+from collections import deque
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes free before the wait timeout"""
+
+
+class _PoolEntry:
+    """A raw pymysql connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ("connection", "created_at", "last_used", "uses")
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class PooledConnection:
+    """
+    Checked-out connection handed to request handlers.
+
+    Behaves like a pymysql connection, except that close() gives the
+    underlying connection back to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry)
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise pymysql.err.InterfaceError("Connection already returned to the pool")
+        return getattr(self._entry.connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pool_max_size(default):
+    """
+    Per-process pool cap: DB_POOL_MAX_SIZE if set, otherwise default, lowered
+    so that WEB_CONCURRENCY worker processes together stay within
+    DB_MAX_CONNECTIONS (default 120, under MySQL's max_connections of 151).
+    """
+    if os.getenv("DB_POOL_MAX_SIZE"):
+        return int(os.getenv("DB_POOL_MAX_SIZE"))
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "120"))
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, min(default, budget // workers))
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of pymysql connections.
+
+    Args:
+        connect_kwargs (dict): Arguments passed to pymysql.connect
+        min_size (int): Connections opened up front by open()
+        max_size (int): Hard cap on connections held open at once
+        wait_timeout (float): Seconds acquire() waits for a free connection
+        recycle_seconds (float): Reconnect connections older than this
+        max_uses (int): Reconnect connections after this many checkouts
+        ping_interval (float): Ping connections idle for longer than this on checkout
+    """
+
+    def __init__(self, connect_kwargs, min_size=2, max_size=10, wait_timeout=5.0,
+                 recycle_seconds=3600, max_uses=1000, ping_interval=5.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.recycle_seconds = recycle_seconds
+        self.max_uses = max_uses
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @classmethod
+    def from_env(cls, connect_kwargs):
+        """Build a pool sized from the DB_POOL_* environment variables"""
+        max_size = pool_max_size(10)
+        return cls(
+            connect_kwargs,
+            min_size=min(int(os.getenv("DB_POOL_MIN_SIZE", "2")), max_size),
+            max_size=max_size,
+            wait_timeout=float(os.getenv("DB_POOL_WAIT_TIMEOUT", "5")),
+            recycle_seconds=float(os.getenv("DB_POOL_RECYCLE_SECONDS", "3600")),
+            max_uses=int(os.getenv("DB_POOL_MAX_USES", "1000")),
+            ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", "5")),
+        )
+
+    def open(self):
+        """Open min_size connections so the first requests skip the connect cost"""
+        with self._cond:
+            self._closed = False
+            missing = self.min_size - self._size
+            self._size += max(missing, 0)
+
+        for _ in range(max(missing, 0)):
+            try:
+                entry = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """
+        Check out a healthy connection, waiting up to timeout seconds.
+
+        Raises:
+            PoolExhaustedError: If every connection stays busy until the timeout
+            pymysql.Error: If a new connection cannot be established
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        entry = None
+
+        with self._cond:
+            if self._closed:
+                raise pymysql.err.InterfaceError("Connection pool is closed")
+            while True:
+                if self._idle:
+                    # LIFO keeps the most recently used connections warm
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve a slot now and connect outside the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhaustedError(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"({self._in_use}/{self.max_size} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            entry = self._create() if entry is None else self._check(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        return PooledConnection(self, entry)
+
+    def close(self):
+        """Close every idle connection; busy ones are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def stats(self):
+        """Snapshot of pool usage for the /pool/stats endpoint"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "avg_wait_ms": (self._total_wait / checkouts * 1000) if checkouts else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+            }
+
+    def _create(self):
+        entry = _PoolEntry(pymysql.connect(**self.connect_kwargs))
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def _check(self, entry):
+        """Return entry if it is still usable, otherwise a fresh replacement"""
+        now = time.monotonic()
+        expired = (
+            (self.recycle_seconds and now - entry.created_at > self.recycle_seconds)
+            or (self.max_uses and entry.uses >= self.max_uses)
+        )
+        if not expired and now - entry.last_used <= self.ping_interval:
+            return entry
+        if not expired:
+            try:
+                entry.connection.ping(reconnect=False)
+                return entry
+            except pymysql.Error:
+                pass
+
+        self._close_quietly(entry)
+        with self._cond:
+            self._discarded += 1
+        return self._create()
+
+    def _release(self, entry):
+        entry.uses += 1
+        entry.last_used = time.monotonic()
+        healthy = True
+        try:
+            # Drop uncommitted work and stale snapshots before the next checkout
+            if entry.connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                entry.connection.rollback()
+        except pymysql.Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append(entry)
+                entry = None
+            else:
+                self._size -= 1
+                self._discarded += 1
+            self._cond.notify()
+
+        if entry is not None:
+            self._close_quietly(entry)
+
+    @staticmethod
+    def _close_quietly(entry):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,54 @@
+"""
+gunicorn settings for production serving: pre-forked uvicorn workers.
+
+    gunicorn -c gunicorn_conf.py main:app
+
+With PRELOAD_APP on (the default), main.py is imported and the prediction
+model is loaded once in the master, then gc.freeze() moves every object
+that exists so far out of the garbage collector's reach. Workers forked from
+it share those pages copy-on-write; without the freeze, the first
+collection in each worker would write to every tracked object's header and
+copy most of them. Database pools, the read cache and the micro-batcher
+queue are opened per worker in the startup events, after the fork.
+
+Workers are recycled after MAX_REQUESTS requests (plus up to
+MAX_REQUESTS_JITTER, so they do not all restart at once): gunicorn starts a
+replacement and the old worker finishes its in-flight requests within
+GRACEFUL_TIMEOUT seconds. A replacement is forked from the master, so it
+shares the preloaded model again.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# The app reads it too (read_cache.py, and db_pool.py to split the connection
+# budget between workers); set before main.py is imported
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "1") != "0"
+
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# A worker that does not report back for this long is killed and replaced
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = os.getenv("ACCESS_LOG") or None
+
+
+def when_ready(server):
+    """Runs in the master once it listens, before the first worker is forked"""
+    if not preload_app:
+        return
+    from model_service import model_service
+
+    try:
+        model_service.load()
+    except (OSError, ValueError) as e:
+        server.log.warning(f"Prediction model not preloaded, workers load it themselves: {str(e)}")
+    gc.freeze()
+    server.log.info(f"Preloaded the app and model; {gc.get_freeze_count()} objects frozen for the workers")
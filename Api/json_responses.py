@@ -0,0 +1,166 @@
+"""
+Encoded JSON responses for the list endpoints.
+
+FastAPI turns a returned dict into JSON by first walking it with
+jsonable_encoder (one Python call per row and field) and then running
+json.dumps. The list endpoints hold plain DictCursor rows that need no such
+conversion, so json_response() serializes them in one orjson call (the
+standard json module when orjson is not installed) and returns the bytes
+directly.
+
+The body is then:
+- tagged with a weak ETag, a hash of the JSON; a request whose
+  If-None-Match matches gets 304 Not Modified with no body
+- compressed with brotli or gzip, as negotiated from Accept-Encoding, once
+  it is at least COMPRESS_MIN_SIZE bytes (brotli only when the brotli
+  package is installed)
+"""
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from starlette.responses import Response
+
+from metrics import ENCODE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # Falls back to the json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Smallest body that is compressed; below this the headers cost more than is saved
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Set to 0 to send no ETag and ignore If-None-Match
+JSON_ETAGS = os.getenv("JSON_ETAGS", "1") != "0"
+
+
+def _default(value):
+    """Column types the encoders do not handle themselves, as jsonable_encoder maps them"""
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """Compact JSON of content as UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _accepted(accept_encoding):
+    """Encodings the client accepts, by name -> q value"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header value; ties prefer brotli"""
+    accepted = _accepted(accept_encoding or "")
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def etag_for(body):
+    # Weak: the tag identifies the JSON, whichever content coding it is sent with
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header value against etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def json_response(request, content, status_code=200):
+    """
+    Response with content encoded as JSON, ETag-checked and compressed for request.
+
+    Args:
+        request: The incoming starlette Request (its Accept-Encoding and
+            If-None-Match headers are used)
+        content: Dicts, lists and scalars, e.g. DictCursor rows
+        status_code (int): Status of a full response
+
+    Returns:
+        starlette.responses.Response
+    """
+    return encoded_response(request, encode_json(content), status_code)
+
+
+def encode_json(content):
+    """dumps() of a whole response body, timed as the "serialize" stage"""
+    start = time.perf_counter()
+    body = dumps(content)
+    ENCODE_SECONDS.labels("serialize").observe(time.perf_counter() - start)
+    return body
+
+
+def encoded_response(request, body, status_code=200):
+    """json_response() for a body that is already JSON bytes, e.g. from the read cache"""
+    headers = {"Vary": "Accept-Encoding"}
+    if JSON_ETAGS:
+        etag = etag_for(body)
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    if len(body) >= COMPRESS_MIN_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            start = time.perf_counter()
+            body = compress(body, encoding)
+            ENCODE_SECONDS.labels("compress").observe(time.perf_counter() - start)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,11 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import pymysql
 import os
-from pydantic import BaseModel
+import json
+import asyncio
+import time
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from db_pool import PoolExhaustedError
+from database import create_database
+from json_responses import dumps, encode_json, encoded_response, json_response
+from metrics import CONTENT_TYPE, DB_ACQUIRE_SECONDS, METRICS_ENABLED, MetricsMiddleware, registry
+from micro_batcher import MicroBatcher
+from model_service import model_service
+# Prediction module, on sys.path once model_service is imported
+from feature_vectors import (
+    REFRESH_PATIENT_VECTORS, patient_values, select_patients_query, upsert_query, vector_rows,
+)
+from backfill_feature_vectors import backfill
+from read_cache import create_read_cache
+from schema_migrations import MigrationError, SeedLoader, run_migrations
 
 # Initialize FastAPI app
 app = FastAPI()
 
+# Per-route latency histograms for GET /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Database connection configuration
 db_config = {
     "host": os.getenv("DATABASE_HOST", "localhost"),  # Default to localhost if not set
@@ -15,61 +40,247 @@ db_config = {
     "cursorclass": pymysql.cursors.DictCursor  # Use dictionary cursors
 }
 
-# Helper function to connect to the database
-def get_db_connection():
+# Data access layer: an aiomysql pool (DB_MODE=async, default) or the
+# blocking pymysql pool run in the threadpool (DB_MODE=sync)
+database = create_database(db_config)
+
+# Loads data.sql into an empty database after startup
+seed_loader = SeedLoader()
+
+# Encoded GET responses, per table namespace; writes through this API invalidate them
+read_cache = create_read_cache()
+READ_CACHE_NAMESPACES = ("patients", "medical_tests", "diagnosis")
+
+# Page sizes for the keyset-paginated list endpoints
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+# Maximum page size / id list length for GET /patient_records
+PATIENT_RECORDS_PAGE_MAX = int(os.getenv("PATIENT_RECORDS_PAGE_MAX", "10000"))
+# Rows pulled from the server-side cursor per chunk in streaming mode
+STREAM_FETCH_SIZE = int(os.getenv("STREAM_FETCH_SIZE", "1000"))
+# Rows per multi-row INSERT and maximum rows per request on the bulk endpoints
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+# Concurrent POST /predict calls are scored together: batches of up to this
+# many records, started at most this long after their first record arrived
+# (a size of 1 scores every call on its own)
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+PREDICT_BATCH_MAX_IN_FLIGHT = int(os.getenv("PREDICT_BATCH_MAX_IN_FLIGHT", "2"))
+
+# Check out a pooled connection, mapping pool/driver failures to HTTP errors
+async def checkout_db_connection():
+    start = time.perf_counter()
     try:
-        connection = pymysql.connect(**db_config)
-        return connection
+        return await database.checkout()
+    except PoolExhaustedError as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {str(e)}")
     except pymysql.Error as e:
         raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
+    finally:
+        DB_ACQUIRE_SECONDS.observe(time.perf_counter() - start)
 
-# Function to execute SQL from a file
-def execute_sql_file(sql_file: str):
-    connection = get_db_connection()
-    cursor = connection.cursor()
+# Helper to check out a pooled database connection for one request
+@asynccontextmanager
+async def get_db_connection():
+    connection = await checkout_db_connection()
     try:
-        with open(sql_file, 'r') as file:
-            sql_script = file.read()
-
-        # Split the SQL script into individual statements
-        sql_statements = [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]
-
-        # Execute each statement one by one
-        for statement in sql_statements:
-            try:
-                cursor.execute(statement)
-                connection.commit()
-            except pymysql.err.OperationalError as e:
-                # Ignore "database exists" (1007) and "table already exists" (1050) errors
-                if e.args[0] == 1007 or e.args[0] == 1050:
-                    print(f"Ignoring error: {str(e)}")
-                else:
-                    raise e  # Re-raise other errors
-            except pymysql.err.ProgrammingError as e:
-                # Ignore other programming errors (e.g., syntax errors)
-                print(f"Ignoring error: {str(e)}")
-
-        print(f"Executed SQL file: {sql_file}")
-    except Exception as e:
-        print(f"Error executing SQL file {sql_file}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error executing SQL file: {str(e)}")
+        yield connection
     finally:
-        cursor.close()
-        connection.close()
+        await database.release(connection)
 
-# Execute schema.sql and data.sql on startup
+# Apply pending schema migrations on startup; seed data is loaded once, in
+# the background, so the API starts serving without waiting for it
 @app.on_event("startup")
 def initialize_database():
     try:
-        print("Initializing database...")
-        # Execute schema.sql to create tables
-        execute_sql_file("sqlSchema.sql")
-        # Execute data.sql to insert data
-        execute_sql_file("data.sql")
-        print("Database initialization complete!")
-    except Exception as e:
+        applied = run_migrations(db_config)
+        print(f"Database schema up to date ({len(applied)} migrations applied)")
+    except (MigrationError, pymysql.Error) as e:
         print(f"Database initialization failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Database initialization failed: {str(e)}")
+        raise
+    loop = asyncio.get_running_loop()
+
+    # Whoever loaded the data (this process, another worker, MySQL's init
+    # scripts or a loader that predates feature_vectors), write the vectors
+    # still missing; pages cached before it committed (e.g. in a shared
+    # Redis) may show the empty tables, so drop them.
+    def after_seed(status):
+        try:
+            connection = pymysql.connect(**db_config)
+            try:
+                backfill(connection, only_missing=True)
+            finally:
+                connection.close()
+        except pymysql.Error as e:
+            print(f"Missing feature vectors not written, run backfill_feature_vectors.py: {str(e)}")
+        asyncio.run_coroutine_threadsafe(read_cache.invalidate(*READ_CACHE_NAMESPACES), loop).result()
+
+    seed_loader.start(db_config, on_settled=after_seed)
+
+# Open the connection pool once the schema exists
+@app.on_event("startup")
+async def open_database_pool():
+    await database.open()
+    print(f"Database pool ready (mode: {database.mode})")
+
+# Load the prediction model once per process, unless gunicorn_conf.py
+# already loaded it in the master before forking this worker
+@app.on_event("startup")
+def load_prediction_model():
+    if model_service.loaded:
+        return
+    try:
+        model_service.load()
+    except (OSError, ValueError) as e:
+        print(f"Prediction model not loaded, /predict disabled: {str(e)}")
+
+# Close pooled connections on shutdown
+@app.on_event("shutdown")
+async def close_database_pool():
+    await database.close()
+
+# Pool usage (in-use, idle, wait time) for monitoring
+@app.get("/pool/stats")
+async def get_pool_stats():
+    return database.stats()
+
+# Connections in use and idle, read when /metrics is scraped
+registry.gauge(
+    "api_db_pool_connections", "Pooled database connections by state", ["state"],
+    lambda: {(state,): database.stats()[state] for state in ("in_use", "idle")},
+)
+
+# Request, database and model timings in the Prometheus text format
+@app.get("/metrics")
+async def get_metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+# Read cache hit ratio, invalidations and memory use
+@app.get("/cache/stats")
+async def get_read_cache_stats():
+    if read_cache.enabled and read_cache.backend.blocking:
+        return await run_in_threadpool(read_cache.stats)
+    return read_cache.stats()
+
+# Applied schema migrations and the state of the seed data load
+@app.get("/migrations")
+async def get_migrations():
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                await cursor.execute(
+                    "SELECT version, name, applied_at, duration_ms FROM schema_migrations ORDER BY version"
+                )
+                migrations = await cursor.fetchall()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    return {"migrations": migrations, "seed": seed_loader.status}
+
+# Serve a GET body from the read cache, building it with build() on a miss.
+# Nothing is cached while this or another process is still loading the seed data.
+async def cached_response(request: Request, namespace: str, variant: str, build):
+    if seed_loader.status.get("state") in ("pending", "running", "waiting"):
+        return json_response(request, await build())
+    body, cache_key = await read_cache.get(namespace, variant)
+    if body is None:
+        body = encode_json(await build())
+        await read_cache.set(cache_key, body)
+    return encoded_response(request, body)
+
+# Read one keyset page: rows with key > after_id, in key order
+async def fetch_page(table: str, key: str, after_id: int, limit: int):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = f"SELECT * FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s"
+                await cursor.execute(query, (after_id, limit))
+                rows = await cursor.fetchall()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    # A short page means there is nothing left to read
+    next_after_id = rows[-1][key] if len(rows) == limit else None
+    return rows, next_after_id
+
+# Stream the rows of a query as NDJSON through a server-side cursor, so
+# memory stays flat however many rows match; transform reshapes each row
+async def stream_query(query: str, params, transform=None):
+    connection = await checkout_db_connection()
+
+    async def generate():
+        try:
+            async with connection.cursor(database.SSDictCursor) as cursor:
+                await cursor.execute(query, params)
+                while True:
+                    rows = await cursor.fetchmany(STREAM_FETCH_SIZE)
+                    if not rows:
+                        break
+                    if transform is not None:
+                        rows = [transform(row) for row in rows]
+                    yield b"".join(dumps(row) + b"\n" for row in rows)
+        finally:
+            await database.release(connection)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# Stream rows with key > after_id as NDJSON
+async def stream_rows(table: str, key: str, after_id: int, limit: Optional[int]):
+    query = f"SELECT * FROM {table} WHERE {key} > %s ORDER BY {key}"
+    params = (after_id,)
+    if limit is not None:
+        query += " LIMIT %s"
+        params = (after_id, limit)
+    return await stream_query(query, params)
+
+# Shared handler body for the paginated / streaming list endpoints
+async def list_rows(request: Request, table: str, key: str, result_key: str, after_id: int,
+                    limit: Optional[int], stream: bool):
+    if stream:
+        return await stream_rows(table, key, after_id, limit)
+    limit = min(limit or PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX)
+
+    async def build():
+        rows, next_after_id = await fetch_page(table, key, after_id, limit)
+        return {result_key: rows, "next_after_id": next_after_id}
+
+    return await cached_response(request, table, f"page:{after_id}:{limit}", build)
+
+# A patient's rows, newest first: rows with key < before_id (all when None).
+# Served by the (patient_id, key DESC) index as a range scan without a filesort.
+async def fetch_patient_rows(table: str, key: str, patient_id: int, before_id: Optional[int], limit: int):
+    query = f"SELECT * FROM {table} WHERE patient_id = %s"
+    params = [patient_id]
+    if before_id is not None:
+        query += f" AND {key} < %s"
+        params.append(before_id)
+    query += f" ORDER BY {key} DESC LIMIT %s"
+    params.append(limit)
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                await cursor.execute(query, params)
+                return await cursor.fetchall()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Shared handler body for the latest-row-per-patient endpoints
+async def latest_patient_row(table: str, key: str, patient_id: int, label: str):
+    rows = await fetch_patient_rows(table, key, patient_id, None, 1)
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No {label} found for patient {patient_id}")
+    return rows[0]
+
+# Shared handler body for the per-patient history endpoints
+async def patient_history(request: Request, table: str, key: str, result_key: str, patient_id: int,
+                          before_id: Optional[int], limit: Optional[int]):
+    limit = min(limit or PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX)
+
+    async def build():
+        rows = await fetch_patient_rows(table, key, patient_id, before_id, limit)
+        next_before_id = rows[-1][key] if len(rows) == limit else None
+        return {result_key: rows, "next_before_id": next_before_id}
+
+    return await cached_response(request, table, f"history:{patient_id}:{before_id}:{limit}", build)
 
 # Pydantic models for request validation
 class PatientCreate(BaseModel):
@@ -91,141 +302,486 @@ class DiagnosisCreate(BaseModel):
     patient_id: int
     diagnosis: int
 
+# Column order used when inserting each model, matching the field order above
+PATIENT_COLUMNS = ("age", "gender")
+MEDICAL_TEST_COLUMNS = (
+    "patient_id", "total_bilirubin", "direct_bilirubin", "alkaline_phosphotase",
+    "alamine_aminotransferase", "aspartate_aminotransferase", "total_proteins",
+    "albumin", "albumin_and_globulin_ratio",
+)
+DIAGNOSIS_COLUMNS = ("patient_id", "diagnosis")
+
+# Validators for whole bulk payloads, built once
+patient_list_adapter = TypeAdapter(List[PatientCreate])
+medical_test_list_adapter = TypeAdapter(List[MedicalTestCreate])
+diagnosis_list_adapter = TypeAdapter(List[DiagnosisCreate])
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines")
+
+# OpenAPI request body for a bulk endpoint (the body is parsed by hand)
+def bulk_body_schema(model):
+    schema = {"type": "array", "items": model.model_json_schema()}
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema},
+        "application/x-ndjson": {"schema": schema},
+    }}}
+
+# Parse a JSON array or NDJSON body and validate every record in one pass
+async def parse_bulk_body(request: Request, adapter: TypeAdapter):
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in NDJSON_MEDIA_TYPES:
+            try:
+                items = [json.loads(line) for line in body.splitlines() if line.strip()]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid NDJSON: {str(e)}")
+            records = adapter.validate_python(items)
+        else:
+            records = adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    if not records:
+        raise HTTPException(status_code=400, detail="Request body contains no records")
+    if len(records) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} records per request")
+    return records
+
+# Insert records with one multi-row INSERT per chunk, all inside one transaction;
+# after_chunk(cursor, chunk, ids) writes dependent rows in the same transaction.
+# Returns the generated IDs in input order.
+async def bulk_insert(table: str, columns, records, chunk_size: int, after_chunk=None):
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    ids = []
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                await cursor.execute("SELECT @@SESSION.auto_increment_increment AS step")
+                step = (await cursor.fetchone())["step"]
+                for start in range(0, len(records), chunk_size):
+                    chunk = records[start:start + chunk_size]
+                    # The statement is built explicitly (rather than left to
+                    # executemany's rewriting) so each chunk is exactly one
+                    # INSERT and LAST_INSERT_ID() maps onto its rows
+                    query = (
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                        + ", ".join([row_placeholder] * len(chunk))
+                    )
+                    params = [getattr(record, column) for record in chunk for column in columns]
+                    await cursor.execute(query, params)
+                    # A single multi-row INSERT with no explicit IDs is a "simple
+                    # insert": InnoDB knows its row count up front and reserves the
+                    # whole range of IDs at once, in every innodb_autoinc_lock_mode
+                    # (0, 1 and 2), so concurrent inserts cannot interleave with
+                    # it. LAST_INSERT_ID() is the first of them and the rest follow
+                    # at auto_increment_increment steps. INSERT ... SELECT,
+                    # INSERT ... ON DUPLICATE KEY UPDATE and rows with explicit
+                    # IDs give no such guarantee, which is why they are not used here.
+                    if cursor.rowcount != len(chunk):
+                        raise RuntimeError(f"Inserted {cursor.rowcount} of {len(chunk)} rows")
+                    first_id = cursor.lastrowid
+                    chunk_ids = range(first_id, first_id + len(chunk) * step, step)
+                    if after_chunk is not None:
+                        await after_chunk(cursor, chunk, chunk_ids)
+                    ids.extend(chunk_ids)
+                await connection.commit()
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    await read_cache.invalidate(table)
+    return ids
+
+# Write the feature_vectors rows of new medical tests (dicts with test_id) in
+# the caller's transaction
+async def write_feature_vectors(cursor, tests):
+    patient_ids = sorted({test["patient_id"] for test in tests})
+    await cursor.execute(select_patients_query(len(patient_ids)), patient_ids)
+    patients = {row["patient_id"]: row for row in await cursor.fetchall()}
+    rows = vector_rows(tests, patients)
+    if rows:
+        await cursor.execute(upsert_query(len(rows)), [value for row in rows for value in row])
+
+# bulk_insert hook for medical tests
+async def write_chunk_feature_vectors(cursor, tests, test_ids):
+    await write_feature_vectors(cursor, [
+        dict(test.model_dump(), test_id=test_id) for test, test_id in zip(tests, test_ids)
+    ])
+
 # Create (POST) - Add a new patient
 @app.post("/patients/")
-def create_patient(patient: PatientCreate):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "INSERT INTO patients (age, gender) VALUES (%s, %s)"
-        cursor.execute(query, (patient.age, patient.gender))
-        connection.commit()
-        return {"message": "Patient created successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def create_patient(patient: PatientCreate):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = "INSERT INTO patients (age, gender) VALUES (%s, %s)"
+                await cursor.execute(query, (patient.age, patient.gender))
+                await connection.commit()
+                await read_cache.invalidate("patients")
+                return {"message": "Patient created successfully"}
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-# Read (GET) - Get all patients
+# Create (POST) - Add many patients in one transaction (JSON array or NDJSON)
+@app.post("/patients/bulk", openapi_extra=bulk_body_schema(PatientCreate))
+async def create_patients_bulk(request: Request, chunk_size: Optional[int] = Query(None, ge=1, le=10000)):
+    patients = await parse_bulk_body(request, patient_list_adapter)
+    ids = await bulk_insert("patients", PATIENT_COLUMNS, patients, chunk_size or BULK_CHUNK_SIZE)
+    return {"message": f"{len(ids)} patients created successfully", "patient_ids": ids}
+
+# Read (GET) - Get patients, one keyset page at a time (or streamed)
 @app.get("/patients/")
-def get_patients():
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "SELECT * FROM patients"
-        cursor.execute(query)
-        patients = cursor.fetchall()
-        return {"patients": patients}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def get_patients(
+    request: Request,
+    after_id: int = Query(0, ge=0, description="Return rows with patient_id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX}); no limit when streaming"),
+    stream: bool = Query(False, description="Stream all matching rows as NDJSON"),
+):
+    return await list_rows(request, "patients", "patient_id", "patients", after_id, limit, stream)
 
 # Update (PUT) - Update a patient
 @app.put("/patients/{patient_id}")
-def update_patient(patient_id: int, patient: PatientCreate):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "UPDATE patients SET age = %s, gender = %s WHERE patient_id = %s"
-        cursor.execute(query, (patient.age, patient.gender, patient_id))
-        connection.commit()
-        return {"message": "Patient updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def update_patient(patient_id: int, patient: PatientCreate):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = "UPDATE patients SET age = %s, gender = %s WHERE patient_id = %s"
+                await cursor.execute(query, (patient.age, patient.gender, patient_id))
+                # The patient's columns of every stored feature vector, in the same transaction
+                await cursor.execute(
+                    REFRESH_PATIENT_VECTORS, patient_values(patient.age, patient.gender) + (patient_id,)
+                )
+                await connection.commit()
+                await read_cache.invalidate("patients")
+                return {"message": "Patient updated successfully"}
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 # Delete (DELETE) - Delete a patient
 @app.delete("/patients/{patient_id}")
-def delete_patient(patient_id: int):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "DELETE FROM patients WHERE patient_id = %s"
-        cursor.execute(query, (patient_id,))
-        connection.commit()
-        return {"message": "Patient deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def delete_patient(patient_id: int):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = "DELETE FROM patients WHERE patient_id = %s"
+                await cursor.execute(query, (patient_id,))
+                await connection.commit()
+                await read_cache.invalidate("patients")
+                return {"message": "Patient deleted successfully"}
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 # Create (POST) - Add a new medical test
 @app.post("/medical_tests/")
-def create_medical_test(test: MedicalTestCreate):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = """
-        INSERT INTO medical_tests (
-            patient_id, total_bilirubin, direct_bilirubin, alkaline_phosphotase,
-            alamine_aminotransferase, aspartate_aminotransferase, total_proteins,
-            albumin, albumin_and_globulin_ratio
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(query, (
-            test.patient_id, test.total_bilirubin, test.direct_bilirubin,
-            test.alkaline_phosphotase, test.alamine_aminotransferase,
-            test.aspartate_aminotransferase, test.total_proteins,
-            test.albumin, test.albumin_and_globulin_ratio
-        ))
-        connection.commit()
-        return {"message": "Medical test created successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def create_medical_test(test: MedicalTestCreate):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = """
+                INSERT INTO medical_tests (
+                    patient_id, total_bilirubin, direct_bilirubin, alkaline_phosphotase,
+                    alamine_aminotransferase, aspartate_aminotransferase, total_proteins,
+                    albumin, albumin_and_globulin_ratio
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                await cursor.execute(query, (
+                    test.patient_id, test.total_bilirubin, test.direct_bilirubin,
+                    test.alkaline_phosphotase, test.alamine_aminotransferase,
+                    test.aspartate_aminotransferase, test.total_proteins,
+                    test.albumin, test.albumin_and_globulin_ratio
+                ))
+                await write_feature_vectors(cursor, [dict(test.model_dump(), test_id=cursor.lastrowid)])
+                await connection.commit()
+                await read_cache.invalidate("medical_tests")
+                return {"message": "Medical test created successfully"}
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-# Read (GET) - Get all medical tests
+# Create (POST) - Add many medical tests in one transaction (JSON array or NDJSON)
+@app.post("/medical_tests/bulk", openapi_extra=bulk_body_schema(MedicalTestCreate))
+async def create_medical_tests_bulk(request: Request, chunk_size: Optional[int] = Query(None, ge=1, le=10000)):
+    tests = await parse_bulk_body(request, medical_test_list_adapter)
+    ids = await bulk_insert("medical_tests", MEDICAL_TEST_COLUMNS, tests, chunk_size or BULK_CHUNK_SIZE,
+                            after_chunk=write_chunk_feature_vectors)
+    return {"message": f"{len(ids)} medical tests created successfully", "test_ids": ids}
+
+# Read (GET) - Get medical tests, one keyset page at a time (or streamed)
 @app.get("/medical_tests/")
-def get_medical_tests():
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "SELECT * FROM medical_tests"
-        cursor.execute(query)
-        tests = cursor.fetchall()
-        return {"medical_tests": tests}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def get_medical_tests(
+    request: Request,
+    after_id: int = Query(0, ge=0, description="Return rows with test_id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX}); no limit when streaming"),
+    stream: bool = Query(False, description="Stream all matching rows as NDJSON"),
+):
+    return await list_rows(request, "medical_tests", "test_id", "medical_tests", after_id, limit, stream)
+
+# Read (GET) - Most recent medical test of a patient
+@app.get("/medical_tests/patient/{patient_id}")
+async def get_latest_medical_test(patient_id: int):
+    return await latest_patient_row("medical_tests", "test_id", patient_id, "medical test")
+
+# Read (GET) - A patient's medical tests, newest first, one keyset page at a time
+@app.get("/medical_tests/patient/{patient_id}/history")
+async def get_medical_test_history(
+    request: Request,
+    patient_id: int,
+    before_id: Optional[int] = Query(None, ge=1, description="Return tests with test_id less than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX})"),
+):
+    return await patient_history(request, "medical_tests", "test_id", "medical_tests", patient_id, before_id, limit)
 
 # Create (POST) - Add a new diagnosis
 @app.post("/diagnosis/")
-def create_diagnosis(diagnosis: DiagnosisCreate):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        query = "INSERT INTO diagnosis (patient_id, diagnosis) VALUES (%s, %s)"
-        cursor.execute(query, (diagnosis.patient_id, diagnosis.diagnosis))
-        connection.commit()
-        return {"message": "Diagnosis created successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+async def create_diagnosis(diagnosis: DiagnosisCreate):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                query = "INSERT INTO diagnosis (patient_id, diagnosis) VALUES (%s, %s)"
+                await cursor.execute(query, (diagnosis.patient_id, diagnosis.diagnosis))
+                await connection.commit()
+                await read_cache.invalidate("diagnosis")
+                return {"message": "Diagnosis created successfully"}
+            except Exception as e:
+                await connection.rollback()
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Create (POST) - Add many diagnoses in one transaction (JSON array or NDJSON)
+@app.post("/diagnosis/bulk", openapi_extra=bulk_body_schema(DiagnosisCreate))
+async def create_diagnoses_bulk(request: Request, chunk_size: Optional[int] = Query(None, ge=1, le=10000)):
+    diagnoses = await parse_bulk_body(request, diagnosis_list_adapter)
+    ids = await bulk_insert("diagnosis", DIAGNOSIS_COLUMNS, diagnoses, chunk_size or BULK_CHUNK_SIZE)
+    return {"message": f"{len(ids)} diagnoses created successfully", "diagnosis_ids": ids}
 
-# Read (GET) - Get all diagnoses
+# Read (GET) - Get diagnoses, one keyset page at a time (or streamed)
 @app.get("/diagnosis/")
-def get_diagnoses():
-    connection = get_db_connection()
-    cursor = connection.cursor()
+async def get_diagnoses(
+    request: Request,
+    after_id: int = Query(0, ge=0, description="Return rows with diagnosis_id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX}); no limit when streaming"),
+    stream: bool = Query(False, description="Stream all matching rows as NDJSON"),
+):
+    return await list_rows(request, "diagnosis", "diagnosis_id", "diagnoses", after_id, limit, stream)
+
+# Read (GET) - Most recent diagnosis of a patient
+@app.get("/diagnosis/patient/{patient_id}")
+async def get_latest_diagnosis(patient_id: int):
+    return await latest_patient_row("diagnosis", "diagnosis_id", patient_id, "diagnosis")
+
+# Read (GET) - A patient's diagnoses, newest first, one keyset page at a time
+@app.get("/diagnosis/patient/{patient_id}/history")
+async def get_diagnosis_history(
+    request: Request,
+    patient_id: int,
+    before_id: Optional[int] = Query(None, ge=1, description="Return diagnoses with diagnosis_id less than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX})"),
+):
+    return await patient_history(request, "diagnosis", "diagnosis_id", "diagnoses", patient_id, before_id, limit)
+
+# Patient plus latest medical test and latest diagnosis, in one statement.
+# The correlated MAX() lookups are single index dives on the
+# (patient_id, id DESC) indexes; patients without a test or diagnosis are
+# still returned, with null for the missing part.
+PATIENT_RECORD_TEST_FIELDS = ("test_id",) + MEDICAL_TEST_COLUMNS[1:]
+PATIENT_RECORD_DIAGNOSIS_FIELDS = ("diagnosis_id", "diagnosis")
+PATIENT_RECORD_QUERY = (
+    "SELECT p.patient_id, p.age, p.gender, "
+    + ", ".join(f"t.{field}" for field in PATIENT_RECORD_TEST_FIELDS) + ", "
+    + ", ".join(f"d.{field}" for field in PATIENT_RECORD_DIAGNOSIS_FIELDS)
+    + " FROM patients p"
+    " LEFT JOIN medical_tests t ON t.test_id ="
+    " (SELECT MAX(test_id) FROM medical_tests WHERE patient_id = p.patient_id)"
+    " LEFT JOIN diagnosis d ON d.diagnosis_id ="
+    " (SELECT MAX(diagnosis_id) FROM diagnosis WHERE patient_id = p.patient_id)"
+)
+
+# Nest one flat joined row into {patient fields, "medical_test": {...}, "diagnosis": {...}}
+def patient_record(row):
+    record = {"patient_id": row["patient_id"], "age": row["age"], "gender": row["gender"]}
+    record["medical_test"] = (
+        {field: row[field] for field in PATIENT_RECORD_TEST_FIELDS} if row["test_id"] is not None else None
+    )
+    record["diagnosis"] = (
+        {field: row[field] for field in PATIENT_RECORD_DIAGNOSIS_FIELDS} if row["diagnosis_id"] is not None else None
+    )
+    return record
+
+async def fetch_patient_records(query: str, params):
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    return [patient_record(row) for row in rows]
+
+# Comma-separated patient IDs, e.g. "3,17,42"
+def parse_id_list(ids: str):
     try:
-        query = "SELECT * FROM diagnosis"
-        cursor.execute(query)
-        diagnoses = cursor.fetchall()
-        return {"diagnoses": diagnoses}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
+        parsed = sorted({int(part) for part in ids.split(",") if part.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids contains no patient IDs")
+    if len(parsed) > PATIENT_RECORDS_PAGE_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {PATIENT_RECORDS_PAGE_MAX} ids per request")
+    return parsed
+
+# Read (GET) - Patients with their latest medical test and diagnosis, either
+# the listed ids or one keyset page of patient_id > after_id (or streamed)
+@app.get("/patient_records")
+async def get_patient_records(
+    request: Request,
+    ids: Optional[str] = Query(None, description=f"Comma-separated patient IDs (at most {PATIENT_RECORDS_PAGE_MAX})"),
+    after_id: int = Query(0, ge=0, description="Return patients with patient_id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PATIENT_RECORDS_PAGE_MAX}); no limit when streaming"),
+    stream: bool = Query(False, description="Stream all matching records as NDJSON"),
+):
+    if ids is not None:
+        patient_ids = parse_id_list(ids)
+        placeholders = ", ".join(["%s"] * len(patient_ids))
+        query = f"{PATIENT_RECORD_QUERY} WHERE p.patient_id IN ({placeholders}) ORDER BY p.patient_id"
+        if stream:
+            return await stream_query(query, patient_ids, patient_record)
+        return json_response(request, {"patient_records": await fetch_patient_records(query, patient_ids),
+                                       "next_after_id": None})
+
+    query = f"{PATIENT_RECORD_QUERY} WHERE p.patient_id > %s ORDER BY p.patient_id"
+    if stream:
+        if limit is None:
+            return await stream_query(query, (after_id,), patient_record)
+        return await stream_query(query + " LIMIT %s", (after_id, limit), patient_record)
+    limit = min(limit or PAGE_SIZE_DEFAULT, PATIENT_RECORDS_PAGE_MAX)
+    records = await fetch_patient_records(query + " LIMIT %s", (after_id, limit))
+    next_after_id = records[-1]["patient_id"] if len(records) == limit else None
+    return json_response(request, {"patient_records": records, "next_after_id": next_after_id})
+
+# Read (GET) - The most recently added patient with latest test and diagnosis
+@app.get("/patient_records/latest")
+async def get_latest_patient_record():
+    records = await fetch_patient_records(f"{PATIENT_RECORD_QUERY} ORDER BY p.patient_id DESC LIMIT 1", ())
+    if not records:
+        raise HTTPException(status_code=404, detail="No patients found")
+    return records[0]
+
+# Input for the prediction endpoints: demographics plus one set of test results
+class PredictionRequest(BaseModel):
+    age: int
+    gender: str
+    total_bilirubin: float
+    direct_bilirubin: float
+    alkaline_phosphotase: float
+    alamine_aminotransferase: float
+    aspartate_aminotransferase: float
+    total_proteins: float
+    albumin: float
+    albumin_and_globulin_ratio: float
+
+# Score records in the threadpool so large batches do not block the event loop
+async def score_records(records: List[PredictionRequest]):
+    if not model_service.loaded:
+        raise HTTPException(status_code=503, detail="Prediction model is not loaded")
+    labels, probabilities, model_seconds = await run_in_threadpool(
+        model_service.predict, [record.model_dump() for record in records]
+    )
+    predictions = [
+        {"prediction": int(label), "probability": float(probability)}
+        for label, probability in zip(labels, probabilities)
+    ]
+    return predictions, model_seconds
+
+# Blocking scorer behind the micro-batcher: one predict_proba call per batch
+def predict_records(records):
+    labels, probabilities, _ = model_service.predict(records)
+    return [
+        {"prediction": int(label), "probability": float(probability)}
+        for label, probability in zip(labels, probabilities)
+    ]
+
+prediction_batcher = MicroBatcher(
+    predict_records, PREDICT_BATCH_MAX_SIZE, PREDICT_BATCH_MAX_WAIT_MS, PREDICT_BATCH_MAX_IN_FLIGHT
+)
+registry.gauge(
+    "api_predict_batcher_pending", "Records waiting for the next micro-batch", [],
+    lambda: {(): prediction_batcher.stats()["pending"]},
+)
+
+# Predict (POST) - Score a single patient record, batched with concurrent calls
+@app.post("/predict")
+async def predict(record: PredictionRequest):
+    if PREDICT_BATCH_MAX_SIZE <= 1:
+        predictions, _ = await score_records([record])
+        return predictions[0]
+    if not model_service.loaded:
+        raise HTTPException(status_code=503, detail="Prediction model is not loaded")
+    return await prediction_batcher.submit(record.model_dump())
+
+# Score stored feature vectors (one query, no preprocessing); columns are
+# selected in the model's feature order. A test without a vector (written
+# by something that does not maintain feature_vectors) is read from
+# medical_tests and patients and preprocessed instead.
+async def predict_stored_vectors(where: str, raw_where: str, params, label: str):
+    if not model_service.loaded:
+        raise HTTPException(status_code=503, detail="Prediction model is not loaded")
+    columns = model_service.feature_columns()
+    query = f"SELECT test_id, patient_id, {', '.join(columns)} FROM feature_vectors {where}"
+    raw_query = ("SELECT t.*, p.age, p.gender FROM medical_tests t "
+                 f"JOIN patients p ON p.patient_id = t.patient_id {raw_where}")
+    async with get_db_connection() as connection:
+        async with connection.cursor() as cursor:
+            try:
+                await cursor.execute(query, params)
+                row = await cursor.fetchone()
+                record = None
+                if row is None:
+                    await cursor.execute(raw_query, params)
+                    record = await cursor.fetchone()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    if row is not None:
+        labels, probabilities, _ = await run_in_threadpool(
+            model_service.predict_matrix, [[row[column] for column in columns]]
+        )
+    elif record is not None:
+        row = record
+        labels, probabilities, _ = await run_in_threadpool(model_service.predict, [record])
+    else:
+        raise HTTPException(status_code=404, detail=f"No medical test found for {label}")
+    return {"test_id": row["test_id"], "patient_id": row["patient_id"],
+            "prediction": int(labels[0]), "probability": float(probabilities[0])}
+
+# Predict (GET) - Score a stored medical test by ID
+@app.get("/predict/tests/{test_id}")
+async def predict_test(test_id: int):
+    return await predict_stored_vectors("WHERE test_id = %s", "WHERE t.test_id = %s", (test_id,), f"test {test_id}")
+
+# Predict (GET) - Score a patient's latest medical test
+@app.get("/predict/patients/{patient_id}")
+async def predict_patient(patient_id: int):
+    return await predict_stored_vectors(
+        "WHERE patient_id = %s ORDER BY test_id DESC LIMIT 1",
+        "WHERE t.patient_id = %s ORDER BY t.test_id DESC LIMIT 1",
+        (patient_id,), f"patient {patient_id}",
+    )
+
+# Micro-batcher batch sizes and queue state
+@app.get("/predict/batcher/stats")
+async def get_prediction_batcher_stats():
+    return prediction_batcher.stats()
+
+# Prediction cache hit/miss counters
+@app.get("/predict/cache/stats")
+async def get_prediction_cache_stats():
+    return model_service.cache.stats()
+
+# Predict (POST) - Score many records with one vectorized predict_proba call
+@app.post("/predict/batch")
+async def predict_batch(records: List[PredictionRequest]):
+    if not records:
+        raise HTTPException(status_code=400, detail="Request body contains no records")
+    predictions, model_seconds = await score_records(records)
+    return {"predictions": predictions, "model_time_ms": model_seconds * 1000}
@@ -0,0 +1,420 @@
+"""
+Request, database and model instrumentation, exposed in the Prometheus text format.
+
+Metrics are plain in-process histograms and counters: an observation is a
+bisect over the bucket bounds and two increments under a lock, cheap enough
+to leave on for every request. The per-request path is kept to a handful of
+observations: buffered fetches (an in-memory read of a result that execute
+already received) only count rows. GET /metrics renders them in the text format
+Prometheus scrapes (version 0.0.4).
+
+What is measured:
+- every request, by method, route template and status, from reaching the
+  app to the last byte of the body sent (MetricsMiddleware)
+- the wait for a pooled database connection
+- each statement's execute time and the rows it returned, by statement
+  ("select patients", "insert medical_tests", "commit", ...), and the fetch
+  time of streaming cursors, from the cursors of database.py
+  (TimedCursorMixin)
+- JSON serialization and compression of the list responses
+- feature building and model inference time, and the rows in each batch
+  scored (with micro-batching on, the size of each micro-batch)
+
+Set METRICS_ENABLED=0 to turn it off: the middleware is not installed and
+every observation is a no-op, so /metrics has only the gauges. Under
+gunicorn every worker keeps its own metrics, and a scrape reaches one worker.
+"""
+import bisect
+import os
+import re
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Upper bounds in seconds, 0.5 ms to 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Rows per batch
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+# Media type of GET /metrics; the response adds "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A named metric with one child per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The child for these label values, in labelnames order"""
+        if not METRICS_ENABLED:
+            return _NULL_CHILD
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+
+class _NullChild:
+    # Returned for every label set while METRICS_ENABLED is off
+    __slots__ = ()
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+_NULL_CHILD = _NullChild()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        # acquire/release rather than a with block, which costs twice as much
+        lock = self._lock
+        lock.acquire()
+        self.counts[index] += 1
+        self.sum += value
+        lock.release()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed upper bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        """Observe on the histogram without labels"""
+        self.labels().observe(value)
+
+    def _samples(self, values, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _label_text(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        lock = self._lock
+        lock.acquire()
+        self.value += amount
+        lock.release()
+
+
+class Counter(_Metric):
+    """Monotonically increasing total; the name should end in _total"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self, values, child):
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    """
+    Current values, read from a callback when /metrics is rendered.
+
+    Args:
+        read: Callable returning {label values tuple: value}
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, read):
+        super().__init__(name, documentation, labelnames)
+        self.read = read
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.read()
+        except Exception:
+            # A failing source leaves the gauge empty rather than breaking the scrape
+            samples = {}
+        for values, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """The metrics rendered by GET /metrics"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames, read):
+        return self._add(Gauge(name, documentation, labelnames, read))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "api_request_duration_seconds", "Time from request to the end of the response body",
+    ["method", "route", "status"],
+)
+DB_ACQUIRE_SECONDS = registry.histogram(
+    "api_db_acquire_seconds", "Wait for a pooled database connection",
+)
+DB_EXECUTE_SECONDS = registry.histogram(
+    "api_db_execute_seconds", "Time in cursor.execute, commit and rollback, by statement", ["statement"],
+)
+DB_FETCH_SECONDS = registry.histogram(
+    "api_db_fetch_seconds", "Time in fetch calls of streaming cursors, by statement", ["statement"],
+)
+DB_ROWS = registry.counter(
+    "api_db_rows_returned_total", "Rows fetched, by statement", ["statement"],
+)
+ENCODE_SECONDS = registry.histogram(
+    "api_response_encode_seconds", "JSON serialization and compression of list responses", ["stage"],
+)
+MODEL_FEATURES_SECONDS = registry.histogram(
+    "api_model_features_seconds", "Feature matrix building per scored batch",
+)
+MODEL_INFERENCE_SECONDS = registry.histogram(
+    "api_model_inference_seconds", "Model scoring per batch, by scorer class", ["scorer"],
+)
+MODEL_BATCH_ROWS = registry.histogram(
+    "api_model_batch_rows", "Rows per scored batch", buckets=SIZE_BUCKETS,
+)
+
+
+# Verb and first table of a statement, e.g. "select patients"; derived
+# tables are skipped to the next FROM
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+`?(\w+)", re.IGNORECASE)
+
+
+def statement_name(query):
+    """Bounded label for a SQL statement: its verb and table"""
+    words = query.split(None, 1)
+    verb = words[0].lower() if words else "unknown"
+    match = _TABLE_PATTERN.search(query)
+    return f"{verb} {match.group(1).lower()}" if match else verb
+
+
+class _Statement:
+    """The metric children of one statement name"""
+
+    __slots__ = ("execute", "fetch", "rows")
+
+    def __init__(self, name):
+        self.execute = DB_EXECUTE_SECONDS.labels(name)
+        self.fetch = DB_FETCH_SECONDS.labels(name)
+        self.rows = DB_ROWS.labels(name)
+
+
+_NULL_STATEMENT = _Statement.__new__(_Statement)
+_NULL_STATEMENT.execute = _NULL_STATEMENT.fetch = _NULL_STATEMENT.rows = _NULL_CHILD
+
+
+# By query text, so a repeated query costs one dict lookup; queries with
+# per-call placeholder counts (bulk INSERTs, IN lists) stop being
+# remembered past this many
+_STATEMENTS_MAX = 4096
+_statements = {}
+
+
+def statement_metrics(query):
+    """The metric children a query is observed on"""
+    if not METRICS_ENABLED:
+        return _NULL_STATEMENT
+    statement = _statements.get(query)
+    if statement is None:
+        statement = _Statement(statement_name(query))
+        if len(_statements) < _STATEMENTS_MAX:
+            _statements[query] = statement
+    return statement
+
+
+class TimedCursorMixin:
+    """
+    Times execute calls and counts the rows fetched, for the awaitable
+    cursors of database.py: mixed into aiomysql's cursor classes and the
+    threaded pymysql facade, so it adds no wrapper around them.
+
+    Fetches are timed only on streaming cursors (time_fetch = True); a
+    buffered cursor has the whole result once execute returns.
+    """
+
+    time_fetch = False
+    _statement = None
+
+    async def execute(self, query, args=None):
+        self._statement = statement = statement_metrics(query)
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, args)
+        finally:
+            statement.execute.observe(time.perf_counter() - start)
+
+    async def fetchone(self):
+        if not self.time_fetch:
+            row = await super().fetchone()
+        else:
+            start = time.perf_counter()
+            row = await super().fetchone()
+            self._statement.fetch.observe(time.perf_counter() - start)
+        if row is not None:
+            self._statement.rows.inc()
+        return row
+
+    async def fetchmany(self, size=None):
+        if not self.time_fetch:
+            rows = await super().fetchmany(size)
+        else:
+            start = time.perf_counter()
+            rows = await super().fetchmany(size)
+            self._statement.fetch.observe(time.perf_counter() - start)
+        self._statement.rows.inc(len(rows))
+        return rows
+
+    async def fetchall(self):
+        if not self.time_fetch:
+            rows = await super().fetchall()
+        else:
+            start = time.perf_counter()
+            rows = await super().fetchall()
+            self._statement.fetch.observe(time.perf_counter() - start)
+        self._statement.rows.inc(len(rows))
+        return rows
+
+
+async def timed_statement(name, awaitable):
+    """await awaitable (e.g. a commit), observed as statement name"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        DB_EXECUTE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing REQUEST_SECONDS for every HTTP request.
+
+    Requests are labelled with the matched route's path template
+    ("/patients/{patient_id}"), so the label set stays bounded; requests that
+    match no route are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # REQUEST_SECONDS children by (route path, method, status code), so a
+        # request skips the label lookup
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the shared scope
+            path = getattr(scope.get("route"), "path", "unmatched")
+            key = (path, scope["method"], status)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = REQUEST_SECONDS.labels(scope["method"], path, str(status))
+            child.observe(time.perf_counter() - start)
@@ -0,0 +1,133 @@
+"""
+asyncio micro-batching of single-record work.
+
+Concurrent requests that each carry one record are collected into one batch
+and scored together, which pays the per-call cost of the model (input
+validation, tree traversal setup, threadpool hop) once per batch instead of
+once per record. A batch is started as soon as max_batch_size records are
+waiting, or max_wait_ms after the first one arrived, whichever is first.
+
+At most max_in_flight batches run at a time. Records that arrive while they
+are busy keep collecting and go out as the next batch when one finishes, so
+batches grow with the load and an idle service adds at most max_wait_ms of
+latency.
+
+If a batch fails, its items are processed again one at a time, so a single
+bad record fails only its own caller.
+"""
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+
+class MicroBatcher:
+    """
+    Collects single items from concurrent callers and processes them in batches.
+
+    Args:
+        process_batch: Blocking callable taking a list of items and returning
+            a list of results in the same order; runs in the threadpool
+        max_batch_size (int): Largest batch
+        max_wait_ms (float): Longest time the first item of a batch waits for more
+        max_in_flight (int): Batches processed at the same time
+    """
+
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=2.0, max_in_flight=2):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_in_flight = max_in_flight
+        self._pending = []
+        self._timer = None
+        self._in_flight = 0
+        self._tasks = set()
+        self.items = 0
+        self.batches = 0
+        self.full_batches = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result; exceptions of the batch are raised here"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._on_timer)
+        return await future
+
+    def _on_timer(self):
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending and self._in_flight < self.max_in_flight:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            self._in_flight += 1
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            # Keep a reference so the task is not garbage collected mid-run
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # Anything left waits for a running batch to finish
+
+    async def _run(self, batch):
+        self.items += len(batch)
+        self.batches += 1
+        self.full_batches += len(batch) == self.max_batch_size
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            items = [item for item, _ in batch]
+            try:
+                results = await run_in_threadpool(self.process_batch, items)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items")
+                outcomes = [(True, result) for result in results]
+            except Exception as e:
+                self.failed_batches += 1
+                outcomes = [(False, e)] if len(batch) == 1 else await run_in_threadpool(self._process_each, items)
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                # A caller that went away has cancelled its future
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        finally:
+            self._in_flight -= 1
+            if self._pending:
+                self._flush()
+
+    def _process_each(self, items):
+        """(ok, result or exception) per item, each item processed as a batch of one"""
+        outcomes = []
+        for item in items:
+            try:
+                results = self.process_batch([item])
+                if len(results) != 1:
+                    raise RuntimeError(f"process_batch returned {len(results)} results for 1 item")
+                outcomes.append((True, results[0]))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_in_flight": self.max_in_flight,
+            "items": self.items,
+            "batches": self.batches,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "full_batches": self.full_batches,
+            "failed_batches": self.failed_batches,
+            "pending": len(self._pending),
+            "in_flight": self._in_flight,
+        }
@@ -0,0 +1,8 @@
+-- Composite indexes for per-patient lookups: the latest row for a patient
+-- and that patient's history, newest first, are index range scans with no
+-- filesort. MySQL drops the implicit single-column foreign key indexes on
+-- patient_id, since these can enforce the constraints instead.
+
+CREATE INDEX idx_medical_tests_patient_latest ON medical_tests (patient_id, test_id DESC);
+
+CREATE INDEX idx_diagnosis_patient_latest ON diagnosis (patient_id, diagnosis_id DESC);
@@ -0,0 +1,14 @@
+-- Model output per patient and model version, written by
+-- Prediction/batch_score.py with bulk upserts. Rescoring with the same model
+-- overwrites the row; a new model version adds rows next to the old ones.
+
+CREATE TABLE IF NOT EXISTS predictions (
+    patient_id INT NOT NULL,
+    model_version VARCHAR(64) NOT NULL,
+    test_id INT NULL,
+    prediction TINYINT(1) NOT NULL,
+    probability FLOAT NOT NULL,
+    scored_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (patient_id, model_version),
+    FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE
+);
@@ -0,0 +1,26 @@
+-- Model-ready feature vector of every medical test, in the order of
+-- Prediction/models/feature_names.pkl, encoded and imputed as
+-- preprocessing.build_feature_matrix does. The API writes a test's row in
+-- the same transaction as the test and rewrites age / gender_numeric when the
+-- patient is updated; Prediction/backfill_feature_vectors.py fills in rows
+-- for tests written before this table existed or by other loaders.
+
+CREATE TABLE IF NOT EXISTS feature_vectors (
+    test_id INT NOT NULL PRIMARY KEY,
+    patient_id INT NOT NULL,
+    age FLOAT NOT NULL,
+    gender_numeric FLOAT NOT NULL,
+    total_bilirubin FLOAT NOT NULL,
+    direct_bilirubin FLOAT NOT NULL,
+    alkaline_phosphotase FLOAT NOT NULL,
+    alamine_aminotransferase FLOAT NOT NULL,
+    aspartate_aminotransferase FLOAT NOT NULL,
+    total_proteins FLOAT NOT NULL,
+    albumin FLOAT NOT NULL,
+    albumin_and_globulin_ratio FLOAT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Latest vector per patient for the batch scorer: a loose index scan
+    INDEX idx_feature_vectors_patient_latest (patient_id, test_id DESC),
+    FOREIGN KEY (test_id) REFERENCES medical_tests(test_id) ON DELETE CASCADE,
+    FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE
+);
@@ -0,0 +1,186 @@
+import os
+import pickle
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from metrics import MODEL_BATCH_ROWS, MODEL_FEATURES_SECONDS, MODEL_INFERENCE_SECONDS
+
+# The Prediction module provides the shared preprocessing code and the models
+PREDICTION_DIR = os.getenv(
+    "PREDICTION_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prediction"),
+)
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(PREDICTION_DIR, "models"))
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(MODEL_DIR, "liver_model.pkl"))
+FEATURE_NAMES_PATH = os.getenv("FEATURE_NAMES_PATH", os.path.join(MODEL_DIR, "feature_names.pkl"))
+# Pickle-free artifact (see Prediction/model_artifact.py); preferred unless MODEL_PATH is newer
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", os.path.join(MODEL_DIR, "liver_model"))
+
+# Required, not optional: the API also builds feature_vectors rows with it
+if PREDICTION_DIR not in sys.path:
+    sys.path.append(PREDICTION_DIR)
+try:
+    from preprocessing import build_feature_matrix, canonical_feature_name  # noqa: E402
+    from forest_engine import ForestEvaluator, export_forest  # noqa: E402
+    from model_artifact import is_artifact, load_artifact, metadata_path, newer_model_path  # noqa: E402
+    from prediction_cache import PredictionCache, model_file_version, predict_proba_cached  # noqa: E402
+except ImportError as e:
+    raise ImportError(
+        f"The Prediction module was not found in PREDICTION_DIR={PREDICTION_DIR} ({str(e)}); "
+        "point PREDICTION_DIR at the repository's Prediction directory"
+    ) from e
+
+# Batches up to this size are scored by the NumPy forest engine, which skips
+# sklearn's per-call overhead; larger ones go to sklearn's compiled traversal.
+# Set to 0 to always use sklearn.
+FOREST_ENGINE_MAX_BATCH = int(os.getenv("FOREST_ENGINE_MAX_BATCH", "256"))
+
+# Prediction cache size (0 disables it) and entry lifetime in seconds
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+# How often (seconds) to check whether the model file was replaced
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "5"))
+
+# The matrix is built in feature_names order, so sklearn's column-name check
+# has nothing to add
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+class ModelService:
+    """Holds the liver disease model in memory and scores batches of records"""
+
+    def __init__(self):
+        self.model = None
+        self.feature_names = None
+        self.model_path = None
+        self.feature_names_path = None
+        self.model_version = None
+        self.evaluator = None
+        # Set when load() chose between MODEL_PATH and MODEL_ARTIFACT_DIR itself
+        self.pick_newer = False
+        self.cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def load(self, model_path=None, feature_names_path=FEATURE_NAMES_PATH):
+        """
+        Load the model once: the memory-mapped artifact when one exists,
+        otherwise the pickled model and feature names. Without model_path,
+        a pickle written after the artifact (retrained without exporting) is
+        loaded instead of the stale artifact.
+        """
+        pick_newer = model_path is None
+        if pick_newer:
+            model_path = newer_model_path(MODEL_PATH, MODEL_ARTIFACT_DIR)
+            if model_path == MODEL_PATH and is_artifact(MODEL_ARTIFACT_DIR):
+                print(f"{MODEL_PATH} is newer than the artifact in {MODEL_ARTIFACT_DIR}; loading the pickle")
+
+        if is_artifact(model_path):
+            version = model_file_version(metadata_path(model_path))
+            model = load_artifact(model_path)
+            feature_names = model.feature_names
+        else:
+            version = model_file_version(model_path)
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            with open(feature_names_path, 'rb') as f:
+                feature_names = list(pickle.load(f))
+
+        # Fail at startup rather than on the first request if a feature is unknown
+        for name in feature_names:
+            canonical_feature_name(name)
+
+        evaluator = None
+        if FOREST_ENGINE_MAX_BATCH > 0 and hasattr(model, "estimators_"):
+            evaluator = ForestEvaluator(export_forest(model))
+
+        self.model = model
+        self.feature_names = feature_names
+        self.model_path = model_path
+        self.feature_names_path = feature_names_path
+        self.evaluator = evaluator
+        self.model_version = version
+        self.pick_newer = pick_newer
+        self._last_check = time.monotonic()
+        print(f"Model loaded from {model_path} ({len(feature_names)} features)")
+
+    def reload_if_changed(self):
+        """
+        Reload the model when its file was replaced, or when the pickle and
+        the artifact swap places as the newer one; the cache follows the new
+        version
+        """
+        if time.monotonic() - self._last_check < MODEL_CHECK_INTERVAL:
+            return
+        with self._reload_lock:
+            if time.monotonic() - self._last_check < MODEL_CHECK_INTERVAL:
+                return
+            self._last_check = time.monotonic()
+            try:
+                model_path = self.model_path
+                if self.pick_newer:
+                    model_path = newer_model_path(MODEL_PATH, MODEL_ARTIFACT_DIR)
+                path = metadata_path(model_path) if is_artifact(model_path) else model_path
+                if model_path != self.model_path or model_file_version(path) != self.model_version:
+                    self.load(None if self.pick_newer else model_path, self.feature_names_path)
+            except (OSError, ValueError, pickle.UnpicklingError) as e:
+                # Keep serving the model already in memory
+                print(f"Model reload failed: {str(e)}")
+
+    def build_features(self, records):
+        """Feature matrix for a batch of records, via the shared preprocessing module"""
+        return build_feature_matrix(records, self.feature_names)
+
+    def predict(self, records):
+        """
+        Score a batch; cached rows are reused and the rest are scored with a
+        single predict_proba call.
+
+        Returns:
+            tuple: (labels, disease probabilities, model time in seconds)
+        """
+        self.reload_if_changed()
+        start = time.perf_counter()
+        X = self.build_features(records)
+        MODEL_FEATURES_SECONDS.observe(time.perf_counter() - start)
+        return self.predict_matrix(X)
+
+    def feature_columns(self):
+        """Canonical names of the model's features, in its column order"""
+        return [canonical_feature_name(name) for name in self.feature_names]
+
+    def predict_matrix(self, X):
+        """
+        Score a ready feature matrix in feature_columns() order, e.g. rows of
+        the feature_vectors table; same result as predict().
+        """
+        self.reload_if_changed()
+        # Read everything from one snapshot in case a reload swaps the model
+        model, evaluator, version = self.model, self.evaluator, self.model_version
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        scorer = model
+        if evaluator is not None and len(X) <= FOREST_ENGINE_MAX_BATCH:
+            scorer = evaluator
+        start = time.perf_counter()
+        probabilities = predict_proba_cached(self.cache, scorer, X, version)
+        elapsed = time.perf_counter() - start
+        # Labelled ForestEvaluator, ModelArtifact or the sklearn estimator's class
+        MODEL_INFERENCE_SECONDS.labels(type(scorer).__name__).observe(elapsed)
+        MODEL_BATCH_ROWS.observe(len(X))
+
+        classes = list(model.classes_)
+        positive = probabilities[:, classes.index(1)]
+        labels = model.classes_[probabilities.argmax(axis=1)]
+        return labels.astype(int), positive, elapsed
+
+
+model_service = ModelService()
@@ -0,0 +1,275 @@
+"""
+Read-through cache for the GET endpoints.
+
+Cached values are the encoded JSON bodies, so a hit skips both the query
+and serialization. Entries live in a namespace per table. Each namespace
+has a generation number that is part of every key in it; a write bumps the
+generation, which invalidates all of the namespace's entries at once without
+finding or deleting them (old entries are evicted by LRU or expire).
+
+The key a miss is stored under carries the generation read *before* the
+query ran, so a page read while a write commits is stored under the old
+generation and never served.
+
+Backends:
+- LRUBackend: in-process, bounded by entries and bytes. Each worker process
+  has its own copy and only sees its own writes, so it is only used with a
+  single worker; with more, caching is off unless Redis is configured.
+- RedisBackend: any client with get / set(ex=) / incr, e.g. redis.Redis or
+  fakeredis.FakeRedis, shared by all workers.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import redis
+except ImportError:  # Only needed when READ_CACHE_BACKEND=redis
+    redis = None
+
+# Backend (lru, redis or none), entry lifetime in seconds (0 keeps entries until evicted) and LRU bounds
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND", "lru")
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "60"))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+READ_CACHE_MAX_BYTES = int(os.getenv("READ_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Seconds to wait for Redis before a request goes on uncached
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+READ_CACHE_PREFIX = os.getenv("READ_CACHE_PREFIX", "liver-api")
+# Server processes sharing the database; uvicorn --workers and gunicorn_conf.py read the same variable
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class LRUBackend:
+    """
+    In-process LRU of bytes values.
+
+    Args:
+        max_entries (int): Maximum number of cached values
+        max_bytes (int): Maximum total size of keys and values
+    """
+
+    name = "lru"
+    # Calls are plain dict operations; they run on the event loop
+    blocking = False
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and now >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, value = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class RedisBackend:
+    """
+    Values in Redis (or anything speaking its get / set / incr API).
+
+    Args:
+        client: redis.Redis, fakeredis.FakeRedis or similar, returning bytes
+    """
+
+    name = "redis"
+    # Every call is a network round trip; they run in the threadpool
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def get_counter(self, key):
+        value = self.client.get(key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def stats(self):
+        try:
+            memory = self.client.info("memory")
+            evictions = self.client.info("stats").get("evicted_keys")
+        except Exception:
+            # Redis-compatible stores without INFO
+            memory, evictions = {}, None
+        return {
+            "size": None,
+            "memory_bytes": memory.get("used_memory"),
+            "max_bytes": memory.get("maxmemory") or None,
+            "evictions": evictions,
+        }
+
+
+class ReadCache:
+    """
+    Namespaced read-through cache of encoded responses over a backend.
+
+    Args:
+        backend: LRUBackend, RedisBackend, or None to disable caching
+        ttl_seconds (float): Lifetime of an entry; 0 keeps entries until evicted
+        prefix (str): Prefix of every key, to share one Redis between services
+    """
+
+    def __init__(self, backend, ttl_seconds=60, prefix=READ_CACHE_PREFIX):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def _generation_key(self, namespace):
+        return f"{self.prefix}:gen:{namespace}"
+
+    async def get(self, namespace, variant):
+        """
+        Look up one entry of namespace, e.g. ("patients", "page:0:100").
+
+        Returns:
+            tuple: (cached bytes or None, key to store a freshly built value
+            under with set(); None when caching is disabled)
+        """
+        if self.backend is None:
+            return None, None
+        try:
+            generation = await self._call(self.backend.get_counter, self._generation_key(namespace))
+            key = f"{self.prefix}:v:{namespace}:{generation}:{variant}"
+            value = await self._call(self.backend.get, key)
+        except Exception as e:
+            # A cache outage degrades to uncached reads
+            self.errors += 1
+            print(f"Read cache lookup failed: {str(e)}")
+            return None, None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value, key
+
+    async def set(self, key, value):
+        """Store a value under a key returned by get()"""
+        if key is None:
+            return
+        try:
+            await self._call(self.backend.set, key, value, self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            print(f"Read cache store failed: {str(e)}")
+
+    async def invalidate(self, *namespaces):
+        """Drop every entry of the namespaces, after a write to their tables"""
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                await self._call(self.backend.incr, self._generation_key(namespace))
+                self.invalidations += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Read cache invalidation of {namespace} failed: {str(e)}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": self.backend.name if self.backend is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def create_read_cache():
+    """ReadCache configured from READ_CACHE_* / REDIS_URL"""
+    backend = READ_CACHE_BACKEND.lower()
+    if backend == "none":
+        return ReadCache(None, READ_CACHE_TTL)
+    if backend == "redis":
+        if redis is None:
+            raise RuntimeError("READ_CACHE_BACKEND=redis requires the redis package")
+        return ReadCache(RedisBackend(redis.Redis.from_url(
+            REDIS_URL, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )), READ_CACHE_TTL)
+    if backend != "lru":
+        raise ValueError(f"READ_CACHE_BACKEND must be lru, redis or none, not {READ_CACHE_BACKEND!r}")
+    if WEB_CONCURRENCY > 1:
+        # A write would only invalidate the cache of the worker that handled it
+        print(f"Read cache off: the lru backend is per process and {WEB_CONCURRENCY} workers are running; "
+              "set READ_CACHE_BACKEND=redis to cache across workers")
+        return ReadCache(None, READ_CACHE_TTL)
+    return ReadCache(LRUBackend(READ_CACHE_MAX_ENTRIES, READ_CACHE_MAX_BYTES), READ_CACHE_TTL)
@@ -0,0 +1,341 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pymysql
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Versioned schema changes, applied in file name order: NNNN_description.sql
+MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.join(BASE_DIR, "migrations"))
+# mysqldump whose INSERT statements seed an empty database
+SEED_FILE = os.getenv("SEED_FILE", os.path.join(BASE_DIR, "data.sql"))
+# Seconds to wait for another process that is applying migrations
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "60"))
+# Seconds between checks while another process loads the seed
+SEED_POLL_INTERVAL = 1.0
+
+SEED_VERSION = "seed"
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_DELIMITER_LINE = re.compile(r"\s*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(64) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    duration_ms INT NOT NULL
+)
+"""
+
+
+class MigrationError(Exception):
+    """Raised when the schema cannot be brought up to date"""
+
+
+class Migration:
+    """One versioned .sql file from the migrations directory"""
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            self.script = f.read()
+        self.checksum = hashlib.sha256(self.script.encode()).hexdigest()
+
+    @property
+    def statements(self):
+        return split_sql(self.script)
+
+
+def split_sql(script):
+    """
+    Split a SQL script into statements the way the mysql client does.
+
+    Handles DELIMITER lines (for procedure and trigger bodies), quoted
+    strings and identifiers, -- / # / /* */ comments, and keeps /*! ... */
+    version comments that mysqldump uses for executable statements.
+    """
+    statements = []
+    current = []
+    blank = True  # nothing but whitespace in current so far
+    delimiter = ";"
+    i, n = 0, len(script)
+
+    def flush():
+        statement = "".join(current).strip()
+        if statement:
+            statements.append(statement)
+        current.clear()
+
+    while i < n:
+        # DELIMITER is a client command, only valid at the start of a statement
+        if blank:
+            match = _DELIMITER_LINE.match(script, i)
+            if match:
+                delimiter = match.group(1)
+                current.clear()
+                i = match.end()
+                continue
+
+        if script.startswith(delimiter, i):
+            flush()
+            blank = True
+            i += len(delimiter)
+            continue
+
+        char = script[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < n:
+                if script[end] == "\\" and char != "`":
+                    end += 2
+                    continue
+                if script[end] == char:
+                    # A doubled quote is an escaped quote
+                    if end + 1 < n and script[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(script[i:end + 1])
+            blank = False
+            i = end + 1
+        elif script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            if script.startswith("/*!", i):
+                current.append(script[i:end])
+                blank = False
+            i = end
+        elif char == "#" or (script.startswith("--", i) and (i + 2 == n or script[i + 2] in " \t\r\n")):
+            end = script.find("\n", i)
+            i = n if end == -1 else end
+        else:
+            current.append(char)
+            blank = blank and char.isspace()
+            i += 1
+
+    flush()
+    return statements
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Migrations in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def ensure_database(connect_kwargs):
+    """Create the configured database if it does not exist yet"""
+    server_kwargs = {k: v for k, v in connect_kwargs.items() if k != "database"}
+    connection = pymysql.connect(**server_kwargs)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{connect_kwargs['database']}`")
+    finally:
+        connection.close()
+
+
+def _applied_versions(cursor):
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        return {row["version"]: row["checksum"] for row in rows}
+    return {row[0]: row[1] for row in rows}
+
+
+def _record(cursor, version, name, checksum, started):
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+        (version, name, checksum, int((time.perf_counter() - started) * 1000)),
+    )
+
+
+def _lock_name(connection, purpose):
+    database = connection.db
+    if isinstance(database, bytes):
+        database = database.decode()
+    return f"{database}.{purpose}"
+
+
+class _NamedLock:
+    """MySQL GET_LOCK/RELEASE_LOCK, so only one process migrates or seeds at a time"""
+
+    def __init__(self, cursor, name, timeout):
+        self.cursor = cursor
+        self.name = name
+        self.timeout = timeout
+        self.acquired = False
+
+    def __enter__(self):
+        self.cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (self.name, self.timeout))
+        row = self.cursor.fetchone()
+        self.acquired = (row["acquired"] if isinstance(row, dict) else row[0]) == 1
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.acquired:
+            self.cursor.execute("SELECT RELEASE_LOCK(%s)", (self.name,))
+
+
+def apply_migrations(connection, migrations):
+    """
+    Apply every migration not yet recorded in schema_migrations.
+
+    Returns:
+        list: Versions applied by this call
+    """
+    applied = []
+    with connection.cursor() as cursor:
+        with _NamedLock(cursor, _lock_name(connection, "schema_migrations"), MIGRATION_LOCK_TIMEOUT) as lock:
+            if not lock.acquired:
+                raise MigrationError("Timed out waiting for another process to finish migrating")
+
+            done = _applied_versions(cursor)
+            for migration in migrations:
+                if migration.version in done:
+                    if done[migration.version] != migration.checksum:
+                        print(f"Warning: migration {migration.version}_{migration.name} changed after it was applied")
+                    continue
+                started = time.perf_counter()
+                try:
+                    # DDL commits implicitly in MySQL, so each statement is final
+                    for statement in migration.statements:
+                        cursor.execute(statement)
+                    _record(cursor, migration.version, migration.name, migration.checksum, started)
+                    connection.commit()
+                except pymysql.Error as e:
+                    connection.rollback()
+                    raise MigrationError(f"Migration {migration.version}_{migration.name} failed: {str(e)}") from e
+                applied.append(migration.version)
+                print(f"Applied migration {migration.version}_{migration.name}")
+    return applied
+
+
+def run_migrations(connect_kwargs, directory=MIGRATIONS_DIR):
+    """Create the database if needed and bring its schema up to date"""
+    migrations = discover_migrations(directory)
+    ensure_database(connect_kwargs)
+    connection = pymysql.connect(**connect_kwargs)
+    try:
+        return apply_migrations(connection, migrations)
+    finally:
+        connection.close()
+
+
+def seed_statements(path=SEED_FILE):
+    """The multi-row INSERT statements of a mysqldump file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    return [s for s in split_sql(script) if re.match(r"INSERT\s", s, re.IGNORECASE)]
+
+
+def load_seed(connection, path=SEED_FILE):
+    """
+    Load the seed dump once, in a single transaction.
+
+    Skipped when the seed is already recorded or when the tables already
+    hold data (e.g. loaded by the old startup path or MySQL's init scripts);
+    that case is recorded too. Returns "waiting" without blocking while
+    another process holds the seed lock.
+
+    Returns:
+        dict: state ("loaded", "skipped" or "waiting"), rows inserted, seconds, reason
+    """
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        checksum = hashlib.sha256(f.read()).hexdigest()
+
+    with connection.cursor() as cursor:
+        with _NamedLock(cursor, _lock_name(connection, "seed"), 0) as lock:
+            if not lock.acquired:
+                return {"state": "waiting", "rows": 0, "reason": "another process is loading the seed"}
+            if SEED_VERSION in _applied_versions(cursor):
+                return {"state": "skipped", "rows": 0, "reason": "already loaded"}
+
+            cursor.execute("SELECT 1 FROM patients LIMIT 1")
+            if cursor.fetchone():
+                _record(cursor, SEED_VERSION, os.path.basename(path), checksum, started)
+                connection.commit()
+                return {"state": "skipped", "rows": 0, "reason": "tables already contain data"}
+
+            rows = 0
+            # The dump inserts child tables first, as mysqldump does
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0, UNIQUE_CHECKS = 0")
+            try:
+                connection.begin()
+                for statement in seed_statements(path):
+                    rows += cursor.execute(statement)
+                _record(cursor, SEED_VERSION, os.path.basename(path), checksum, started)
+                connection.commit()
+            except pymysql.Error:
+                connection.rollback()
+                raise
+            finally:
+                cursor.execute("SET FOREIGN_KEY_CHECKS = 1, UNIQUE_CHECKS = 1")
+
+    return {"state": "loaded", "rows": rows, "seconds": round(time.perf_counter() - started, 3)}
+
+
+class SeedLoader:
+    """
+    Loads the seed dump on a background thread so startup does not wait for it.
+
+    A process that finds another one loading the seed stays "waiting" until
+    that load is over, so status only leaves pending / running / waiting
+    once the tables hold their final data.
+    """
+
+    def __init__(self, path=SEED_FILE):
+        self.path = path
+        self.status = {"state": "pending"}
+        self._thread = None
+
+    def _run(self, connect_kwargs, on_settled):
+        self.status = {"state": "running"}
+        try:
+            if not os.path.exists(self.path):
+                result = {"state": "skipped", "rows": 0, "reason": f"{self.path} not found"}
+            else:
+                connection = pymysql.connect(**connect_kwargs)
+                try:
+                    result = load_seed(connection, self.path)
+                    while result["state"] == "waiting":
+                        self.status = result
+                        time.sleep(SEED_POLL_INTERVAL)
+                        result = load_seed(connection, self.path)
+                finally:
+                    connection.close()
+        except (pymysql.Error, OSError) as e:
+            result = {"state": "failed", "error": str(e)}
+        if on_settled is not None:
+            on_settled(result)
+        self.status = result
+        print(f"Seed data: {self.status}")
+
+    def start(self, connect_kwargs, on_settled=None):
+        """
+        Args:
+            on_settled: Called on the loader thread with the final status
+                (loaded, skipped or failed), before status says so; it runs
+                whether or not this process loaded the seed
+        """
+        self._thread = threading.Thread(target=self._run, args=(connect_kwargs, on_settled),
+                                        name="seed-loader", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,36 @@
+"""A failing micro-batch must fail only the callers whose items cannot be processed."""
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+def run_batch(process_batch, items):
+    async def submit_all():
+        batcher = MicroBatcher(process_batch, max_batch_size=len(items), max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        return results, batcher.stats()
+
+    return asyncio.run(submit_all())
+
+
+def test_bad_item_fails_only_its_caller():
+    batch_sizes = []
+
+    def double(items):
+        batch_sizes.append(len(items))
+        if any(item < 0 for item in items):
+            raise ValueError("negative item")
+        return [item * 2 for item in items]
+
+    results, stats = run_batch(double, [1, -2, 3, 4])
+
+    assert results[0] == 2 and results[2] == 6 and results[3] == 8
+    assert isinstance(results[1], ValueError)
+    # One failed batch of four, then each item on its own
+    assert batch_sizes == [4, 1, 1, 1, 1]
+    assert stats["failed_batches"] == 1
+
+
+def test_wrong_result_count_is_an_error_per_item():
+    results, _ = run_batch(lambda items: [], [1, 2])
+    assert all(isinstance(result, RuntimeError) for result in results)
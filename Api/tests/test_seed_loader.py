@@ -0,0 +1,104 @@
+"""SeedLoader must hand every final seed state to its callback, not only a fresh load."""
+import pymysql
+import pytest
+
+import schema_migrations
+from schema_migrations import SeedLoader
+
+
+class FakeCursor:
+    """Answers the statements load_seed runs against a database that already holds patients"""
+
+    def __init__(self, executed):
+        self.executed = executed
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+        if "GET_LOCK" in query:
+            self._row = (1,)
+        elif "FROM patients" in query:
+            self._row = (1,)
+        else:
+            self._row = None
+        return 0
+
+    def fetchone(self):
+        return self._row
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    db = "liver_disease_db"
+
+    def __init__(self):
+        self.executed = []
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def seed_file(tmp_path):
+    path = tmp_path / "data.sql"
+    path.write_text("INSERT INTO `patients` VALUES (1,65,'0');\n")
+    return str(path)
+
+
+def run_loader(path, monkeypatch, connect):
+    monkeypatch.setattr(schema_migrations.pymysql, "connect", connect)
+    loader = SeedLoader(path)
+    settled = []
+    # The state the loader reports while the callback runs
+    loader.start({}, on_settled=lambda status: settled.append((status, loader.status["state"])))
+    loader.join(timeout=10)
+    return loader, settled
+
+
+def test_tables_with_data_skip_the_seed_and_still_settle(seed_file, monkeypatch):
+    connection = FakeConnection()
+    loader, settled = run_loader(seed_file, monkeypatch, lambda **kwargs: connection)
+
+    assert loader.status["state"] == "skipped"
+    assert loader.status["reason"] == "tables already contain data"
+    assert [status["state"] for status, _ in settled] == ["skipped"]
+    # The callback runs before the final state is published
+    assert settled[0][1] == "running"
+    # Recorded as applied, and none of the dump was executed
+    assert connection.committed
+    assert not any("VALUES (1,65" in query for query in connection.executed)
+
+
+def test_missing_seed_file_settles_as_skipped(tmp_path, monkeypatch):
+    def connect(**kwargs):
+        raise AssertionError("no connection is needed without a seed file")
+
+    loader, settled = run_loader(str(tmp_path / "missing.sql"), monkeypatch, connect)
+
+    assert loader.status["state"] == "skipped"
+    assert [status["state"] for status, _ in settled] == ["skipped"]
+
+
+def test_failed_seed_settles_as_failed(seed_file, monkeypatch):
+    def connect(**kwargs):
+        raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+
+    loader, settled = run_loader(seed_file, monkeypatch, connect)
+
+    assert loader.status["state"] == "failed"
+    assert [status["state"] for status, _ in settled] == ["failed"]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Fill the feature_vectors table from patients and medical_tests.
+
+The API, its seed load and sqldatabase/data_uploading.py keep
+feature_vectors up to date for tests they write; this fills in tests
+written before the table existed or by other means (bulk SQL, older
+loaders). Tests are read in test_id order
+with keyset pagination, joined with their patient, turned into vectors with
+the same build_feature_matrix call scoring uses, and upserted; each batch is
+committed on its own, so the job can be stopped and rerun at any time.
+
+Usage:
+    python backfill_feature_vectors.py                  # every test
+    python backfill_feature_vectors.py --only-missing   # tests without a vector
+    python backfill_feature_vectors.py --after-test-id 500000 --batch-size 10000
+"""
+import argparse
+import os
+import time
+
+import pymysql
+
+from database_schema import ensure_schema
+from feature_vectors import upsert_query, vector_rows
+
+# Database credentials, as used by the API; override with environment variables
+DB_CONFIG = {
+    "host": os.getenv("DATABASE_HOST", "localhost"),
+    "user": os.getenv("DATABASE_USER", "root"),
+    "password": os.getenv("DATABASE_PASSWORD", "StrongPassword123!"),
+    "database": os.getenv("DATABASE_NAME", "liver_disease_db"),
+    "cursorclass": pymysql.cursors.DictCursor,
+}
+
+MEDICAL_TEST_FIELDS = (
+    "total_bilirubin", "direct_bilirubin", "alkaline_phosphotase",
+    "alamine_aminotransferase", "aspartate_aminotransferase", "total_proteins",
+    "albumin", "albumin_and_globulin_ratio",
+)
+
+SELECT_TESTS = (
+    "SELECT t.test_id, t.patient_id, p.age, p.gender, "
+    + ", ".join(f"t.{field}" for field in MEDICAL_TEST_FIELDS)
+    + " FROM medical_tests t JOIN patients p ON p.patient_id = t.patient_id"
+    "{missing_join} WHERE t.test_id > %s{missing_filter} ORDER BY t.test_id LIMIT %s"
+)
+
+
+def backfill(connection, after_test_id=0, batch_size=5000, only_missing=False):
+    """
+    Upsert the vectors of every test after after_test_id.
+
+    Returns:
+        int: Vectors written
+    """
+    query = SELECT_TESTS.format(
+        missing_join=" LEFT JOIN feature_vectors f ON f.test_id = t.test_id" if only_missing else "",
+        missing_filter=" AND f.test_id IS NULL" if only_missing else "",
+    )
+    written = 0
+    started = time.perf_counter()
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(query, (after_test_id, batch_size))
+            tests = cursor.fetchall()
+            if not tests:
+                break
+            # The joined rows carry the patient's age and gender already
+            patients = {test["patient_id"]: test for test in tests}
+            rows = vector_rows(tests, patients)
+            try:
+                cursor.execute(upsert_query(len(rows)), [value for row in rows for value in row])
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        written += len(rows)
+        after_test_id = tests[-1]["test_id"]
+        elapsed = time.perf_counter() - started
+        print(f"{written} vectors up to test {after_test_id} ({written / elapsed:,.0f} rows/s)")
+        if len(tests) < batch_size:
+            break
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--after-test-id", type=int, default=0, help="Start after this test_id")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Tests per query and per transaction")
+    parser.add_argument("--only-missing", action="store_true", help="Skip tests that already have a vector")
+    args = parser.parse_args()
+
+    # For databases the API has not migrated yet
+    ensure_schema(DB_CONFIG)
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        started = time.perf_counter()
+        written = backfill(connection, args.after_test_id, args.batch_size, args.only_missing)
+    finally:
+        connection.close()
+    print(f"Done: {written} feature vectors written in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Batch scoring job: a prediction for every patient in MySQL or MongoDB.
+
+Patients and their latest medical test are read in patient-key order, one
+chunk per query (keyset pagination, so every chunk is an index range scan).
+For MySQL the chunk is read from the feature_vectors table
+(feature_vectors.py) as a ready feature matrix, without joining patients or
+preprocessing; --raw builds it from patients and medical_tests instead,
+which is also what happens when some tests have no vector yet.
+Each chunk is scored on a process pool;
+workers open the model themselves, so a memory-mapped artifact is shared
+between them through the page cache. While the pool scores, the next chunks
+are being read. Results are written back in key order with bulk upserts into
+the predictions table (MySQL, see Api/migrations/0003_predictions.sql) or
+collection (MongoDB), keyed by patient and model version.
+
+A checkpoint per model version records the last patient written. For MySQL
+it is updated in the same transaction as the chunk's predictions, so a
+crashed run resumes right after the last committed chunk; MongoDB upserts
+are idempotent, so a chunk written before a crash is simply written again.
+
+Usage:
+    python batch_score.py [--source mysql] [--chunk-size 5000] [--workers 4]
+    python batch_score.py --source mongo     # MONGO_URI from .env, as for the Mongo loaders
+    python batch_score.py --model models/liver_model.pkl --feature-names models/feature_names.pkl
+    python batch_score.py --restart          # ignore the checkpoint for this model version
+    python batch_score.py --raw              # always build features from patients / medical_tests
+"""
+import argparse
+import datetime
+import hashlib
+import os
+import pickle
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pymysql
+
+from config import FEATURE_NAMES_PATH, MODEL_ARTIFACT_DIR, MODEL_PATH
+from database_schema import ensure_schema
+from feature_vectors import vector_columns
+from model_artifact import is_artifact, load_artifact, newer_model_path
+from preprocessing import build_feature_matrix
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The Mongo loaders provide get_client and the collection names
+MONGO_DIR = os.path.join(HERE, '..', 'mongodatabase')
+if MONGO_DIR not in sys.path:
+    sys.path.append(MONGO_DIR)
+
+# Pickled models were fitted on DataFrames; scoring uses plain float32 matrices
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+# Database credentials, as used by the API; override with environment variables
+DB_CONFIG = {
+    "host": os.getenv("DATABASE_HOST", "localhost"),
+    "user": os.getenv("DATABASE_USER", "root"),
+    "password": os.getenv("DATABASE_PASSWORD", "StrongPassword123!"),
+    "database": os.getenv("DATABASE_NAME", "liver_disease_db"),
+    "cursorclass": pymysql.cursors.DictCursor,
+}
+
+MEDICAL_TEST_FIELDS = (
+    "total_bilirubin", "direct_bilirubin", "alkaline_phosphotase",
+    "alamine_aminotransferase", "aspartate_aminotransferase", "total_proteins",
+    "albumin", "albumin_and_globulin_ratio",
+)
+
+# Patients with their latest test; patients without a test have nothing to score
+SELECT_CHUNK = (
+    "SELECT p.patient_id, p.age, p.gender, t.test_id, "
+    + ", ".join(f"t.{field}" for field in MEDICAL_TEST_FIELDS)
+    + " FROM patients p"
+    " JOIN medical_tests t ON t.test_id ="
+    " (SELECT MAX(test_id) FROM medical_tests WHERE patient_id = p.patient_id)"
+    " WHERE p.patient_id > %s ORDER BY p.patient_id LIMIT %s"
+)
+
+# Latest feature vector per patient after a patient key; the derived table is a
+# loose index scan of (patient_id, test_id DESC)
+SELECT_VECTOR_CHUNK = (
+    "SELECT f.patient_id, f.test_id, {columns} FROM"
+    " (SELECT MAX(test_id) AS test_id FROM feature_vectors WHERE patient_id > %s"
+    " GROUP BY patient_id ORDER BY patient_id LIMIT %s) latest"
+    " JOIN feature_vectors f ON f.test_id = latest.test_id ORDER BY f.patient_id"
+)
+
+# Tests and vectors, to detect tests written by something that does not
+# maintain feature_vectors (bulk SQL, a database the backfill has not run on)
+COUNT_VECTOR_COVERAGE = (
+    "SELECT (SELECT COUNT(*) FROM medical_tests) AS tests, (SELECT COUNT(*) FROM feature_vectors) AS vectors"
+)
+
+CREATE_CHECKPOINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS batch_score_checkpoints (
+    model_version VARCHAR(64) PRIMARY KEY,
+    last_patient_id INT NOT NULL,
+    rows_scored BIGINT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+UPSERT_PREDICTIONS = (
+    "INSERT INTO predictions (patient_id, model_version, test_id, prediction, probability) "
+    "VALUES (%s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE test_id = VALUES(test_id), prediction = VALUES(prediction), "
+    "probability = VALUES(probability)"
+)
+
+UPSERT_CHECKPOINT = (
+    "INSERT INTO batch_score_checkpoints (model_version, last_patient_id, rows_scored) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE last_patient_id = VALUES(last_patient_id), rows_scored = VALUES(rows_scored)"
+)
+
+
+def open_model(model_path, feature_names_path):
+    """
+    Load a model artifact directory or a pickled model.
+
+    Returns:
+        tuple: (model, feature_names, model_version). The version is the
+        artifact's content hash, or a hash of the pickle file, so it is the
+        same on every run with the same model.
+    """
+    if is_artifact(model_path):
+        model = load_artifact(model_path)
+        return model, model.feature_names, model.version
+    with open(model_path, 'rb') as f:
+        content = f.read()
+    with open(feature_names_path, 'rb') as f:
+        feature_names = list(pickle.load(f))
+    return pickle.loads(content), feature_names, hashlib.sha256(content).hexdigest()[:16]
+
+
+class MySQLStore:
+    """
+    feature_vectors (or patients / medical_tests with raw=True) in,
+    predictions out, checkpoint in batch_score_checkpoints
+    """
+
+    def __init__(self, connect_kwargs=DB_CONFIG, raw=False):
+        self.raw = raw
+        # predictions and feature_vectors, for databases the API has not migrated yet
+        ensure_schema(connect_kwargs)
+        # Reads and writes on separate connections, so chunk reads never
+        # happen inside a write transaction
+        self.reader = pymysql.connect(**connect_kwargs, autocommit=True)
+        self.writer = pymysql.connect(**connect_kwargs)
+        with self.writer.cursor() as cursor:
+            cursor.execute(CREATE_CHECKPOINTS_TABLE)
+        self.writer.commit()
+        if not raw and not self.vectors_complete():
+            self.raw = True
+
+    def vectors_complete(self):
+        """True if every medical test has a feature vector; warns otherwise"""
+        try:
+            with self.reader.cursor() as cursor:
+                cursor.execute(COUNT_VECTOR_COVERAGE)
+                counts = cursor.fetchone()
+        except pymysql.err.ProgrammingError as e:
+            print(f"Warning: feature_vectors cannot be read ({str(e)}); scoring from patients / medical_tests")
+            return False
+        if counts["vectors"] < counts["tests"]:
+            print(f"Warning: feature_vectors has {counts['vectors']} rows for {counts['tests']} medical tests; "
+                  "scoring from patients / medical_tests (run backfill_feature_vectors.py --only-missing "
+                  "to score from the vectors)")
+            return False
+        return True
+
+    def checkpoint(self, model_version, restart):
+        """(last patient key written, rows scored) for this model version"""
+        with self.writer.cursor() as cursor:
+            if restart:
+                cursor.execute("DELETE FROM batch_score_checkpoints WHERE model_version = %s", (model_version,))
+            cursor.execute(
+                "SELECT last_patient_id, rows_scored FROM batch_score_checkpoints WHERE model_version = %s",
+                (model_version,),
+            )
+            row = cursor.fetchone()
+        self.writer.commit()
+        return (row["last_patient_id"], int(row["rows_scored"])) if row else (0, 0)
+
+    def read_chunk(self, after_key, limit):
+        """Up to limit (patient key, test id, record) tuples after after_key, in key order"""
+        with self.reader.cursor() as cursor:
+            cursor.execute(SELECT_CHUNK, (after_key, limit))
+            rows = cursor.fetchall()
+        return [(row["patient_id"], row["test_id"], row) for row in rows]
+
+    def read_matrix(self, after_key, limit, feature_names):
+        """(patient keys, test ids, float32 feature matrix) of up to limit patients after after_key"""
+        if self.raw:
+            return records_to_matrix(self.read_chunk(after_key, limit), feature_names)
+        query = SELECT_VECTOR_CHUNK.format(columns=", ".join(f"f.{c}" for c in vector_columns(feature_names)))
+        with self.reader.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute(query, (after_key, limit))
+            rows = cursor.fetchall()
+        if not rows:
+            return [], [], np.empty((0, len(feature_names)), dtype=np.float32)
+        keys, test_ids = [row[0] for row in rows], [row[1] for row in rows]
+        return keys, test_ids, np.array([row[2:] for row in rows], dtype=np.float32)
+
+    def write(self, model_version, keys, test_ids, labels, probabilities, rows_scored):
+        """Upsert one chunk's predictions and advance the checkpoint, atomically"""
+        with self.writer.cursor() as cursor:
+            try:
+                self.writer.begin()
+                cursor.executemany(UPSERT_PREDICTIONS, list(zip(
+                    keys, [model_version] * len(keys), test_ids, labels.tolist(), probabilities.tolist(),
+                )))
+                cursor.execute(UPSERT_CHECKPOINT, (model_version, keys[-1], rows_scored))
+                self.writer.commit()
+            except Exception:
+                self.writer.rollback()
+                raise
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+class MongoStore:
+    """patient_records (embedded layout) in, predictions collection out"""
+
+    def __init__(self, db):
+        from pymongo import ASCENDING
+        from stream_loader import EMBEDDED_COLLECTION
+
+        self.db = db
+        self.source = db[EMBEDDED_COLLECTION]
+        self.db.predictions.create_index([("patient_id", ASCENDING), ("model_version", ASCENDING)], unique=True)
+
+    def checkpoint(self, model_version, restart):
+        if restart:
+            self.db.batch_score_checkpoints.delete_one({"_id": model_version})
+        state = self.db.batch_score_checkpoints.find_one({"_id": model_version})
+        return (state["last_patient_id"], state["rows_scored"]) if state else (None, 0)
+
+    def read_chunk(self, after_key, limit):
+        query = {"medical_tests.0": {"$exists": True}}
+        if after_key is not None:
+            query["_id"] = {"$gt": after_key}
+        chunk = []
+        for doc in self.source.find(query).sort("_id", 1).limit(limit):
+            # Tests are appended in insertion order; the last one is the latest
+            test = doc["medical_tests"][-1]
+            record = {key: value for key, value in test.items() if key != "_id"}
+            record.update(Age=doc.get("Age"), Gender=doc.get("Gender"))
+            chunk.append((doc["_id"], test.get("_id"), record))
+        return chunk
+
+    def read_matrix(self, after_key, limit, feature_names):
+        return records_to_matrix(self.read_chunk(after_key, limit), feature_names)
+
+    def write(self, model_version, keys, test_ids, labels, probabilities, rows_scored):
+        from pymongo import UpdateOne
+
+        scored_at = datetime.datetime.now(datetime.timezone.utc)
+        self.db.predictions.bulk_write([
+            UpdateOne(
+                {"patient_id": key, "model_version": model_version},
+                {"$set": {"test_id": test_id, "prediction": label, "probability": probability, "scored_at": scored_at}},
+                upsert=True,
+            )
+            for key, test_id, label, probability in zip(keys, test_ids, labels.tolist(), probabilities.tolist())
+        ], ordered=False)
+        self.db.batch_score_checkpoints.replace_one(
+            {"_id": model_version},
+            {"last_patient_id": keys[-1], "rows_scored": rows_scored, "updated_at": scored_at},
+            upsert=True,
+        )
+
+    def close(self):
+        self.db.client.close()
+
+
+def records_to_matrix(chunk, feature_names):
+    """(keys, test ids, feature matrix) of read_chunk() tuples"""
+    if not chunk:
+        return [], [], np.empty((0, len(feature_names)), dtype=np.float32)
+    keys, test_ids, records = zip(*chunk)
+    return list(keys), list(test_ids), build_feature_matrix(list(records), feature_names)
+
+
+# Per-process model, loaded once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, feature_names_path):
+    _worker['model'] = open_model(model_path, feature_names_path)[0]
+
+
+def _score(X):
+    """Labels and probability of liver disease for one feature matrix"""
+    model = _worker['model']
+    probabilities = model.predict_proba(X)
+    labels = np.asarray(model.classes_)[probabilities.argmax(axis=1)]
+    positive = list(model.classes_).index(1)
+    return labels.astype(np.int8), probabilities[:, positive].astype(np.float32)
+
+
+def run(store, model_path, feature_names_path, chunk_size=5000, workers=4, restart=False):
+    """
+    Score every patient not yet covered by the checkpoint.
+
+    Returns:
+        dict: rows scored by this run, total rows for this model version,
+        seconds and rows per second
+    """
+    _, feature_names, model_version = open_model(model_path, feature_names_path)
+    after_key, rows_scored = store.checkpoint(model_version, restart)
+    if rows_scored:
+        print(f"Resuming model {model_version} after patient {after_key} ({rows_scored} rows already scored)")
+
+    started = time.perf_counter()
+    new_rows = 0
+    pending = deque()
+    exhausted = False
+    # Keep every worker busy with one chunk queued behind it
+    max_in_flight = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, feature_names_path)) as pool:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                keys, test_ids, X = store.read_matrix(after_key, chunk_size, feature_names)
+                if not keys:
+                    exhausted = True
+                    break
+                pending.append((pool.submit(_score, X), keys, test_ids, time.perf_counter()))
+                after_key = keys[-1]
+                if len(keys) < chunk_size:
+                    exhausted = True
+            if not pending:
+                break
+
+            # Write in submission order, so the checkpoint only ever moves past contiguous chunks
+            future, keys, test_ids, submitted = pending.popleft()
+            labels, probabilities = future.result()
+            rows_scored += len(keys)
+            store.write(model_version, keys, test_ids, labels, probabilities, rows_scored)
+            new_rows += len(keys)
+            elapsed = time.perf_counter() - started
+            print(f"Scored {len(keys)} rows up to patient {keys[-1]} in {time.perf_counter() - submitted:.2f}s; "
+                  f"{new_rows} this run ({new_rows / elapsed:,.0f} rows/s)")
+
+    total = time.perf_counter() - started
+    rate = new_rows / total if total > 0 else 0.0
+    return {"model_version": model_version, "rows": new_rows, "total_rows": rows_scored,
+            "seconds": round(total, 3), "rows_per_second": round(rate, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=("mysql", "mongo"), default="mysql")
+    parser.add_argument("--model", default=newer_model_path(MODEL_PATH, MODEL_ARTIFACT_DIR),
+                        help="Model artifact directory or pickle (default: the newer of the two)")
+    parser.add_argument("--feature-names", default=FEATURE_NAMES_PATH, help="Feature names pickle (pickled models only)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Patients per read and per scoring task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and score every patient again")
+    parser.add_argument("--raw", action="store_true",
+                        help="MySQL: build features from patients / medical_tests instead of feature_vectors")
+    args = parser.parse_args()
+
+    if args.source == "mongo":
+        from stream_loader import get_client
+        store = MongoStore(get_client().liver_disease_db)
+    else:
+        store = MySQLStore(raw=args.raw)
+    try:
+        result = run(store, args.model, args.feature_names, args.chunk_size, args.workers, args.restart)
+    finally:
+        store.close()
+    print(f"Done: {result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_second']:,.0f} rows/s); "
+          f"{result['total_rows']} rows scored with model {result['model_version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Load-time benchmark: training data from the CSV versus the Parquet snapshot.
+
+Scales indian_liver_patient.csv up to --rows rows (repeating it), writes it
+both as a CSV file and as a snapshot in the layout of
+sqldatabase/export_parquet.py, checks that both paths give the same feature
+matrix and labels, and times:
+
+- train: train_from_csv.load_training_data (pandas parses every column of
+  the CSV) versus parquet_dataset.load_training_data (memory-mapped, only
+  the model's columns)
+- 2 columns: an analytics read of age and total_bilirubin
+
+Usage:
+    python bench_dataset_load.py --rows 1000000 --runs 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import parquet_dataset
+import train_from_csv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(HERE, '..', 'sqldatabase', 'indian_liver_patient.csv')
+sys.path.append(os.path.join(HERE, '..', 'sqldatabase'))
+from export_parquet import TABLES, write_part  # noqa: E402
+
+CSV_TO_MEDICAL_TESTS = {
+    'Total_Bilirubin': 'total_bilirubin',
+    'Direct_Bilirubin': 'direct_bilirubin',
+    'Alkaline_Phosphotase': 'alkaline_phosphotase',
+    'Alamine_Aminotransferase': 'alamine_aminotransferase',
+    'Aspartate_Aminotransferase': 'aspartate_aminotransferase',
+    'Total_Protiens': 'total_proteins',
+    'Albumin': 'albumin',
+    'Albumin_and_Globulin_Ratio': 'albumin_and_globulin_ratio',
+}
+
+
+def scaled_frame(n_rows):
+    source = pd.read_csv(CSV_PATH)
+    repeats = -(-n_rows // len(source))
+    return pd.concat([source] * repeats, ignore_index=True).iloc[:n_rows]
+
+
+def write_snapshot(frame, root, batch_size=100000):
+    """The CSV rows as patients, medical_tests and diagnosis, one patient per row, like data_uploading.py"""
+    ids = np.arange(1, len(frame) + 1, dtype=np.int32)
+    columns = {
+        'patients': {
+            'patient_id': ids, 'age': frame['Age'].to_numpy(),
+            'gender': np.where(frame['Gender'] == 'Male', '1', '0'),
+        },
+        'medical_tests': dict(
+            {'test_id': ids, 'patient_id': ids},
+            **{name: frame[column].to_numpy() for column, name in CSV_TO_MEDICAL_TESTS.items()},
+        ),
+        'diagnosis': {
+            'diagnosis_id': ids, 'patient_id': ids, 'diagnosis': (frame['Dataset'] == 1).to_numpy(np.int8),
+        },
+    }
+    for table, values in columns.items():
+        schema = TABLES[table][1]
+        for start in range(0, len(frame), batch_size):
+            data = pa.Table.from_arrays(
+                [pa.array(values[field.name][start:start + batch_size], type=field.type, from_pandas=True)
+                 for field in schema],
+                schema=schema,
+            )
+            write_part(root, table, data, '2024-01-01')
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'patients.csv')
+        root = os.path.join(workdir, 'parquet')
+        frame = scaled_frame(args.rows)
+        frame.to_csv(csv_path, index=False)
+        write_snapshot(frame, root)
+        del frame
+
+        def load_csv():
+            # load_training_data reports on stdout; keep it out of the timing output
+            with contextlib.redirect_stdout(io.StringIO()):
+                return train_from_csv.load_training_data(csv_path)
+
+        X_csv, y_csv, _ = load_csv()
+        X_parquet, y_parquet, _ = parquet_dataset.load_training_data(root, train_from_csv.FEATURES)
+        same = np.allclose(X_csv, X_parquet, rtol=1e-6) and np.array_equal(y_csv, y_parquet)
+
+        results = [
+            ('train', timed(load_csv, args.runs),
+             timed(lambda: parquet_dataset.load_training_data(root, train_from_csv.FEATURES), args.runs)),
+            ('2 columns', timed(lambda: pd.read_csv(csv_path, usecols=['Age', 'Total_Bilirubin']), args.runs),
+             timed(lambda: (parquet_dataset.read_table(root, 'patients', ['age']),
+                            parquet_dataset.read_table(root, 'medical_tests', ['total_bilirubin'])), args.runs)),
+        ]
+        csv_mb = os.path.getsize(csv_path) / 1e6
+        parquet_mb = directory_size(root) / 1e6
+
+    print(f"{args.rows:,} rows; CSV {csv_mb:.1f} MB, Parquet (zstd) {parquet_mb:.1f} MB; "
+          f"same X and y: {same}")
+    print(f"{'load':<12}{'csv ms':>12}{'parquet ms':>14}{'speedup':>10}")
+    for name, csv_ms, parquet_ms in results:
+        print(f"{name:<12}{csv_ms:>12.1f}{parquet_ms:>14.1f}{csv_ms / parquet_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
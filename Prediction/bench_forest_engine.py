@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Check the NumPy forest engine against scikit-learn and compare their speed.
+
+First verifies that ForestEvaluator reproduces sklearn's predict_proba on the
+real CSV rows and on random inputs, then times both at several batch sizes.
+
+Usage:
+    python bench_forest_engine.py [--model models/liver_model.pkl]
+"""
+import argparse
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forest_engine import ForestEvaluator, export_forest
+from preprocessing import build_feature_matrix
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqldatabase', 'indian_liver_patient.csv')
+BATCH_SIZES = (1, 32, 1024, 100_000)
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def make_inputs(feature_names, n_rows, seed=0):
+    """Real CSV rows resampled with noise, so values straddle the split thresholds"""
+    base = build_feature_matrix(pd.read_csv(CSV_PATH), feature_names)
+    rng = np.random.default_rng(seed)
+    rows = base[rng.integers(0, len(base), n_rows)]
+    noise = rng.normal(1.0, 0.1, rows.shape).astype(np.float32)
+    return np.ascontiguousarray(rows * noise, dtype=np.float32), base
+
+
+def check_equivalence(model, evaluator, feature_names):
+    """Raise AssertionError if the engine disagrees with sklearn"""
+    noisy, real = make_inputs(feature_names, 20_000)
+    for name, X in (("CSV rows", real), ("noisy rows", noisy)):
+        expected = model.predict_proba(X)
+        actual = evaluator.predict_proba(X)
+        max_diff = float(np.abs(expected - actual).max())
+        assert np.allclose(expected, actual, rtol=0, atol=1e-9), f"{name}: max difference {max_diff}"
+        assert np.array_equal(model.predict(X), evaluator.predict(X)), f"{name}: labels differ"
+        print(f"  {name:<11} {len(X):>6} rows  max |diff| = {max_diff:.2e}  OK")
+
+
+def time_call(fn, X, min_seconds=0.5):
+    """Median seconds per call, repeating until min_seconds have elapsed"""
+    fn(X)  # warm-up
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(timings) < 3:
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/liver_model.pkl")
+    parser.add_argument("--features", default="models/feature_names.pkl")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    with open(args.features, 'rb') as f:
+        feature_names = list(pickle.load(f))
+
+    start = time.perf_counter()
+    evaluator = ForestEvaluator(export_forest(model))
+    print(f"Exported {evaluator.n_estimators} trees in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print("\nEquivalence with sklearn predict_proba:")
+    check_equivalence(model, evaluator, feature_names)
+
+    X_all, _ = make_inputs(feature_names, max(BATCH_SIZES), seed=1)
+    print(f"\n{'batch':>8}{'sklearn ms':>14}{'engine ms':>12}{'speedup':>10}{'engine us/row':>15}")
+    for batch_size in BATCH_SIZES:
+        X = X_all[:batch_size]
+        sklearn_s = time_call(model.predict_proba, X)
+        engine_s = time_call(evaluator.predict_proba, X)
+        print(f"{batch_size:>8}{sklearn_s * 1000:>14.3f}{engine_s * 1000:>12.3f}"
+              f"{sklearn_s / engine_s:>9.1f}x{engine_s / batch_size * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
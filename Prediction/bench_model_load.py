@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare process cold-start cost of the pickle model against the artifact format.
+
+Each run starts a fresh Python interpreter that imports what it needs, loads
+the model and scores one row, the way predict_direct.py or an API worker
+does at startup. Reports the median wall time per phase and the process
+memory after loading.
+
+Usage:
+    python bench_model_load.py [--pickle models/liver_model.pkl] [--artifact models/liver_model] [--runs 7]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PICKLE_LOADER = """
+import time
+start = time.perf_counter()
+import pickle
+import numpy as np
+with open(MODEL, 'rb') as f:
+    model = pickle.load(f)
+loaded = time.perf_counter()
+model.predict_proba(np.zeros((1, model.n_features_in_), dtype=np.float32))
+"""
+
+ARTIFACT_LOADER = """
+import time
+start = time.perf_counter()
+import numpy as np
+from model_artifact import load_artifact
+model = load_artifact(MODEL)
+loaded = time.perf_counter()
+model.predict_proba(np.zeros((1, len(model.feature_names)), dtype=np.float32))
+"""
+
+REPORT = """
+scored = time.perf_counter()
+import json
+memory = {}
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith(('VmRSS', 'RssAnon', 'RssFile')):
+            key, value = line.split(':')
+            memory[key] = int(value.split()[0])
+print(json.dumps({"load_s": loaded - start, "first_predict_s": scored - loaded, **memory}))
+"""
+
+
+def run_once(loader, model_path):
+    """One cold start in a new interpreter; returns its measurements"""
+    code = f"import warnings\nwarnings.filterwarnings('ignore')\nMODEL = {model_path!r}\n" + loader + REPORT
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(name, samples):
+    def median(key):
+        values = [s[key] for s in samples if key in s]
+        return statistics.median(values) if values else float("nan")
+
+    print(f"{name:<10}{median('load_s') * 1000:>12.1f}{median('first_predict_s') * 1000:>16.2f}"
+          f"{median('VmRSS') / 1024:>10.1f}{median('RssAnon') / 1024:>12.1f}{median('RssFile') / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pickle", default="models/liver_model.pkl")
+    parser.add_argument("--artifact", default="models/liver_model")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    loaders = (("pickle", PICKLE_LOADER, args.pickle), ("artifact", ARTIFACT_LOADER, args.artifact))
+    # One untimed start each so both read their files from the page cache
+    for _, loader, path in loaders:
+        run_once(loader, path)
+
+    print(f"{'format':<10}{'load ms':>12}{'1st predict ms':>16}{'RSS MB':>10}{'anon MB':>12}{'file MB':>12}")
+    for name, loader, path in loaders:
+        summarize(name, [run_once(loader, path) for _ in range(args.runs)])
+    print("\nload = imports + model load; anon memory is private to each process, "
+          "file-backed memory is shared through the page cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,6 @@ API_BASE_URL = "http://127.0.0.1:8000"  # Use this consistently
 # Model paths
 MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
 MODEL_PATH = os.path.join(MODEL_DIR, 'liver_model.pkl')
-FEATURE_NAMES_PATH = os.path.join(MODEL_DIR, 'feature_names.pkl')
\ No newline at end of file
+FEATURE_NAMES_PATH = os.path.join(MODEL_DIR, 'feature_names.pkl')
+# Pickle-free, memory-mappable export of MODEL_PATH (see model_artifact.py)
+MODEL_ARTIFACT_DIR = os.path.join(MODEL_DIR, 'liver_model')
\ No newline at end of file
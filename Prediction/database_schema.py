@@ -0,0 +1,31 @@
+"""
+The MySQL schema, as defined by the API's migrations (Api/migrations).
+
+Scripts that write to tables the API owns (feature_vectors, predictions)
+bring the database up to date with the same migration runner the API uses
+at startup, instead of keeping copies of its CREATE TABLE statements.
+"""
+import os
+import sys
+
+API_DIR = os.getenv(
+    "API_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Api"),
+)
+
+
+def ensure_schema(connect_kwargs):
+    """
+    Apply the API's pending migrations (a no-op when it is up to date).
+
+    Returns:
+        list: Versions applied by this call
+    """
+    if API_DIR not in sys.path:
+        sys.path.append(API_DIR)
+    from schema_migrations import run_migrations
+
+    applied = run_migrations(connect_kwargs)
+    if applied:
+        print(f"Applied schema migrations {', '.join(applied)}")
+    return applied
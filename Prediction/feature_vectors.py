@@ -0,0 +1,71 @@
+"""
+The feature_vectors table (Api/migrations/0004_feature_vectors.sql).
+
+One row per medical test, holding the model input already built: the
+canonical features in feature_names.pkl order, gender encoded and missing
+values imputed by build_feature_matrix, exactly as scoring would compute
+them. Readers select the columns straight into a float32 matrix, with no
+join with patients and no preprocessing.
+
+The queries and row builders here are shared by the API (which writes the
+rows with every test and patient change), the batch scorer,
+backfill_feature_vectors.py and sqldatabase/data_uploading.py.
+"""
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix, canonical_feature_name
+
+FEATURE_COLUMNS = list(CANONICAL_FEATURES)
+PATIENT_FEATURE_COLUMNS = ['age', 'gender_numeric']
+
+# A patient's columns in every one of their vectors, after PUT /patients/{id}
+REFRESH_PATIENT_VECTORS = (
+    "UPDATE feature_vectors SET "
+    + ", ".join(f"{column} = %s" for column in PATIENT_FEATURE_COLUMNS)
+    + " WHERE patient_id = %s"
+)
+
+
+def select_patients_query(n_patients):
+    """Age and gender of n_patients patients, for vector_rows"""
+    return ("SELECT patient_id, age, gender FROM patients WHERE patient_id IN ("
+            + ", ".join(["%s"] * n_patients) + ")")
+
+
+def upsert_query(n_rows):
+    """Multi-row INSERT of n_rows vector_rows() tuples, replacing existing vectors"""
+    columns = ["test_id", "patient_id"] + FEATURE_COLUMNS
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return (
+        f"INSERT INTO feature_vectors ({', '.join(columns)}) VALUES "
+        + ", ".join([row_placeholder] * n_rows)
+        + " ON DUPLICATE KEY UPDATE patient_id = VALUES(patient_id), "
+        + ", ".join(f"{column} = VALUES({column})" for column in FEATURE_COLUMNS)
+    )
+
+
+def vector_rows(tests, patients):
+    """
+    Row tuples (test_id, patient_id, *features) for upsert_query.
+
+    Args:
+        tests: Dicts with test_id, patient_id and the medical test fields
+        patients (dict): patient_id -> dict with age and gender; tests of
+            patients not in it are skipped
+    """
+    records = [
+        dict(test, age=patients[test["patient_id"]]["age"], gender=patients[test["patient_id"]]["gender"])
+        for test in tests if test["patient_id"] in patients
+    ]
+    if not records:
+        return []
+    X = build_feature_matrix(records, FEATURE_COLUMNS)
+    return [(record["test_id"], record["patient_id"], *values) for record, values in zip(records, X.tolist())]
+
+
+def patient_values(age, gender):
+    """(age, gender_numeric) as stored in the vectors, for REFRESH_PATIENT_VECTORS"""
+    return tuple(build_feature_matrix([{"age": age, "gender": gender}], PATIENT_FEATURE_COLUMNS)[0].tolist())
+
+
+def vector_columns(feature_names):
+    """feature_vectors columns in the order of a model's feature names"""
+    return [canonical_feature_name(name) for name in feature_names]
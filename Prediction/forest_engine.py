@@ -0,0 +1,220 @@
+"""
+Lean NumPy inference engine for scikit-learn tree ensembles.
+
+export_forest() flattens a fitted RandomForestClassifier into a handful of
+contiguous arrays, and ForestEvaluator scores a whole batch by walking every
+tree at once, one depth level per step, instead of going through sklearn's
+per-call validation and per-tree dispatch. That overhead dominates small
+batches; for batches of many thousands of rows sklearn's compiled traversal
+is faster (see bench_forest_engine.py).
+
+Usage:
+    python forest_engine.py models/liver_model.pkl models/liver_model_forest.npz
+"""
+import pickle
+import sys
+
+import numpy as np
+
+# Arrays that make up an exported forest
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "classes")
+
+
+def export_forest(model):
+    """
+    Flatten a fitted forest classifier into NumPy arrays.
+
+    Nodes of all trees are concatenated and child indices are global. Leaves
+    point to themselves on both sides.
+
+    Args:
+        model: Fitted RandomForestClassifier / ExtraTreesClassifier
+
+    Returns:
+        dict: feature, threshold, left, right, value (per-node class
+            probabilities), roots (first node of each tree), classes,
+            max_depth, n_features (columns the model was fitted on)
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise ValueError("Only single-output classifiers are supported")
+
+    counts = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int32)
+    n_nodes = int(counts.sum())
+    n_classes = len(model.classes_)
+
+    feature = np.zeros(n_nodes, dtype=np.int32)
+    threshold = np.zeros(n_nodes, dtype=np.float64)
+    left = np.empty(n_nodes, dtype=np.int32)
+    right = np.empty(n_nodes, dtype=np.int32)
+    value = np.empty((n_nodes, n_classes), dtype=np.float64)
+
+    for tree, offset, count in zip(trees, roots, counts):
+        nodes = slice(offset, offset + count)
+        own_index = np.arange(offset, offset + count, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        feature[nodes] = np.where(is_leaf, 0, tree.feature)
+        threshold[nodes] = np.where(is_leaf, 0.0, tree.threshold)
+        left[nodes] = np.where(is_leaf, own_index, tree.children_left + offset)
+        right[nodes] = np.where(is_leaf, own_index, tree.children_right + offset)
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        counts_per_class = tree.value[:, 0, :n_classes]
+        totals = counts_per_class.sum(axis=1, keepdims=True)
+        totals[totals == 0.0] = 1.0
+        value[nodes] = counts_per_class / totals
+
+    return {
+        "feature": feature,
+        "threshold": threshold,
+        "left": left,
+        "right": right,
+        "value": value,
+        "roots": roots,
+        "classes": np.asarray(model.classes_),
+        "max_depth": max(tree.max_depth for tree in trees),
+        "n_features": int(model.n_features_in_),
+    }
+
+
+def save_forest(forest, path):
+    """Write an exported forest to a single .npz file"""
+    np.savez(path, max_depth=np.array(forest["max_depth"]), n_features=np.array(forest["n_features"]),
+             **{name: forest[name] for name in FOREST_ARRAYS})
+
+
+def load_forest(path):
+    """Read a forest written by save_forest"""
+    with np.load(path) as data:
+        forest = {name: data[name] for name in FOREST_ARRAYS}
+        if "n_features" not in data.files:
+            raise ValueError(f"{path} has no n_features; export the model again")
+        forest["max_depth"] = int(data["max_depth"])
+        forest["n_features"] = int(data["n_features"])
+    return forest
+
+
+def _round_down_float32(values):
+    """
+    Largest float32 <= each float64 value.
+
+    For a float32 input x, `x <= t` and `x <= _round_down_float32(t)` always
+    agree, so splits can be evaluated entirely in float32.
+    """
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+# Arrays ForestEvaluator works on directly (see compile_forest)
+COMPILED_ARRAYS = ("feature", "threshold", "children", "is_internal", "value", "roots", "classes")
+
+
+def compile_forest(forest):
+    """
+    Evaluation-ready arrays for an exported forest.
+
+    Thresholds are rounded down to float32 and the child indices are
+    interleaved, so a forest stored in this form can be used without copying
+    (e.g. straight from memory-mapped files). n_features is passed through
+    as a plain int.
+    """
+    left, right = forest["left"], forest["right"]
+    return {
+        "feature": forest["feature"],
+        "threshold": _round_down_float32(forest["threshold"]),
+        # children[2 * node] is the left child, children[2 * node + 1] the right
+        "children": np.stack([left, right], axis=1).ravel(),
+        "is_internal": left != np.arange(len(left), dtype=left.dtype),
+        "value": forest["value"],
+        "roots": forest["roots"],
+        "classes": forest["classes"],
+        "n_features": forest["n_features"],
+    }
+
+
+class ForestEvaluator:
+    """
+    Scores batches against an exported forest.
+
+    Args:
+        forest (dict): Output of export_forest / load_forest, or of compile_forest
+        chunk_size (int): Rows walked together; bounds the working set for
+            very large batches
+    """
+
+    def __init__(self, forest, chunk_size=4096):
+        if "children" not in forest:
+            forest = compile_forest(forest)
+        self.feature = forest["feature"]
+        self.threshold = forest["threshold"]
+        self.children = forest["children"]
+        self._is_internal = forest["is_internal"]
+        self.value = forest["value"]
+        self.roots = forest["roots"]
+        self.classes_ = forest["classes"]
+        self.chunk_size = chunk_size
+        self.n_estimators = len(self.roots)
+        # From the fitted model: the highest feature a split uses can be lower
+        self.n_features = int(forest["n_features"])
+
+    def apply(self, X):
+        """
+        Leaf index reached in every tree for every row of X.
+
+        All (row, tree) pairs advance one level per step; pairs that reach a
+        leaf are dropped, so the work follows the actual path lengths.
+        """
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, n_rows)
+        offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_estimators)
+        positions = np.arange(nodes.size)
+        leaves = np.empty(nodes.size, dtype=nodes.dtype)
+
+        while nodes.size:
+            go_right = flat_X[offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+            internal = self._is_internal[nodes]
+            if not internal.all():
+                finished = ~internal
+                leaves[positions[finished]] = nodes[finished]
+                nodes, offsets, positions = nodes[internal], offsets[internal], positions[internal]
+
+        return leaves.reshape(n_rows, self.n_estimators)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X must be a 2D array with {self.n_features} columns")
+
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            stop = start + self.chunk_size
+            leaves = self.apply(X[start:stop])
+            proba[start:stop] = self.value[leaves].sum(axis=1) / self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    model_path, output_path = sys.argv[1], sys.argv[2]
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    forest = export_forest(model)
+    save_forest(forest, output_path)
+    print(f"Exported {len(forest['roots'])} trees, {len(forest['feature'])} nodes "
+          f"(max depth {forest['max_depth']}) to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Incremental retraining: grow the forest with trees fit on new rows only.
+
+The first run fits a RandomForest on every row and records a high-water
+mark, the highest test_id trained on. Each later run fetches only the tests
+above the mark and adds trees fit on them with warm_start; the existing trees
+are kept as they are. New trees are added in proportion to the new rows, so
+every row carries about the same weight in the vote. The model, its state
+(high-water mark, rows, update history) and a serving artifact
+(model_artifact.py) are written after each update.
+
+Rows whose test_id is a multiple of --holdout-every are never trained on.
+With --compare, a full retrain on all rows up to the new mark is timed as
+well, and both models are scored on those held-out rows, which reports the
+time saved and the accuracy drift of the incremental model.
+
+Sources, all keyed by test_id:
+    mysql     patients / medical_tests / diagnosis (DATABASE_* env variables)
+    parquet   the snapshot from sqldatabase/export_parquet.py
+    csv       indian_liver_patient.csv, the row number standing in for test_id
+              (the order data_uploading.py assigns test_ids in)
+
+Usage:
+    python incremental_train.py --source mysql --compare
+    python incremental_train.py --source parquet
+    python incremental_train.py --reset          # start over with a full fit
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from model_artifact import save_artifact
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix, encode_diagnosis
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(HERE, 'models')
+MODEL_FILE = os.path.join(MODEL_DIR, 'liver_model_incremental.pkl')
+STATE_FILE = os.path.join(MODEL_DIR, 'liver_model_incremental.json')
+ARTIFACT_DIR = os.path.join(MODEL_DIR, 'liver_model_incremental')
+CSV_PATH = os.path.join(HERE, '..', 'sqldatabase', 'indian_liver_patient.csv')
+
+# Settings of the first, full fit; the same settings are used for --compare
+BASE_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+# Database credentials; override with environment variables
+DB_CONFIG = {
+    "host": os.getenv("DATABASE_HOST", "localhost"),
+    "user": os.getenv("DATABASE_USER", "root"),
+    "password": os.getenv("DATABASE_PASSWORD", "StrongPassword123!"),
+    "database": os.getenv("DATABASE_NAME", "liver_disease_db"),
+}
+
+# Every test with its patient and the patient's latest diagnosis
+SELECT_ROWS = (
+    "SELECT t.test_id, p.age, p.gender, t.total_bilirubin, t.direct_bilirubin, t.alkaline_phosphotase, "
+    "t.alamine_aminotransferase, t.aspartate_aminotransferase, t.total_proteins, t.albumin, "
+    "t.albumin_and_globulin_ratio, d.diagnosis "
+    "FROM medical_tests t "
+    "JOIN patients p ON p.patient_id = t.patient_id "
+    "JOIN diagnosis d ON d.diagnosis_id = "
+    "(SELECT MAX(diagnosis_id) FROM diagnosis WHERE patient_id = t.patient_id) "
+    "WHERE t.test_id > %s AND t.test_id <= %s ORDER BY t.test_id"
+)
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def load_mysql(after, upto, fill_values):
+    import pymysql
+
+    connection = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(SELECT_ROWS, (after, upto if upto is not None else 2 ** 31 - 1))
+            rows = cursor.fetchall()
+    finally:
+        connection.close()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(CANONICAL_FEATURES)), np.float32), np.empty(0, np.int8)
+    test_ids = np.array([row['test_id'] for row in rows], dtype=np.int64)
+    labels = encode_diagnosis([row['diagnosis'] for row in rows])
+    return test_ids, build_feature_matrix(rows, CANONICAL_FEATURES, fill_values), labels
+
+
+def load_parquet(after, upto, fill_values):
+    from parquet_dataset import load_test_rows
+    return load_test_rows(after_test_id=after, upto_test_id=upto, fill_values=fill_values)
+
+
+def load_csv(after, upto, fill_values, csv_path=CSV_PATH):
+    frame = pd.read_csv(csv_path)
+    test_ids = np.arange(1, len(frame) + 1, dtype=np.int64)
+    selected = (test_ids > after) & (test_ids <= (upto if upto is not None else len(frame)))
+    frame = frame[selected]
+    return test_ids[selected], build_feature_matrix(frame, CANONICAL_FEATURES, fill_values), \
+        encode_diagnosis(frame['Dataset'])
+
+
+SOURCES = {'mysql': load_mysql, 'parquet': load_parquet, 'csv': load_csv}
+
+
+def split_holdout(test_ids, X, y, holdout_every):
+    held_out = test_ids % holdout_every == 0
+    return (X[~held_out], y[~held_out]), (X[held_out], y[held_out])
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save(model, state):
+    """Model pickle, serving artifact, then state (written last: it marks a complete update)"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp_path = MODEL_FILE + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, MODEL_FILE)
+    save_artifact(model, CANONICAL_FEATURES, ARTIFACT_DIR, extra={
+        'high_water_mark': state['high_water_mark'], 'rows': state['rows'],
+    })
+    _write_json(STATE_FILE, state)
+
+
+def evaluate(model, X, y):
+    if not len(y):
+        return {'accuracy': None, 'roc_auc': None}
+    probabilities = model.predict_proba(X)[:, list(model.classes_).index(1)]
+    return {
+        'accuracy': float(accuracy_score(y, model.predict(X))),
+        'roc_auc': float(roc_auc_score(y, probabilities)) if len(set(y.tolist())) == 2 else None,
+    }
+
+
+def full_fit(X, y):
+    model = RandomForestClassifier(warm_start=True, n_jobs=-1, **BASE_PARAMS)
+    start = time.perf_counter()
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
+
+def bootstrap(load, holdout_every):
+    """First run: fit on every row and set the high-water mark"""
+    # Leave missing ratios as NaN to take their mean over the training rows; that
+    # value fills them in every later update too, so all trees see the same input
+    test_ids, X, y = load(0, None, {'albumin_and_globulin_ratio': np.nan})
+    if not len(test_ids):
+        raise SystemExit("No training rows found")
+    (X_train, y_train), _ = split_holdout(test_ids, X, y, holdout_every)
+    ratio = X_train[:, CANONICAL_FEATURES.index('albumin_and_globulin_ratio')]
+    fill_values = {'albumin_and_globulin_ratio': float(np.nanmean(ratio))}
+    X_train[:, CANONICAL_FEATURES.index('albumin_and_globulin_ratio')] = np.where(
+        np.isnan(ratio), fill_values['albumin_and_globulin_ratio'], ratio
+    )
+
+    model, fit_seconds = full_fit(X_train, y_train)
+    state = {
+        'high_water_mark': int(test_ids.max()),
+        'rows': int(len(y_train)),
+        'holdout_every': holdout_every,
+        'fill_values': fill_values,
+        'history': [{
+            'at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'kind': 'full', 'high_water_mark': int(test_ids.max()), 'new_rows': int(len(y_train)),
+            'trees': model.n_estimators, 'fit_seconds': round(fit_seconds, 3),
+        }],
+    }
+    save(model, state)
+    print(f"Full fit on {len(y_train)} rows up to test_id {state['high_water_mark']} "
+          f"({model.n_estimators} trees) in {fit_seconds:.2f}s")
+    return state
+
+
+def update(load, state, min_rows, compare):
+    """Add trees for the rows above the high-water mark; returns the new state (or the old one)"""
+    with open(MODEL_FILE, 'rb') as f:
+        model = pickle.load(f)
+    holdout_every = state['holdout_every']
+    after = state['high_water_mark']
+
+    fetch_start = time.perf_counter()
+    test_ids, X, y = load(after, None, state['fill_values'])
+    fetch_seconds = time.perf_counter() - fetch_start
+    (X_new, y_new), _ = split_holdout(test_ids, X, y, holdout_every)
+    if len(y_new) < min_rows:
+        print(f"{len(y_new)} new rows after test_id {after}; waiting for at least {min_rows}")
+        return state
+    if set(y_new.tolist()) != set(model.classes_.tolist()):
+        # Trees fit on one class only would not vote on the other
+        print(f"New rows after test_id {after} do not contain every class yet; waiting for more")
+        return state
+
+    new_trees = max(1, math.ceil(model.n_estimators * len(y_new) / state['rows']))
+    model.set_params(n_estimators=model.n_estimators + new_trees)
+    start = time.perf_counter()
+    model.fit(X_new, y_new)
+    fit_seconds = time.perf_counter() - start
+
+    high_water_mark = int(test_ids.max())
+    state = dict(state, high_water_mark=high_water_mark, rows=state['rows'] + int(len(y_new)))
+    entry = {
+        'at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'kind': 'incremental', 'high_water_mark': high_water_mark, 'new_rows': int(len(y_new)),
+        'trees': model.n_estimators, 'fit_seconds': round(fit_seconds, 3),
+        'fetch_seconds': round(fetch_seconds, 3),
+    }
+    print(f"Added {new_trees} trees ({model.n_estimators} total) for {len(y_new)} new rows "
+          f"after test_id {after} in {fit_seconds:.2f}s (fetch {fetch_seconds:.2f}s)")
+
+    if compare:
+        entry['compare'] = compare_full_retrain(load, state, model, fit_seconds + fetch_seconds)
+    state['history'] = state['history'] + [entry]
+    save(model, state)
+    return state
+
+
+def compare_full_retrain(load, state, model, incremental_seconds):
+    """Time a full retrain up to the high-water mark and score both models on the held-out rows"""
+    start = time.perf_counter()
+    test_ids, X, y = load(0, state['high_water_mark'], state['fill_values'])
+    (X_train, y_train), (X_holdout, y_holdout) = split_holdout(test_ids, X, y, state['holdout_every'])
+    full_model, _ = full_fit(X_train, y_train)
+    full_seconds = time.perf_counter() - start
+
+    incremental = evaluate(model, X_holdout, y_holdout)
+    full = evaluate(full_model, X_holdout, y_holdout)
+    drift = {
+        metric: None if incremental[metric] is None or full[metric] is None
+        else round(incremental[metric] - full[metric], 4)
+        for metric in incremental
+    }
+    print(f"\nFull retrain on {len(y_train)} rows: {full_seconds:.2f}s (fetch + fit); incremental "
+          f"{incremental_seconds:.2f}s, saved {full_seconds - incremental_seconds:.2f}s "
+          f"({full_seconds / max(incremental_seconds, 1e-9):.1f}x)")
+    print(f"{'held-out rows':<16}{'accuracy':>10}{'roc_auc':>10}")
+    for name, scores in (('incremental', incremental), ('full retrain', full), ('drift', drift)):
+        print(f"{name:<16}" + "".join(
+            f"{'-' if scores[m] is None else format(scores[m], '.4f'):>10}" for m in ('accuracy', 'roc_auc')
+        ))
+    return {
+        'holdout_rows': int(len(y_holdout)), 'full_seconds': round(full_seconds, 3),
+        'incremental_seconds': round(incremental_seconds, 3),
+        'incremental': incremental, 'full': full, 'drift': drift,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=list(SOURCES), default='mysql')
+    parser.add_argument('--csv', default=CSV_PATH, help="CSV file for --source csv")
+    parser.add_argument('--min-rows', type=int, default=50, help="New rows needed before trees are added")
+    parser.add_argument('--holdout-every', type=int, default=5, help="Hold out tests with test_id %% N == 0")
+    parser.add_argument('--compare', action='store_true', help="Also time a full retrain and report the drift")
+    parser.add_argument('--reset', action='store_true', help="Discard the incremental model and fit from scratch")
+    args = parser.parse_args()
+
+    load = SOURCES[args.source]
+    if args.source == 'csv':
+        def load(after, upto, fill_values):
+            return load_csv(after, upto, fill_values, args.csv)
+
+    if args.reset or not (os.path.exists(STATE_FILE) and os.path.exists(MODEL_FILE)):
+        bootstrap(load, args.holdout_every)
+        return
+    with open(STATE_FILE) as f:
+        state = json.load(f)
+    update(load, state, args.min_rows, args.compare)
+
+
+if __name__ == '__main__':
+    main()
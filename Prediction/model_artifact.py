@@ -0,0 +1,221 @@
+"""
+Pickle-free model artifacts for the RandomForest models.
+
+An artifact is a directory holding metadata.json plus one flat .npy file per
+forest array (in the evaluation-ready form from forest_engine.compile_forest).
+Arrays are opened with np.load(mmap_mode='r'), so loading is a handful of
+mmap calls rather than rebuilding sklearn objects, and every worker process
+that maps the same files shares one copy through the page cache.
+
+Layout:
+    models/liver_model/
+        metadata.json                 format, model version, feature names, array index
+        threshold-<version>.npy ...   one file per array
+
+Usage:
+    python model_artifact.py models/liver_model.pkl models/feature_names.pkl models/liver_model
+
+train_model.py and train_from_csv.py write the artifact next to their
+pickle; artifact directories are build output and are not committed.
+"""
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from forest_engine import COMPILED_ARRAYS, ForestEvaluator, compile_forest, export_forest
+
+ARTIFACT_FORMAT = "liver-forest"
+FORMAT_VERSION = 1
+METADATA_FILE = "metadata.json"
+
+
+def is_artifact(path):
+    """True if path is an artifact directory"""
+    return os.path.isfile(os.path.join(path, METADATA_FILE))
+
+
+def metadata_path(directory):
+    return os.path.join(directory, METADATA_FILE)
+
+
+def newer_model_path(pickle_path, artifact_dir):
+    """
+    The model to load of a pickle and its exported artifact: the artifact,
+    unless the pickle was written after it (retrained without exporting),
+    or whichever of the two exists.
+    """
+    if not is_artifact(artifact_dir):
+        return pickle_path
+    try:
+        pickle_mtime = os.path.getmtime(pickle_path)
+    except OSError:
+        return artifact_dir
+    if pickle_mtime > os.path.getmtime(metadata_path(artifact_dir)):
+        return pickle_path
+    return artifact_dir
+
+
+def _content_version(arrays):
+    digest = hashlib.sha256()
+    for name in COMPILED_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(name.encode())
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _replace(path, write):
+    # Write to a temporary file and rename it into place, so readers never
+    # see a partial file and existing memory maps keep the old inode
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def save_artifact(model, feature_names, directory, extra=None):
+    """
+    Write a fitted forest classifier as an artifact directory.
+
+    Array files carry the model version in their name and metadata.json is
+    replaced last, so a directory being rewritten always describes one
+    complete model.
+
+    Args:
+        model: Fitted RandomForestClassifier / ExtraTreesClassifier
+        feature_names (list): Column order the model was trained on
+        directory (str): Artifact directory (created if missing)
+        extra (dict): Additional metadata, e.g. training parameters and scores
+
+    Returns:
+        dict: The metadata written
+    """
+    forest = export_forest(model)
+    arrays = compile_forest(forest)
+    version = _content_version(arrays)
+    os.makedirs(directory, exist_ok=True)
+
+    index = {}
+    for name in COMPILED_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        filename = f"{name}-{version}.npy"
+        _replace(os.path.join(directory, filename), lambda f, a=array: np.save(f, a, allow_pickle=False))
+        index[name] = {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape)}
+
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+
+    metadata = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": FORMAT_VERSION,
+        "model_version": version,
+        "model_class": type(model).__name__,
+        "sklearn_version": sklearn_version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "feature_names": [str(name) for name in feature_names],
+        "classes": np.asarray(model.classes_).tolist(),
+        "n_estimators": len(forest["roots"]),
+        "n_nodes": len(forest["feature"]),
+        "max_depth": int(forest["max_depth"]),
+        "n_features": int(forest["n_features"]),
+        "arrays": index,
+    }
+    if extra:
+        metadata["extra"] = extra
+    payload = json.dumps(metadata, indent=2).encode()
+    _replace(metadata_path(directory), lambda f: f.write(payload))
+
+    # Drop array files of previous versions; processes still mapping them keep working
+    current = {entry["file"] for entry in index.values()}
+    for filename in os.listdir(directory):
+        if filename.endswith(".npy") and filename not in current:
+            os.remove(os.path.join(directory, filename))
+    return metadata
+
+
+class ModelArtifact:
+    """
+    A loaded artifact. Exposes classes_, predict_proba and predict like the
+    sklearn model it was exported from.
+
+    Attributes:
+        metadata (dict): Contents of metadata.json
+        feature_names (list): Column order expected by predict_proba
+        version (str): Content hash of the model arrays
+    """
+
+    def __init__(self, directory, metadata, arrays):
+        self.directory = directory
+        self.metadata = metadata
+        self.feature_names = list(metadata["feature_names"])
+        self.version = metadata["model_version"]
+        self.evaluator = ForestEvaluator(arrays)
+        self.classes_ = self.evaluator.classes_
+
+    def predict_proba(self, X):
+        return self.evaluator.predict_proba(X)
+
+    def predict(self, X):
+        return self.evaluator.predict(X)
+
+
+def load_artifact(directory, mmap=True):
+    """
+    Open an artifact directory written by save_artifact.
+
+    Args:
+        directory (str): Artifact directory
+        mmap (bool): Memory-map the arrays (shared between processes through
+            the page cache) instead of reading them into private memory
+
+    Returns:
+        ModelArtifact
+    """
+    with open(metadata_path(directory), 'rb') as f:
+        metadata = json.load(f)
+    if metadata.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{directory} is not a {ARTIFACT_FORMAT} artifact")
+    if metadata.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {metadata.get('format_version')}")
+
+    arrays = {}
+    for name in COMPILED_ARRAYS:
+        entry = metadata["arrays"][name]
+        array = np.load(os.path.join(directory, entry["file"]), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ValueError(f"Array {name} does not match the artifact metadata")
+        # Plain ndarray view of the mapping; np.memmap adds overhead to every indexing call
+        arrays[name] = np.asarray(array)
+    # Artifacts written before n_features was recorded have one feature name per column
+    arrays["n_features"] = metadata.get("n_features", len(metadata["feature_names"]))
+    return ModelArtifact(directory, metadata, arrays)
+
+
+def main():
+    if len(sys.argv) != 4:
+        print(__doc__)
+        sys.exit(1)
+    model_path, feature_names_path, directory = sys.argv[1:]
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(feature_names_path, 'rb') as f:
+        feature_names = list(pickle.load(f))
+
+    metadata = save_artifact(model, feature_names, directory, extra={"source": os.path.basename(model_path)})
+    print(f"Wrote artifact {metadata['model_version']} ({metadata['n_estimators']} trees, "
+          f"{metadata['n_nodes']} nodes) to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Read the Parquet snapshot written by sqldatabase/export_parquet.py.
+
+Only the requested columns are read, and files are memory-mapped, so a job
+that needs three columns of medical_tests never touches the others. The
+training set is one row per patient: the latest medical test joined with the
+patient and the latest diagnosis, the same record the API and the batch
+scoring job work with.
+"""
+import os
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix, encode_diagnosis, encode_gender
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PARQUET_DIR = os.path.join(HERE, '..', 'sqldatabase', 'parquet')
+
+MEDICAL_TEST_COLUMNS = [
+    'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphotase',
+    'alamine_aminotransferase', 'aspartate_aminotransferase', 'total_proteins',
+    'albumin', 'albumin_and_globulin_ratio',
+]
+
+
+def read_table(root, table, columns=None, read_dictionary=None):
+    """
+    Columns of one exported table, across all load_date partitions.
+
+    read_dictionary lists string columns to read dictionary-encoded, as
+    small integer codes plus the distinct values, without building a Python
+    string per row.
+
+    Returns:
+        pyarrow.Table
+    """
+    return pq.read_table(os.path.join(root, table), columns=columns, memory_map=True,
+                         read_dictionary=read_dictionary)
+
+
+def snapshot_files(root):
+    """(path, size, mtime) of every part file, for cache keys"""
+    files = []
+    for directory, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+            if filename.endswith('.parquet'):
+                stat = os.stat(os.path.join(directory, filename))
+                files.append((os.path.relpath(os.path.join(directory, filename), root), stat.st_size, stat.st_mtime_ns))
+    return files
+
+
+def _strictly_increasing(values):
+    return bool(np.all(values[1:] > values[:-1]))
+
+
+def _latest_per_patient(table, key):
+    """Rows of table with the highest key per patient_id, ordered by patient_id"""
+    patient_ids = table.column('patient_id').to_numpy()
+    if _strictly_increasing(patient_ids):
+        # One row per patient, already in order (the usual one-test-per-patient export)
+        return table
+    order = np.lexsort((table.column(key).to_numpy(), patient_ids))
+    sorted_ids = patient_ids[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+    return table.take(order[last])
+
+
+def _match(patient_ids, table):
+    """Row of table for each patient id, and whether one exists"""
+    keys = table.column('patient_id').to_numpy()
+    if len(keys) == len(patient_ids) and np.array_equal(keys, patient_ids):
+        return np.arange(len(keys)), np.ones(len(keys), dtype=bool)
+    order = np.argsort(keys, kind='stable')
+    position = np.searchsorted(keys[order], patient_ids).clip(0, max(len(keys) - 1, 0))
+    rows = order[position] if len(keys) else position
+    found = keys[rows] == patient_ids if len(keys) else np.zeros(len(patient_ids), dtype=bool)
+    return rows, found
+
+
+def _join(tests, root, feature_names, fill_values=None):
+    """
+    (test ids, X, y) for test rows joined with their patient and the
+    patient's latest diagnosis; tests without either are left out.
+    """
+    patients = read_table(root, 'patients', ['patient_id', 'age', 'gender'], read_dictionary=['gender'])
+    diagnoses = _latest_per_patient(read_table(root, 'diagnosis', ['diagnosis_id', 'patient_id', 'diagnosis']),
+                                    'diagnosis_id')
+
+    patient_ids = tests.column('patient_id').to_numpy()
+    patient_rows, has_patient = _match(patient_ids, patients)
+    diagnosis_rows, has_diagnosis = _match(patient_ids, diagnoses)
+    keep = has_patient & has_diagnosis
+
+    columns = {name: tests.column(name).to_numpy(zero_copy_only=False)[keep] for name in MEDICAL_TEST_COLUMNS}
+    columns['age'] = patients.column('age').to_numpy(zero_copy_only=False)[patient_rows[keep]]
+    # Encode the few distinct gender strings once, then index by the codes
+    gender = np.concatenate([
+        encode_gender(chunk.dictionary.to_numpy(zero_copy_only=False))[chunk.indices.to_numpy(zero_copy_only=False)]
+        for chunk in patients.column('gender').chunks
+    ]) if patients.num_rows else np.empty(0, dtype=np.float32)
+    columns['gender_numeric'] = gender[patient_rows[keep]]
+
+    if fill_values is None:
+        fill_values = {}
+        ratio_mean = pc.mean(tests.column('albumin_and_globulin_ratio')).as_py()
+        if ratio_mean is not None:
+            fill_values['albumin_and_globulin_ratio'] = ratio_mean
+    X = build_feature_matrix(columns, feature_names, fill_values)
+    y = encode_diagnosis(diagnoses.column('diagnosis').to_numpy()[diagnosis_rows[keep]])
+    return tests.column('test_id').to_numpy()[keep], X, y
+
+
+def load_training_data(root=PARQUET_DIR, feature_names=CANONICAL_FEATURES):
+    """
+    Feature matrix and labels from the snapshot.
+
+    Patients without a test or a diagnosis are left out; missing
+    albumin_and_globulin_ratio values are filled with the column mean, as in
+    train_from_csv.load_training_data.
+
+    Returns:
+        tuple: (X float32 matrix, y int8 labels, feature names)
+    """
+    tests = _latest_per_patient(
+        read_table(root, 'medical_tests', ['test_id', 'patient_id'] + MEDICAL_TEST_COLUMNS), 'test_id'
+    )
+    _, X, y = _join(tests, root, feature_names)
+    return X, y, list(feature_names)
+
+
+def load_test_rows(root=PARQUET_DIR, after_test_id=0, upto_test_id=None,
+                   feature_names=CANONICAL_FEATURES, fill_values=None):
+    """
+    Every medical test with after_test_id < test_id <= upto_test_id, each
+    labelled with its patient's latest diagnosis.
+
+    The key range is pushed down to the Parquet reader, so row groups
+    outside it are skipped.
+
+    Returns:
+        tuple: (test ids, X float32 matrix, y int8 labels), in test_id order
+    """
+    filters = [('test_id', '>', after_test_id)]
+    if upto_test_id is not None:
+        filters.append(('test_id', '<=', upto_test_id))
+    tests = pq.read_table(os.path.join(root, 'medical_tests'), memory_map=True, filters=filters,
+                          columns=['test_id', 'patient_id'] + MEDICAL_TEST_COLUMNS)
+    tests = tests.take(np.argsort(tests.column('test_id').to_numpy(), kind='stable'))
+    return _join(tests, root, feature_names, fill_values)
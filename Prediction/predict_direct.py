@@ -1,10 +1,15 @@
-import pandas as pd
 import pickle
 import os
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix
+from model_artifact import is_artifact, load_artifact, newer_model_path
 
-def load_model(model_path='models/liver_model_from_csv.pkl'):
-    """Load the trained model"""
+def load_model(model_path='models/liver_model_from_csv.pkl', artifact_dir='models/liver_model_from_csv'):
+    """Load the trained model, preferring the memory-mapped artifact unless the pickle is newer"""
     try:
+        if is_artifact(newer_model_path(model_path, artifact_dir)):
+            model = load_artifact(artifact_dir)
+            print(f"Model loaded successfully from {artifact_dir}")
+            return model
         with open(model_path, 'rb') as f:
             model = pickle.load(f)
         print(f"Model loaded successfully from {model_path}")
@@ -40,7 +45,7 @@ def get_user_input():
         'albumin_and_globulin_ratio': float(input("Albumin and Globulin Ratio: "))
     }
     
-    return pd.DataFrame([patient_data])
+    return patient_data
 
 def main():
     # Load the model
@@ -49,24 +54,23 @@ def main():
         print("Could not load the model. Please make sure you've trained it first.")
         return
     
-    # Get feature names
-    features = load_feature_names()
+    # Get feature names (an artifact carries its own)
+    features = getattr(model, 'feature_names', None) or load_feature_names()
     
     # Get user input
     user_data = get_user_input()
     
-    # Ensure we have all required features in the right order
-    if features:
-        # Select only columns that the model was trained on and in correct order
-        user_data = user_data[features]
+    # Build the feature row in the order the model was trained on
+    features = features or CANONICAL_FEATURES
+    X = build_feature_matrix([user_data], features)
     
     # Make prediction
-    prediction = model.predict(user_data)[0]
+    prediction = model.predict(X)[0]
     
     # Get probability if available
     probability = None
     if hasattr(model, "predict_proba"):
-        probabilities = model.predict_proba(user_data)[0]
+        probabilities = model.predict_proba(X)[0]
         probability = probabilities[1] if prediction == 1 else probabilities[0]
     
     # Display results
@@ -81,8 +85,8 @@ def main():
         print(f"Confidence: {probability:.2%}")
     
     print("\nPATIENT DATA USED FOR PREDICTION:")
-    for feature, value in user_data.iloc[0].items():
-        print(f"  {feature}: {value}")
+    for feature, value in zip(features, X[0]):
+        print(f"  {feature}: {value:g}")
         
     print("\nDISCLAIMER: This is a demonstration prediction only and should not")
     print("be used for actual medical diagnosis.")
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def model_file_version(path):
+    """Version string that changes whenever the model file is replaced or rewritten"""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of predict_proba rows.
+
+    Entries are keyed by a hash of the normalized float32 feature vector plus
+    the model version, expire after ttl_seconds, and the whole cache is
+    dropped as soon as it sees a new model version.
+
+    Args:
+        max_size (int): Maximum number of cached feature vectors
+        ttl_seconds (float): Lifetime of an entry; 0 keeps entries until evicted
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(X):
+        # float32, C order, and -0.0 folded into 0.0 so equal vectors hash equally
+        return np.ascontiguousarray(X, dtype=np.float32) + np.float32(0.0)
+
+    @staticmethod
+    def _key(row, model_version):
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16, person=b"liver-predict")
+        digest.update(model_version.encode())
+        return digest.digest()
+
+    def _check_version(self, model_version):
+        # Caller holds the lock
+        if model_version != self._model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_version = model_version
+
+    def lookup(self, X, model_version):
+        """
+        Look up every row of X.
+
+        Returns:
+            tuple: (keys, list with the cached probability row or None per row)
+        """
+        X = self._normalize(X)
+        keys = [self._key(row, model_version) for row in X]
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._check_version(model_version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_seconds and now - entry[0] > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[1])
+        return keys, results
+
+    def store(self, keys, probabilities, model_version):
+        """Cache probability rows under keys returned by lookup()"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(model_version)
+            for key, row in zip(keys, probabilities):
+                self._entries[key] = (now, np.array(row, copy=True))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "model_version": self._model_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def predict_proba_cached(cache, scorer, X, model_version):
+    """
+    predict_proba through the cache: hits are served from memory and all
+    misses are scored together in a single call.
+
+    Args:
+        cache (PredictionCache): Cache to consult, or None to bypass it
+        scorer: Anything with predict_proba (sklearn model, ForestEvaluator)
+        X (np.ndarray): Feature matrix
+        model_version (str): Version of the model behind scorer
+    """
+    if cache is None or cache.max_size <= 0:
+        return scorer.predict_proba(X)
+
+    keys, cached = cache.lookup(X, model_version)
+    missing = [i for i, row in enumerate(cached) if row is None]
+    if not missing:
+        return np.vstack(cached)
+
+    fresh = scorer.predict_proba(X[missing])
+    cache.store([keys[i] for i in missing], fresh, model_version)
+    if len(missing) == len(cached):
+        return fresh
+
+    for i, row in zip(missing, fresh):
+        cached[i] = row
+    return np.vstack(cached)
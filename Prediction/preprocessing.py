@@ -1,49 +1,189 @@
-import pandas as pd
+import numpy as np
 
-def preprocess_patient_data(patient_data, medical_tests_data):
+# Feature order used by models/feature_names.pkl
+CANONICAL_FEATURES = [
+    'age', 'gender_numeric',
+    'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphotase',
+    'alamine_aminotransferase', 'aspartate_aminotransferase',
+    'total_proteins', 'albumin', 'albumin_and_globulin_ratio'
+]
+
+# Every spelling of a feature found in the CSV, the database, the API and the
+# saved feature name lists, mapped to its canonical name
+FEATURE_ALIASES = {
+    'age': 'age',
+    'Age': 'age',
+    'gender_numeric': 'gender_numeric',
+    'gender': 'gender_numeric',
+    'Gender': 'gender_numeric',
+    'total_bilirubin': 'total_bilirubin',
+    'Total_Bilirubin': 'total_bilirubin',
+    'direct_bilirubin': 'direct_bilirubin',
+    'Direct_Bilirubin': 'direct_bilirubin',
+    'alkaline_phosphotase': 'alkaline_phosphotase',
+    'Alkaline_Phosphotase': 'alkaline_phosphotase',
+    'alamine_aminotransferase': 'alamine_aminotransferase',
+    'Alamine_Aminotransferase': 'alamine_aminotransferase',
+    'aspartate_aminotransferase': 'aspartate_aminotransferase',
+    'Aspartate_Aminotransferase': 'aspartate_aminotransferase',
+    'total_proteins': 'total_proteins',
+    'Total_Proteins': 'total_proteins',
+    'Total_Protiens': 'total_proteins',
+    'albumin': 'albumin',
+    'Albumin': 'albumin',
+    'albumin_and_globulin_ratio': 'albumin_and_globulin_ratio',
+    'Albumin_and_Globulin_Ratio': 'albumin_and_globulin_ratio',
+    'albumin_globulin_ratio': 'albumin_and_globulin_ratio',
+}
+
+# Input keys to try for each canonical feature, in order of preference
+_SOURCE_KEYS = {}
+for _alias, _canonical in FEATURE_ALIASES.items():
+    _SOURCE_KEYS.setdefault(_canonical, []).append(_alias)
+
+
+def canonical_feature_name(name):
+    """Map any known spelling of a feature to its canonical name"""
+    try:
+        return FEATURE_ALIASES[name]
+    except KeyError:
+        raise ValueError(f"Unknown feature: {name}")
+
+
+def encode_gender(values):
     """
-    Preprocess patient and medical test data for model prediction.
-    
+    Vectorized gender encoding (Male = 1, Female = 0).
+
+    Args:
+        values: Sequence or array of 'Male'/'Female' strings (any case) or
+            values that are already numeric
+
+    Returns:
+        np.ndarray: float32 array, NaN where the gender is missing or unknown
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'biuf':
+        return arr.astype(np.float32)
+
+    lowered = np.char.lower(np.char.strip(arr.astype(str)))
+    encoded = np.full(lowered.shape, np.nan, dtype=np.float32)
+    encoded[(lowered == 'male') | (lowered == '1') | (lowered == '1.0')] = 1.0
+    encoded[(lowered == 'female') | (lowered == '0') | (lowered == '0.0')] = 0.0
+    return encoded
+
+
+def encode_diagnosis(values):
+    """
+    Vectorized diagnosis encoding (1 = liver disease, 0 = no disease).
+
+    Accepts the CSV's 'Dataset' coding (1 = disease, 2 = no disease) as well
+    as values that are already 0/1.
+    """
+    return (np.asarray(values) == 1).astype(np.int8)
+
+
+def _as_float32(values):
+    try:
+        return np.asarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        # Object columns holding None / empty strings
+        return np.array(
+            [np.nan if v is None or v == '' else float(v) for v in values],
+            dtype=np.float32,
+        )
+
+
+def _column_source(data):
+    """
+    Normalize the supported inputs to (n_rows, get_column).
+
+    get_column(canonical_name) returns the raw column or None if absent.
+    """
+    if isinstance(data, (list, tuple)):
+        records = data
+        # Every key used by any record: records may spell a feature differently
+        keys = set().union(*records)
+
+        def get_column(name):
+            present = [k for k in _SOURCE_KEYS[name] if k in keys]
+            if not present:
+                return None
+            if len(present) == 1:
+                key = present[0]
+                return [record.get(key) for record in records]
+            # Mixed spellings: each record's own, in order of preference
+            return [next((record[k] for k in present if k in record), None) for record in records]
+
+        return len(records), get_column
+
+    if hasattr(data, 'column_names'):  # pyarrow.Table
+        columns = {name: data.column(name) for name in data.column_names}
+    elif hasattr(data, 'columns'):  # pandas.DataFrame
+        columns = {name: data[name] for name in data.columns}
+    else:  # Mapping of column name -> NumPy / Arrow array
+        columns = data
+
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+
+    def get_column(name):
+        key = next((k for k in _SOURCE_KEYS[name] if k in columns), None)
+        return None if key is None else columns[key]
+
+    return n_rows, get_column
+
+
+def build_feature_matrix(data, feature_names=CANONICAL_FEATURES, fill_values=None):
+    """
+    Turn a batch of patient + medical test records into a model-ready matrix.
+
+    Args:
+        data: A list of dicts (patient and test fields merged), a pandas
+            DataFrame, a pyarrow Table or a mapping of column name -> array.
+            Any spelling in FEATURE_ALIASES is accepted.
+        feature_names (list): Column order expected by the model, e.g. the
+            contents of feature_names.pkl
+        fill_values (dict): Canonical feature name -> value used for missing
+            entries; features not listed are filled with 0
+
+    Returns:
+        np.ndarray: C-contiguous float32 matrix of shape (n_rows, len(feature_names))
+    """
+    n_rows, get_column = _column_source(data)
+    canonical = [canonical_feature_name(name) for name in feature_names]
+
+    X = np.empty((n_rows, len(canonical)), dtype=np.float32)
+    for j, name in enumerate(canonical):
+        column = get_column(name)
+        if column is None:
+            X[:, j] = np.nan
+        elif name == 'gender_numeric':
+            X[:, j] = encode_gender(column)
+        else:
+            X[:, j] = _as_float32(column)
+
+    # Impute missing values column by column
+    missing = np.isnan(X)
+    if missing.any():
+        fill_values = fill_values or {}
+        fill = np.array([fill_values.get(name, 0.0) for name in canonical], dtype=np.float32)
+        rows, cols = np.nonzero(missing)
+        X[rows, cols] = fill[cols]
+
+    return X
+
+
+def preprocess_patient_data(patient_data, medical_tests_data, feature_names=CANONICAL_FEATURES):
+    """
+    Preprocess one patient and their medical test data for model prediction.
+
     Args:
         patient_data (dict): Patient demographics
         medical_tests_data (dict): Medical test results
-    
+        feature_names (list): Column order expected by the model
+
     Returns:
-        pd.DataFrame: Preprocessed data ready for model prediction
-    """
-    # Combine patient and medical tests data
-    combined_data = {}
-    
-    # Extract patient information
-    combined_data['age'] = patient_data.get('age')
-    
-    # Convert gender to numeric (Male = 1, Female = 0)
-    gender = patient_data.get('gender')
-    if gender:
-        combined_data['gender_numeric'] = 1 if gender.lower() == 'male' else 0
-    else:
-        combined_data['gender_numeric'] = None
-    
-    # Extract medical test information
-    if medical_tests_data:
-        combined_data['total_bilirubin'] = medical_tests_data.get('total_bilirubin')
-        combined_data['direct_bilirubin'] = medical_tests_data.get('direct_bilirubin')
-        combined_data['alkaline_phosphotase'] = medical_tests_data.get('alkaline_phosphotase')
-        combined_data['alamine_aminotransferase'] = medical_tests_data.get('alamine_aminotransferase')
-        combined_data['aspartate_aminotransferase'] = medical_tests_data.get('aspartate_aminotransferase')
-        combined_data['total_proteins'] = medical_tests_data.get('total_proteins')
-        combined_data['albumin'] = medical_tests_data.get('albumin')
-        combined_data['albumin_and_globulin_ratio'] = medical_tests_data.get('albumin_and_globulin_ratio')
-    
-    # Convert to DataFrame and check for missing values
-    df = pd.DataFrame([combined_data])
-    
-    # Check for missing values
-    missing_columns = df.columns[df.isnull().any()].tolist()
-    if missing_columns:
-        print(f"Warning: Missing values in columns: {missing_columns}")
-        # Replace missing values with mean/median or reasonable defaults
-        # For demo purposes, replacing with zeros (in practice, use better imputation)
-        df.fillna(0, inplace=True)
-    
-    return df
\ No newline at end of file
+        np.ndarray: float32 matrix with a single row
+    """
+    record = dict(patient_data or {})
+    record.update(medical_tests_data or {})
+    return build_feature_matrix([record], feature_names)
@@ -1,17 +1,29 @@
 import requests
 import pickle
-import pandas as pd
 import numpy as np
 from typing import Dict, Any
 import os
+from preprocessing import build_feature_matrix
+from prediction_cache import PredictionCache, model_file_version, predict_proba_cached
+from model_artifact import is_artifact, load_artifact, metadata_path, newer_model_path
 
 # Load configuration
 API_BASE_URL = "http://127.0.0.1:8000"  # Default to test server URL
+MODEL_FILE = 'models/liver_model.pkl'
+# Pickle-free export of MODEL_FILE (model_artifact.py); used unless the pickle is newer
+MODEL_ARTIFACT_DIR = 'models/liver_model'
+
+# Repeated predictions for the same feature vector (dashboard refreshes,
+# retries) are answered from memory; a new model file invalidates the cache
+prediction_cache = PredictionCache(max_size=10000, ttl_seconds=300)
 
 def load_model_and_features():
     """Load the trained model and feature names"""
+    if is_artifact(newer_model_path(MODEL_FILE, MODEL_ARTIFACT_DIR)):
+        model = load_artifact(MODEL_ARTIFACT_DIR)
+        return model, model.feature_names
     try:
-        with open('models/liver_model.pkl', 'rb') as f:
+        with open(MODEL_FILE, 'rb') as f:
             model = pickle.load(f)
         
         with open('models/feature_names.pkl', 'rb') as f:
@@ -22,48 +34,63 @@ def load_model_and_features():
         print("Error: Model files not found. Please run train_model.py first.")
         return None, None
 
-def preprocess_patient_data(patient_data: Dict[str, Any], medical_data: Dict[str, Any]) -> pd.DataFrame:
-    """Preprocess patient and medical test data for prediction"""
-    # Convert gender to binary format (1: Male, 0: Female)
-    gender_binary = 1 if patient_data.get('gender', '').lower() == 'male' else 0
-    
-    # Create a dataframe with the right features in the right order
-    data = pd.DataFrame({
-        'Age': [patient_data.get('age', 0)],
-        'Gender': [gender_binary],
-        'Total_Bilirubin': [medical_data.get('total_bilirubin', 0.0)],
-        'Direct_Bilirubin': [medical_data.get('direct_bilirubin', 0.0)],
-        'Alkaline_Phosphotase': [medical_data.get('alkaline_phosphotase', 0.0)],
-        'Alamine_Aminotransferase': [medical_data.get('alamine_aminotransferase', 0.0)],
-        'Aspartate_Aminotransferase': [medical_data.get('aspartate_aminotransferase', 0.0)],
-        'Total_Proteins': [medical_data.get('total_proteins', 0.0)],
-        'Albumin': [medical_data.get('albumin', 0.0)],
-        'Albumin_and_Globulin_Ratio': [medical_data.get('albumin_globulin_ratio', 0.0)]
-    })
-    
-    return data
+def model_version():
+    """Version of the model file in use, for the prediction cache"""
+    if is_artifact(newer_model_path(MODEL_FILE, MODEL_ARTIFACT_DIR)):
+        return model_file_version(metadata_path(MODEL_ARTIFACT_DIR))
+    return model_file_version(MODEL_FILE)
+
+def preprocess_patient_data(patient_data: Dict[str, Any], medical_data: Dict[str, Any], feature_names) -> np.ndarray:
+    """Preprocess patient and medical test data for prediction, in the model's feature order"""
+    record = dict(patient_data)
+    record.update(medical_data)
+    return build_feature_matrix([record], feature_names)
+
+def split_patient_record(record: Dict[str, Any]):
+    """(patient, medical_test) from one /patient_records record"""
+    patient = {k: v for k, v in record.items() if k not in ('medical_test', 'diagnosis')}
+    return patient, record.get('medical_test')
+
+def fetch_patient_records(ids=None, page_size=10000):
+    """
+    Yield patient records (patient, latest medical test and diagnosis) from the API.
+
+    Fetches the given patient IDs, or all patients, page_size records per
+    request, so scoring N patients takes about N / page_size requests
+    instead of two per patient.
+    """
+    if ids is not None:
+        ids = list(ids)
+        for start in range(0, len(ids), page_size):
+            batch = ",".join(str(i) for i in ids[start:start + page_size])
+            response = requests.get(f"{API_BASE_URL}/patient_records", params={"ids": batch})
+            response.raise_for_status()
+            yield from response.json()["patient_records"]
+        return
+
+    after_id = 0
+    while after_id is not None:
+        response = requests.get(
+            f"{API_BASE_URL}/patient_records", params={"after_id": after_id, "limit": page_size}
+        )
+        response.raise_for_status()
+        page = response.json()
+        yield from page["patient_records"]
+        after_id = page["next_after_id"]
 
 def fetch_patient_data():
-    """Fetch the latest patient data from the API"""
+    """Fetch the latest patient and their latest medical test from the API in one request"""
     try:
-        # Get latest patient
-        patient_response = requests.get(f"{API_BASE_URL}/patients/latest/")
-        if patient_response.status_code != 200:
-            print(f"Error fetching patient data: {patient_response.status_code}")
+        response = requests.get(f"{API_BASE_URL}/patient_records/latest")
+        if response.status_code != 200:
+            print(f"Error fetching patient data: {response.status_code}")
             return None, None
-        
-        patient = patient_response.json()
-        patient_id = patient.get('patient_id')
-        
-        # Get medical test data for this patient
-        med_test_response = requests.get(f"{API_BASE_URL}/medical_tests/patient/{patient_id}")
-        if med_test_response.status_code != 200:
-            print(f"Error fetching medical test data: {med_test_response.status_code}")
-            return patient, None
-            
-        medical_test = med_test_response.json()
+
+        patient, medical_test = split_patient_record(response.json())
+        if medical_test is None:
+            print(f"No medical test found for patient {patient.get('patient_id')}")
         return patient, medical_test
-    
+
     except requests.exceptions.RequestException as e:
         print(f"Network error: {e}")
         print("Is the API server running? If using test server, run test_server.py first.")
@@ -107,15 +134,14 @@ def predict_liver_disease():
     print(f"Albumin: {medical_test.get('albumin', 'N/A')}")
     print(f"Albumin/Globulin Ratio: {medical_test.get('albumin_globulin_ratio', 'N/A')}")
     
-    # Preprocess the data
-    preprocessed_data = preprocess_patient_data(patient, medical_test)
-    
-    # Ensure the columns match the expected feature names
-    preprocessed_data = preprocessed_data.reindex(columns=feature_names)
+    # Preprocess the data into the model's feature order
+    preprocessed_data = preprocess_patient_data(patient, medical_test, feature_names)
     
-    # Make prediction
-    prediction = model.predict(preprocessed_data)[0]
-    prediction_proba = model.predict_proba(preprocessed_data)[0]
+    # Make prediction (one predict_proba call gives both label and confidence)
+    prediction_proba = predict_proba_cached(
+        prediction_cache, model, preprocessed_data, model_version()
+    )[0]
+    prediction = model.classes_[prediction_proba.argmax()]
     
     # Interpret results
     print("\nPrediction Results:")
@@ -117,6 +117,31 @@ def get_medical_test_by_patient(patient_id: int):
             return test
     raise HTTPException(status_code=404, detail="Medical test not found for this patient")
 
+# Patient with latest medical test, same shape as the main API's /patient_records
+def patient_record(patient: Patient):
+    record = patient.model_dump()
+    tests = [test for test in medical_tests if test.patient_id == patient.patient_id]
+    latest = max(tests, key=lambda test: test.test_id) if tests else None
+    record["medical_test"] = latest.model_dump(exclude={"patient_id"}) if latest else None
+    record["diagnosis"] = None
+    return record
+
+@app.get("/patient_records")
+def get_patient_records(ids: Optional[str] = None, after_id: int = 0, limit: int = 100):
+    if ids is not None:
+        wanted = {int(part) for part in ids.split(",") if part.strip()}
+        selected = [p for p in patients if p.patient_id in wanted]
+        return {"patient_records": [patient_record(p) for p in selected], "next_after_id": None}
+    selected = sorted((p for p in patients if p.patient_id > after_id), key=lambda p: p.patient_id)[:limit]
+    next_after_id = selected[-1].patient_id if len(selected) == limit else None
+    return {"patient_records": [patient_record(p) for p in selected], "next_after_id": next_after_id}
+
+@app.get("/patient_records/latest")
+def get_latest_patient_record():
+    if not patients:
+        raise HTTPException(status_code=404, detail="No patients found")
+    return patient_record(max(patients, key=lambda p: p.patient_id))
+
 if __name__ == "__main__":
     print("Starting test server on http://127.0.0.1:8000")
     print("Press Ctrl+C to stop the server")
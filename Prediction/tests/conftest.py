@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The Prediction modules are imported as top-level modules, as the scripts do
+PREDICTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PREDICTION_DIR not in sys.path:
+    sys.path.insert(0, PREDICTION_DIR)
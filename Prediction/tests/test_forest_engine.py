@@ -0,0 +1,89 @@
+"""ForestEvaluator must score exactly like the sklearn forest it was exported from."""
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from forest_engine import ForestEvaluator, export_forest
+from model_artifact import load_artifact, save_artifact
+
+N_FEATURES = 10
+# Below, at and above the evaluator's chunk size (4096)
+BATCH_SIZES = [1, 32, 1024, 10_000]
+
+
+def training_data(n_rows=2000, seed=0):
+    """Lab-like values on a coarse grid, so many rows sit right next to a split threshold"""
+    rng = np.random.default_rng(seed)
+    X = np.round(rng.lognormal(mean=1.0, sigma=0.8, size=(n_rows, N_FEATURES)), 1).astype(np.float32)
+    y = (X[:, 2] + 0.5 * X[:, 4] - X[:, 7] + rng.normal(0, 1, n_rows) > 2).astype(np.int8)
+    return X, y
+
+
+def scoring_rows(model, n_rows, seed=1):
+    """
+    Rows mixing three kinds of values per column: training-like values,
+    float32 thresholds of the forest itself and the next float32 above them
+    (where float32 / float64 rounding decides the branch).
+    """
+    rng = np.random.default_rng(seed)
+    X, _ = training_data(n_rows, seed)
+    forest = export_forest(model)
+    internal = forest["left"] != np.arange(len(forest["left"]))
+    for column in range(N_FEATURES):
+        thresholds = forest["threshold"][internal & (forest["feature"] == column)].astype(np.float32)
+        if not len(thresholds):
+            continue
+        kind = rng.integers(0, 3, n_rows)
+        picked = rng.choice(thresholds, n_rows)
+        X[kind == 1, column] = picked[kind == 1]
+        X[kind == 2, column] = np.nextafter(picked[kind == 2], np.float32(np.inf))
+    return X
+
+
+@pytest.fixture(scope="module", params=[RandomForestClassifier, ExtraTreesClassifier])
+def model(request):
+    X, y = training_data()
+    return request.param(n_estimators=50, random_state=42).fit(X, y)
+
+
+@pytest.mark.parametrize("n_rows", BATCH_SIZES)
+def test_predict_proba_matches_sklearn(model, n_rows):
+    X = scoring_rows(model, n_rows)
+    evaluator = ForestEvaluator(export_forest(model))
+    np.testing.assert_allclose(evaluator.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("n_rows", BATCH_SIZES)
+def test_predict_matches_sklearn(model, n_rows):
+    X = scoring_rows(model, n_rows)
+    evaluator = ForestEvaluator(export_forest(model))
+    np.testing.assert_array_equal(evaluator.predict(X), model.predict(X))
+
+
+def test_small_chunks_match_one_chunk(model):
+    X = scoring_rows(model, 1000)
+    forest = export_forest(model)
+    np.testing.assert_array_equal(
+        ForestEvaluator(forest, chunk_size=7).predict_proba(X), ForestEvaluator(forest).predict_proba(X)
+    )
+
+
+def test_column_count_must_match_the_fitted_model():
+    X, y = training_data(500)
+    # A constant last column is never split on
+    X = np.hstack([X, np.zeros((len(X), 1), dtype=np.float32)])
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    evaluator = ForestEvaluator(export_forest(model))
+
+    assert evaluator.n_features == N_FEATURES + 1
+    np.testing.assert_allclose(evaluator.predict_proba(X[:5]), model.predict_proba(X[:5]), rtol=0, atol=1e-12)
+    for columns in (N_FEATURES, N_FEATURES + 2):
+        with pytest.raises(ValueError):
+            evaluator.predict_proba(np.zeros((5, columns), dtype=np.float32))
+
+
+def test_saved_artifact_keeps_n_features(model, tmp_path):
+    save_artifact(model, [f"f{i}" for i in range(N_FEATURES)], str(tmp_path))
+    artifact = load_artifact(str(tmp_path))
+    assert artifact.metadata["n_features"] == N_FEATURES
+    assert artifact.evaluator.n_features == N_FEATURES
@@ -0,0 +1,25 @@
+"""build_feature_matrix must read every record by its own spelling of each feature."""
+import numpy as np
+import pandas as pd
+
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix
+
+
+def test_records_with_mixed_spellings():
+    records = [
+        {"Age": 40, "Gender": "Male", "Total_Bilirubin": 1.5, "Total_Protiens": 6.8},
+        {"age": 50, "gender": "Female", "total_bilirubin": 2.5, "total_proteins": 7.1},
+        {"age": 60, "gender_numeric": 1},
+    ]
+    X = build_feature_matrix(records, CANONICAL_FEATURES)
+    column = {name: j for j, name in enumerate(CANONICAL_FEATURES)}
+
+    np.testing.assert_array_equal(X[:, column["age"]], [40, 50, 60])
+    np.testing.assert_array_equal(X[:, column["gender_numeric"]], [1, 0, 1])
+    np.testing.assert_array_equal(X[:, column["total_bilirubin"]], [1.5, 2.5, 0])
+    np.testing.assert_allclose(X[:, column["total_proteins"]], [6.8, 7.1, 0])
+
+
+def test_records_match_a_dataframe_of_the_same_rows():
+    records = [{"Age": 65, "Gender": "Female", "Albumin": 3.3}, {"Age": 62, "Gender": "Male", "Albumin": 3.2}]
+    np.testing.assert_array_equal(build_feature_matrix(records), build_feature_matrix(pd.DataFrame(records)))
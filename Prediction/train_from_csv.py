@@ -2,20 +2,33 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report
 import pickle
 import os
+from preprocessing import build_feature_matrix, encode_diagnosis
+from model_artifact import save_artifact
 
 # Path to the dataset
 CSV_PATH = os.path.join('..', 'sqldatabase', 'indian_liver_patient.csv')
 
-def train_model_from_csv():
-    print("Training liver disease prediction model from CSV data...")
+# Model input columns, in order
+FEATURES = [
+    'Age', 'gender_numeric', 
+    'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphotase', 
+    'alamine_aminotransferase', 'aspartate_aminotransferase', 
+    'total_proteins', 'albumin', 'albumin_and_globulin_ratio'
+]
+
+def load_training_data(csv_path=CSV_PATH):
+    """
+    Load and preprocess the CSV dataset.
     
+    Returns:
+        tuple: (X float32 matrix, y int8 labels, feature names)
+    """
     # Load the dataset
-    print(f"Loading data from {CSV_PATH}")
-    df = pd.read_csv(CSV_PATH)
+    print(f"Loading data from {csv_path}")
+    df = pd.read_csv(csv_path)
     
     # Display basic information about the dataset
     print("\nDataset Information:")
@@ -38,32 +51,27 @@ def train_model_from_csv():
         'Dataset': 'diagnosis'
     }, inplace=True)
     
-    # Convert gender to numeric (Male=1, Female=0)
-    df['gender_numeric'] = df['Gender'].apply(lambda x: 1 if x == 'Male' else 0)
-    
     # Handle missing values
-    if df['albumin_and_globulin_ratio'].isna().sum() > 0:
+    fill_values = {}
+    missing_ratio = df['albumin_and_globulin_ratio'].isna().sum()
+    if missing_ratio > 0:
         mean_value = df['albumin_and_globulin_ratio'].mean()
-        print(f"Replacing {df['albumin_and_globulin_ratio'].isna().sum()} missing values in albumin_and_globulin_ratio with mean: {mean_value:.2f}")
-        df['albumin_and_globulin_ratio'].fillna(mean_value, inplace=True)
+        print(f"Replacing {missing_ratio} missing values in albumin_and_globulin_ratio with mean: {mean_value:.2f}")
+        fill_values['albumin_and_globulin_ratio'] = mean_value
+    
+    # Vectorized gender encoding (Male=1, Female=0) and imputation into a float32 matrix
+    X = build_feature_matrix(df, FEATURES, fill_values)
     
-    # Adjust the diagnosis values if needed
     # In the dataset: 1=liver disease, 2=no liver disease
     # We want: 1=liver disease, 0=no liver disease
-    if 2 in df['diagnosis'].unique():
-        print("Converting diagnosis values: 2 -> 0 (no liver disease)")
-        df['diagnosis'] = df['diagnosis'].replace(2, 0)
+    y = encode_diagnosis(df['diagnosis'])
     
-    # Select features
-    features = [
-        'Age', 'gender_numeric', 
-        'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphotase', 
-        'alamine_aminotransferase', 'aspartate_aminotransferase', 
-        'total_proteins', 'albumin', 'albumin_and_globulin_ratio'
-    ]
+    return X, y, list(FEATURES)
+
+def train_model_from_csv():
+    print("Training liver disease prediction model from CSV data...")
     
-    X = df[features]
-    y = df['diagnosis']
+    X, y, features = load_training_data()
     
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -101,6 +109,11 @@ def train_model_from_csv():
     
     print(f"Feature names saved to {feature_path}")
     
+    # Export the artifact the API and CLI load, so it never lags behind the pickle
+    artifact_dir = os.path.join(model_dir, 'liver_model_from_csv')
+    metadata = save_artifact(model, features, artifact_dir, extra={"source": "train_from_csv.py"})
+    print(f"Model artifact {metadata['model_version']} saved to {artifact_dir}")
+    
     return model_path
 
 if __name__ == "__main__":
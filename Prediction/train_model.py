@@ -5,6 +5,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import pickle
 import os
+from preprocessing import CANONICAL_FEATURES, build_feature_matrix, encode_diagnosis
+from model_artifact import save_artifact
 
 # Create directories if they don't exist
 os.makedirs('models', exist_ok=True)
@@ -79,12 +81,13 @@ def train_model():
     print("Generating synthetic liver disease data...")
     data = generate_synthetic_data(2000)  # Generate 2000 synthetic samples
     
-    # Separate features and target
-    X = data.drop('Dataset', axis=1)
-    y = data['Dataset']
+    # Separate features and target; columns are stored under their canonical
+    # names so the API and batch tools can build matching matrices
+    feature_names = CANONICAL_FEATURES
+    X = build_feature_matrix(data, feature_names)
+    y = encode_diagnosis(data['Dataset'])
     
     # Save feature names for later use
-    feature_names = list(X.columns)
     with open('models/feature_names.pkl', 'wb') as f:
         pickle.dump(feature_names, f)
     
@@ -108,6 +111,10 @@ def train_model():
     with open('models/liver_model.pkl', 'wb') as f:
         pickle.dump(model, f)
     
+    # Export the artifact the API and CLI load, so it never lags behind the pickle
+    metadata = save_artifact(model, feature_names, 'models/liver_model', extra={"source": "train_model.py"})
+    print(f"Saving model artifact {metadata['model_version']} to models/liver_model")
+    
     print("Model training and saving complete.")
     return model
 
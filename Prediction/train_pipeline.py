@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Parallel, reproducible training pipeline for the liver disease model.
+
+Runs stratified k-fold cross-validation for every candidate of a grid or
+random hyperparameter search over RandomForest settings. Each (trial, fold)
+fit is one task on a process pool, so all cores stay busy. The preprocessed
+matrix, labels and fold assignment are cached as .npy files keyed by the
+input data; workers memory-map them instead of receiving pickled copies, and
+later runs skip preprocessing entirely. Every fit uses a fixed random_state,
+so results do not depend on the number of workers.
+
+The best candidate is refit on all rows and written as a model artifact
+(model_artifact.py) with its CV metrics in metadata.json; the full trial
+table is stored next to it in cv_results.json.
+
+Usage:
+    python train_pipeline.py --data csv --search grid --folds 5
+    python train_pipeline.py --data synthetic --search random --n-iter 20 --workers 8
+    python train_pipeline.py --data parquet      # snapshot from sqldatabase/export_parquet.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+
+from model_artifact import save_artifact
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.cache', 'training')
+CSV_PATH = os.path.join(HERE, '..', 'sqldatabase', 'indian_liver_patient.csv')
+# Snapshot written by sqldatabase/export_parquet.py
+PARQUET_DIR = os.path.join(HERE, '..', 'sqldatabase', 'parquet')
+DEFAULT_OUTPUT = {
+    'csv': os.path.join(HERE, 'models', 'liver_model_from_csv'),
+    'parquet': os.path.join(HERE, 'models', 'liver_model_from_parquet'),
+    'synthetic': os.path.join(HERE, 'models', 'liver_model'),
+}
+METRICS = ('accuracy', 'roc_auc', 'f1')
+
+# Candidates for --search grid
+PARAM_GRID = {
+    'n_estimators': [100, 300],
+    'max_depth': [None, 10],
+    'min_samples_leaf': [1, 3, 5],
+    'max_features': ['sqrt', 0.5],
+}
+
+# Space sampled by --search random
+PARAM_SPACE = {
+    'n_estimators': [50, 100, 200, 300, 400, 500],
+    'max_depth': [None, 4, 6, 8, 12, 16, 24],
+    'min_samples_leaf': [1, 2, 3, 5, 8, 10],
+    'max_features': ['sqrt', 'log2', 0.3, 0.5, 0.8],
+    'class_weight': [None, 'balanced'],
+}
+
+
+def load_source(data, n_samples):
+    """(X, y, feature names) for a data source"""
+    if data == 'csv':
+        from train_from_csv import load_training_data
+        return load_training_data(CSV_PATH)
+    if data == 'parquet':
+        from parquet_dataset import load_training_data
+        return load_training_data(PARQUET_DIR)
+
+    from preprocessing import CANONICAL_FEATURES, build_feature_matrix, encode_diagnosis
+    from train_model import generate_synthetic_data
+    frame = generate_synthetic_data(n_samples)
+    return build_feature_matrix(frame, CANONICAL_FEATURES), encode_diagnosis(frame['Dataset']), list(CANONICAL_FEATURES)
+
+
+def dataset_key(data, n_samples):
+    """Cache key that is known before any preprocessing is done"""
+    digest = hashlib.sha256(data.encode())
+    if data == 'csv':
+        with open(CSV_PATH, 'rb') as f:
+            digest.update(f.read())
+        with open(os.path.join(HERE, 'train_from_csv.py'), 'rb') as f:
+            digest.update(f.read())
+    elif data == 'parquet':
+        # File names, sizes and mtimes; an incremental export adds part files
+        from parquet_dataset import snapshot_files
+        digest.update(json.dumps(snapshot_files(PARQUET_DIR)).encode())
+        with open(os.path.join(HERE, 'parquet_dataset.py'), 'rb') as f:
+            digest.update(f.read())
+    else:
+        digest.update(str(n_samples).encode())
+    with open(os.path.join(HERE, 'preprocessing.py'), 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def prepare_dataset(data, n_samples, folds, seed, cache_dir=CACHE_DIR):
+    """
+    Build (or reuse) the cached matrices and fold assignment.
+
+    Returns:
+        tuple: (cache directory, fold file name, feature names)
+    """
+    key = dataset_key(data, n_samples)
+    directory = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(directory, 'features.json')):
+        print(f"Using cached dataset {key}")
+    else:
+        X, y, feature_names = load_source(data, n_samples)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'X.npy'), np.ascontiguousarray(X, dtype=np.float32))
+        np.save(os.path.join(directory, 'y.npy'), np.asarray(y, dtype=np.int8))
+        # Written last: its presence marks a complete cache entry
+        with open(os.path.join(directory, 'features.json'), 'w') as f:
+            json.dump(feature_names, f)
+        print(f"Cached dataset {key} ({len(y)} rows)")
+
+    fold_file = f'folds-k{folds}-seed{seed}.npy'
+    fold_path = os.path.join(directory, fold_file)
+    if not os.path.exists(fold_path):
+        y = np.load(os.path.join(directory, 'y.npy'))
+        # Test fold of every row
+        assignment = np.empty(len(y), dtype=np.int8)
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+        for fold, (_, test_index) in enumerate(splitter.split(np.zeros(len(y)), y)):
+            assignment[test_index] = fold
+        np.save(fold_path, assignment)
+
+    with open(os.path.join(directory, 'features.json')) as f:
+        feature_names = json.load(f)
+    return directory, fold_file, feature_names
+
+
+def candidates(search, n_iter, seed):
+    """Parameter sets to evaluate"""
+    if search == 'grid':
+        return list(ParameterGrid(PARAM_GRID))
+    return list(ParameterSampler(PARAM_SPACE, n_iter=n_iter, random_state=seed))
+
+
+# Per-process dataset, memory-mapped once by _init_worker
+_dataset = {}
+
+
+def _init_worker(directory, fold_file):
+    _dataset['X'] = np.load(os.path.join(directory, 'X.npy'), mmap_mode='r')
+    _dataset['y'] = np.load(os.path.join(directory, 'y.npy'), mmap_mode='r')
+    _dataset['folds'] = np.load(os.path.join(directory, fold_file), mmap_mode='r')
+
+
+def _fit_fold(trial, params, fold, seed):
+    """Fit one candidate on one fold; returns its scores and timings"""
+    X, y, folds = _dataset['X'], _dataset['y'], _dataset['folds']
+    test = np.asarray(folds) == fold
+    started = time.time()
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    model.fit(X[~test], y[~test])
+    fit_seconds = time.perf_counter() - start
+
+    probabilities = model.predict_proba(X[test])[:, list(model.classes_).index(1)]
+    predictions = model.predict(X[test])
+    scores = {
+        'accuracy': accuracy_score(y[test], predictions),
+        'roc_auc': roc_auc_score(y[test], probabilities),
+        'f1': f1_score(y[test], predictions),
+    }
+    return trial, fold, scores, fit_seconds, started, time.time()
+
+
+def run_search(directory, fold_file, param_sets, folds, seed, workers):
+    """
+    Cross-validate every parameter set on a process pool.
+
+    Returns:
+        list: One dict per trial with params, mean/std of each metric,
+            summed fit time and wall time from first fold start to last fold end
+    """
+    fold_results = {trial: [] for trial in range(len(param_sets))}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(directory, fold_file)) as pool:
+        futures = [
+            pool.submit(_fit_fold, trial, params, fold, seed)
+            for trial, params in enumerate(param_sets)
+            for fold in range(folds)
+        ]
+        for future in as_completed(futures):
+            trial, fold, scores, fit_seconds, started, finished = future.result()
+            fold_results[trial].append((scores, fit_seconds, started, finished))
+            if len(fold_results[trial]) == folds:
+                done = sum(len(r) == folds for r in fold_results.values())
+                wall = max(r[3] for r in fold_results[trial]) - min(r[2] for r in fold_results[trial])
+                auc = np.mean([r[0]['roc_auc'] for r in fold_results[trial]])
+                print(f"  [{done}/{len(param_sets)}] trial {trial}: roc_auc {auc:.4f}  wall {wall:.2f}s  {param_sets[trial]}")
+
+    trials = []
+    for trial, params in enumerate(param_sets):
+        results = fold_results[trial]
+        summary = {'trial': trial, 'params': params}
+        for metric in METRICS:
+            values = [r[0][metric] for r in results]
+            summary[f'{metric}_mean'] = float(np.mean(values))
+            summary[f'{metric}_std'] = float(np.std(values))
+        summary['fit_seconds'] = float(sum(r[1] for r in results))
+        summary['wall_seconds'] = float(max(r[3] for r in results) - min(r[2] for r in results))
+        trials.append(summary)
+    return trials
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', choices=('csv', 'parquet', 'synthetic'), default='csv')
+    parser.add_argument('--samples', type=int, default=2000, help="Rows for --data synthetic")
+    parser.add_argument('--search', choices=('grid', 'random'), default='grid')
+    parser.add_argument('--n-iter', type=int, default=20, help="Candidates for --search random")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--scoring', choices=METRICS, default='roc_auc')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help="Artifact directory (default depends on --data)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    directory, fold_file, feature_names = prepare_dataset(args.data, args.samples, args.folds, args.seed)
+    param_sets = candidates(args.search, args.n_iter, args.seed)
+    print(f"\n{args.search} search: {len(param_sets)} candidates x {args.folds} folds "
+          f"on {args.workers} worker processes")
+    search_start = time.perf_counter()
+    trials = run_search(directory, fold_file, param_sets, args.folds, args.seed, args.workers)
+    search_seconds = time.perf_counter() - search_start
+
+    trials.sort(key=lambda t: t[f'{args.scoring}_mean'], reverse=True)
+    print(f"\n{'trial':>5}{'accuracy':>10}{'roc_auc':>10}{'f1':>8}{'fit s':>8}{'wall s':>8}  params")
+    for t in trials:
+        print(f"{t['trial']:>5}{t['accuracy_mean']:>10.4f}{t['roc_auc_mean']:>10.4f}{t['f1_mean']:>8.4f}"
+              f"{t['fit_seconds']:>8.2f}{t['wall_seconds']:>8.2f}  {t['params']}")
+    total_fit = sum(t['fit_seconds'] for t in trials)
+    print(f"\nSearch wall time {search_seconds:.1f}s for {total_fit:.1f}s of fitting "
+          f"({total_fit / search_seconds:.1f}x parallel speedup)")
+
+    best = trials[0]
+    print(f"\nBest {args.scoring}: {best[f'{args.scoring}_mean']:.4f} with {best['params']}; refitting on all rows")
+    X = np.load(os.path.join(directory, 'X.npy'))
+    y = np.load(os.path.join(directory, 'y.npy'))
+    model = RandomForestClassifier(random_state=args.seed, n_jobs=-1, **best['params']).fit(X, y)
+
+    output = args.output or DEFAULT_OUTPUT[args.data]
+    metadata = save_artifact(model, feature_names, output, extra={
+        'data': args.data,
+        'dataset_key': os.path.basename(directory),
+        'search': args.search,
+        'folds': args.folds,
+        'seed': args.seed,
+        'scoring': args.scoring,
+        'params': best['params'],
+        'cv': {metric: {'mean': best[f'{metric}_mean'], 'std': best[f'{metric}_std']} for metric in METRICS},
+        'trials': len(trials),
+    })
+    with open(os.path.join(output, 'cv_results.json'), 'w') as f:
+        json.dump(trials, f, indent=2)
+    print(f"Wrote artifact {metadata['model_version']} to {output} "
+          f"(total {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
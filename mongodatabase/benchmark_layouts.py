@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Read benchmark: three-collection layout versus embedded patient_records.
+
+Loads the CSV (repeated --scale times) into a scratch database in the
+three-collection layout, migrates it to patient_records, then times
+
+- point lookups of one full patient record by id:
+    normalized  find_one + two finds on patient_id
+    lookup      one aggregate with $lookup
+    embedded    one find_one on patient_records
+- a full scan that materializes every patient record, for each layout
+
+Usage:
+    python benchmark_layouts.py [--scale 10] [--lookups 2000] [--database layout_bench]
+    python benchmark_layouts.py --mock      # mongomock, only checks that everything runs
+"""
+import argparse
+import random
+import statistics
+import time
+
+from embedded_schema import ensure_indexes, get_patient_record, lookup_pipeline, migrate_to_embedded
+from stream_loader import COLLECTIONS, EMBEDDED_COLLECTION, get_client, stream_load
+
+
+def load(db, csv_file, scale):
+    for name in COLLECTIONS + (EMBEDDED_COLLECTION,):
+        db[name].drop()
+    for _ in range(scale):
+        stream_load(db, csv_file, collections=COLLECTIONS)
+    start = time.perf_counter()
+    migrate_to_embedded(db)
+    ensure_indexes(db)
+    return time.perf_counter() - start
+
+
+def time_point_lookups(db, ids, layout):
+    latencies = []
+    for patient_id in ids:
+        start = time.perf_counter()
+        record = get_patient_record(db, patient_id, layout)
+        latencies.append(time.perf_counter() - start)
+        assert record is not None and record["medical_tests"] and record["diagnosis"]
+    return latencies
+
+
+def scan_normalized(db):
+    # Three full scans joined on the client
+    tests, diagnoses = {}, {}
+    for doc in db.medical_tests.find():
+        tests.setdefault(doc["patient_id"], []).append(doc)
+    for doc in db.diagnosis.find():
+        diagnoses.setdefault(doc["patient_id"], []).append(doc)
+    return sum(1 for p in db.patients.find() if tests.get(p["_id"]) and diagnoses.get(p["_id"]))
+
+
+def scan_lookup(db):
+    return sum(1 for _ in db.patients.aggregate(lookup_pipeline()))
+
+
+def scan_embedded(db):
+    return sum(1 for _ in db[EMBEDDED_COLLECTION].find())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="indian_liver_patient.csv")
+    parser.add_argument("--scale", type=int, default=10, help="Times the CSV is loaded")
+    parser.add_argument("--lookups", type=int, default=2000, help="Point lookups per layout")
+    parser.add_argument("--database", default="layout_bench", help="Scratch database (dropped collections)")
+    parser.add_argument("--mock", action="store_true", help="Use an in-memory mongomock database")
+    args = parser.parse_args()
+
+    db = get_client(mock=args.mock)[args.database]
+    migration_s = load(db, args.csv, args.scale)
+    n_patients = db.patients.count_documents({})
+    print(f"{n_patients} patients; migration to {EMBEDDED_COLLECTION} took {migration_s:.2f}s\n")
+
+    all_ids = [p["_id"] for p in db.patients.find({}, {"_id": 1})]
+    ids = random.Random(0).choices(all_ids, k=args.lookups)
+
+    print(f"{'layout':<12}{'lookup p50 us':>15}{'lookup p99 us':>15}{'lookups/s':>12}{'full scan s':>13}")
+    for layout, scan in (("normalized", scan_normalized), ("lookup", scan_lookup), ("embedded", scan_embedded)):
+        time_point_lookups(db, ids[:50], layout)  # warm-up
+        latencies = sorted(time_point_lookups(db, ids, layout))
+        start = time.perf_counter()
+        scanned = scan(db)
+        scan_s = time.perf_counter() - start
+        assert scanned == n_patients, f"{layout}: scanned {scanned} of {n_patients} records"
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{layout:<12}{statistics.median(latencies) * 1e6:>15.0f}{p99 * 1e6:>15.0f}"
+              f"{len(latencies) / sum(latencies):>12,.0f}{scan_s:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
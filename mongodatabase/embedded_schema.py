@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Embedded-document layout: one patient_records document per patient.
+
+    {
+        "_id": <patient ObjectId, same as in patients>,
+        "Age": 65, "Gender": 0,
+        "medical_tests": [{"_id": ..., "Total_Bilirubin": 0.7, ...}],
+        "diagnosis": [{"_id": ..., "Diagnosis": 1}]
+    }
+
+A full patient record is a single find_one on _id instead of three queries
+(or a $lookup) against patients, medical_tests and diagnosis.
+
+migrate_to_embedded() builds patient_records from the three-collection
+layout in batches: one query per child collection per batch of patients,
+written with unordered ReplaceOne upserts, so it can be re-run safely.
+
+Usage:
+    python embedded_schema.py [--batch-size 1000]
+"""
+import argparse
+import time
+
+from pymongo import ASCENDING, ReplaceOne
+
+from stream_loader import EMBEDDED_COLLECTION, get_client
+
+
+def ensure_indexes(db):
+    """
+    Indexes for both layouts.
+
+    The three-collection layout needs patient_id on the child collections to
+    rebuild a record without a collection scan; the embedded layout is read
+    by _id and gets multikey indexes to find a patient from one of its tests
+    or by diagnosis.
+    """
+    db.medical_tests.create_index([("patient_id", ASCENDING)])
+    db.diagnosis.create_index([("patient_id", ASCENDING)])
+    records = db[EMBEDDED_COLLECTION]
+    records.create_index([("medical_tests._id", ASCENDING)])
+    records.create_index([("diagnosis.Diagnosis", ASCENDING)])
+
+
+def _strip_parent(document):
+    document = dict(document)
+    document.pop("patient_id", None)
+    return document
+
+
+def embed(patient, tests, diagnoses):
+    """One patient_records document"""
+    record = dict(patient)
+    record["medical_tests"] = [_strip_parent(t) for t in tests]
+    record["diagnosis"] = [_strip_parent(d) for d in diagnoses]
+    return record
+
+
+def migrate_to_embedded(db, batch_size=1000):
+    """
+    Copy patients, medical_tests and diagnosis into patient_records.
+
+    Returns:
+        int: Number of patient records written
+    """
+    ensure_indexes(db)
+    records = db[EMBEDDED_COLLECTION]
+    written = 0
+    last_id = None
+
+    while True:
+        # Keyset pagination over patients by _id
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        patients = list(db.patients.find(query).sort("_id", ASCENDING).limit(batch_size))
+        if not patients:
+            break
+        ids = [p["_id"] for p in patients]
+        tests, diagnoses = {}, {}
+        for doc in db.medical_tests.find({"patient_id": {"$in": ids}}):
+            tests.setdefault(doc["patient_id"], []).append(doc)
+        for doc in db.diagnosis.find({"patient_id": {"$in": ids}}):
+            diagnoses.setdefault(doc["patient_id"], []).append(doc)
+
+        records.bulk_write([
+            ReplaceOne({"_id": p["_id"]}, embed(p, tests.get(p["_id"], []), diagnoses.get(p["_id"], [])), upsert=True)
+            for p in patients
+        ], ordered=False)
+        written += len(patients)
+        last_id = ids[-1]
+    return written
+
+
+def get_patient_record(db, patient_id, layout="embedded"):
+    """
+    Full record for one patient.
+
+    layout: "embedded" (one find_one), "lookup" (one aggregate with $lookup)
+    or "normalized" (three queries).
+    """
+    if layout == "embedded":
+        return db[EMBEDDED_COLLECTION].find_one({"_id": patient_id})
+    if layout == "lookup":
+        results = list(db.patients.aggregate(lookup_pipeline({"_id": patient_id})))
+        return results[0] if results else None
+
+    patient = db.patients.find_one({"_id": patient_id})
+    if patient is None:
+        return None
+    return embed(
+        patient,
+        list(db.medical_tests.find({"patient_id": patient_id})),
+        list(db.diagnosis.find({"patient_id": patient_id})),
+    )
+
+
+def lookup_pipeline(match=None):
+    """Aggregation that rebuilds embedded records from the three collections"""
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        {"$lookup": {"from": "medical_tests", "localField": "_id", "foreignField": "patient_id", "as": "medical_tests"}},
+        {"$lookup": {"from": "diagnosis", "localField": "_id", "foreignField": "patient_id", "as": "diagnosis"}},
+        {"$project": {"medical_tests.patient_id": 0, "diagnosis.patient_id": 0}},
+    ]
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Patients per migration batch")
+    args = parser.parse_args()
+
+    db = get_client().liver_disease_db
+    start = time.perf_counter()
+    written = migrate_to_embedded(db, args.batch_size)
+    print(f"Wrote {written} documents to {EMBEDDED_COLLECTION} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV loader for the MongoDB collections.
+
+Reads the CSV in chunks and gives every patient an ObjectId on the client, so
+medical_tests and diagnosis documents carry their patient_id without reading
+the patients back. Each chunk becomes unordered insert_many batches that run
+concurrently on a thread pool; the number of batches in flight is capped, so
+memory stays bounded by chunk size no matter how large the file is.
+
+Usage:
+    python stream_loader.py [--csv indian_liver_patient.csv] [--chunk-size 10000] [--workers 4]
+    python stream_loader.py --mock        # in-memory mongomock instead of MONGO_URI
+    python stream_loader.py --layout embedded   # one patient_records document per patient
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+COLLECTIONS = ("patients", "medical_tests", "diagnosis")
+# One document per patient with embedded tests and diagnosis (see embedded_schema.py)
+EMBEDDED_COLLECTION = "patient_records"
+LAYOUTS = {
+    "normalized": COLLECTIONS,
+    "embedded": (EMBEDDED_COLLECTION,),
+    "both": COLLECTIONS + (EMBEDDED_COLLECTION,),
+}
+
+# Columns of each medical_tests document, after renaming
+MEDICAL_TEST_FIELDS = [
+    'Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase',
+    'Alamine_Aminotransferase', 'Aspartate_Aminotransferase', 'Total_Proteins',
+    'Albumin', 'Albumin_and_Globulin_Ratio'
+]
+
+
+def get_client(uri=None, mock=False):
+    """MongoClient for uri (default: MONGO_URI from .env), or a mongomock client"""
+    if mock or (uri or "").startswith("mongomock://"):
+        try:
+            import mongomock
+        except ImportError:
+            raise RuntimeError("mongomock is not installed; pip install mongomock or use a real MONGO_URI")
+        return mongomock.MongoClient()
+    load_dotenv()
+    return MongoClient(uri or os.getenv("MONGO_URI"))
+
+
+def column_mean(csv_file, column, chunk_size):
+    """Mean of one column, streamed, for imputing missing values"""
+    total, count = 0.0, 0
+    for chunk in pd.read_csv(csv_file, usecols=[column], chunksize=chunk_size):
+        values = chunk[column].dropna()
+        total += float(values.sum())
+        count += len(values)
+    return total / count if count else 0.0
+
+
+def iter_clean_chunks(csv_file, chunk_size):
+    """CSV chunks with the same cleaning as mongodata_upload.py, vectorized"""
+    ratio_fill = column_mean(csv_file, 'Albumin_and_Globulin_Ratio', chunk_size)
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size):
+        chunk = chunk.rename(columns={'Total_Protiens': 'Total_Proteins', 'Dataset': 'Diagnosis'})
+        chunk['Albumin_and_Globulin_Ratio'] = chunk['Albumin_and_Globulin_Ratio'].fillna(ratio_fill)
+        chunk['Gender'] = (chunk['Gender'] == 'Male').astype(int)
+        chunk['Diagnosis'] = (chunk['Diagnosis'] == 1).astype(int)
+        yield chunk
+
+
+def _records(columns, values):
+    # .tolist() turns NumPy scalars into Python values BSON can encode
+    values = [v.tolist() if hasattr(v, 'tolist') else v for v in values]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def build_documents(chunk, collections=COLLECTIONS):
+    """
+    Documents for one chunk, keyed by collection.
+
+    Every document gets a client-side ObjectId; child documents reference
+    their patient through patient_id.
+    """
+    documents = {}
+    n = len(chunk)
+    # All ids are assigned here, so both layouts of one run share them
+    patient_ids = [ObjectId() for _ in range(n)]
+    child_ids = {"medical_tests": [ObjectId() for _ in range(n)], "diagnosis": [ObjectId() for _ in range(n)]}
+    child_fields = {"medical_tests": MEDICAL_TEST_FIELDS, "diagnosis": ['Diagnosis']}
+
+    if "patients" in collections:
+        documents["patients"] = _records(
+            ["_id", "Age", "Gender"], [patient_ids, chunk['Age'], chunk['Gender']],
+        )
+    for name, fields in child_fields.items():
+        if name not in collections:
+            continue
+        documents[name] = _records(
+            ["patient_id", "_id"] + fields, [patient_ids, child_ids[name]] + [chunk[field] for field in fields],
+        )
+
+    if EMBEDDED_COLLECTION in collections:
+        tests, diagnoses = (
+            _records(["_id"] + fields, [child_ids[name]] + [chunk[field] for field in fields])
+            for name, fields in child_fields.items()
+        )
+        documents[EMBEDDED_COLLECTION] = [
+            {"_id": _id, "Age": age, "Gender": gender, "medical_tests": [test], "diagnosis": [diagnosis]}
+            for _id, age, gender, test, diagnosis
+            in zip(patient_ids, chunk['Age'].tolist(), chunk['Gender'].tolist(), tests, diagnoses)
+        ]
+    return documents
+
+
+def stream_load(db, csv_file, chunk_size=10000, batch_size=1000, workers=4, collections=COLLECTIONS):
+    """
+    Load the CSV into the given collections.
+
+    Args:
+        db: pymongo / mongomock database
+        csv_file (str): Path to the CSV file
+        chunk_size (int): CSV rows read at a time
+        batch_size (int): Documents per insert_many call
+        workers (int): Concurrent insert_many calls
+        collections (tuple): Collections to fill
+
+    Returns:
+        dict: Documents inserted per collection
+    """
+    if "patients" not in collections and set(collections) & {"medical_tests", "diagnosis"}:
+        # Their patient_id is the ObjectId given to the patient in the same run
+        raise ValueError("medical_tests and diagnosis can only be loaded together with patients")
+    inserted = {name: 0 for name in collections}
+    max_in_flight = workers * 2
+    pending = set()
+
+    def insert_batch(name, batch):
+        # Unordered: the server keeps going past individual failures and can parallelize
+        db[name].insert_many(batch, ordered=False)
+        return name, len(batch)
+
+    def collect(futures):
+        for future in futures:
+            name, count = future.result()
+            inserted[name] += count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in iter_clean_chunks(csv_file, chunk_size):
+            for name, docs in build_documents(chunk, collections).items():
+                for start in range(0, len(docs), batch_size):
+                    # Bound memory: wait for a batch to finish before queueing more
+                    while len(pending) >= max_in_flight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(pool.submit(insert_batch, name, docs[start:start + batch_size]))
+        done, _ = wait(pending)
+        collect(done)
+    return inserted
+
+
+def main(collections=COLLECTIONS):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="indian_liver_patient.csv", help="Path to the CSV file")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="CSV rows read at a time")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per insert_many")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent insert_many calls")
+    parser.add_argument("--mock", action="store_true", help="Use an in-memory mongomock database")
+    parser.add_argument("--layout", choices=LAYOUTS, help="Collections to fill (default: the script's own)")
+    args = parser.parse_args()
+    if args.layout:
+        collections = LAYOUTS[args.layout]
+
+    client = get_client(mock=args.mock)
+    db = client.liver_disease_db
+    start = time.perf_counter()
+    inserted = stream_load(db, args.csv, args.chunk_size, args.batch_size, args.workers, collections)
+    elapsed = time.perf_counter() - start
+    total = sum(inserted.values())
+    print(f"Inserted {inserted} in {elapsed:.2f}s ({total / elapsed:,.0f} docs/s)")
+    return inserted
+
+
+if __name__ == "__main__":
+    main()
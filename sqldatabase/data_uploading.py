@@ -1,69 +1,226 @@
 #!/usr/bin/env python3
-import pandas as pd
-from sqlalchemy import create_engine
+"""
+Bulk loader for the liver patient CSV into patients, medical_tests and diagnosis.
+
+The CSV is streamed in chunks. For every chunk, one transaction:
+  1. inserts the patients, then their tests and diagnoses, with multi-row
+     INSERTs that leave the IDs to AUTO_INCREMENT; each statement's IDs are
+     LAST_INSERT_ID() onwards (see insert_rows), so nothing is read back
+     and concurrent writers never collide with the loader,
+  2. writes the tests' feature_vectors rows (Prediction/feature_vectors.py),
+     which the API and batch_score.py score from,
+  3. advances a checkpoint row in load_checkpoints.
+
+A crash loses at most the chunk in flight; running the script again resumes
+after the last committed chunk. Throughput is reported per chunk and overall.
+
+Usage:
+    python data_uploading.py [--csv indian_liver_patient.csv] [--chunk-size 50000] [--restart]
+"""
+import argparse
+import os
+import sys
+import time
 
-# Step 1: Read the CSV file
-csv_file = "indian_liver_patient.csv"  # Path to your CSV file
-data = pd.read_csv(csv_file)
+import pandas as pd
+import pymysql
+
+# The Prediction module provides the feature vector definition, preprocessing
+# and the API's schema migrations
+PREDICTION_DIR = os.getenv(
+    "PREDICTION_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prediction"),
+)
+if PREDICTION_DIR not in sys.path:
+    sys.path.append(PREDICTION_DIR)
+from database_schema import ensure_schema  # noqa: E402
+from feature_vectors import FEATURE_COLUMNS, upsert_query  # noqa: E402
+from preprocessing import build_feature_matrix  # noqa: E402
+
+# Database credentials; override with environment variables
+DB_CONFIG = {
+    "host": os.getenv("DATABASE_HOST", "localhost"),
+    "user": os.getenv("DATABASE_USER", "Ashleen"),
+    "password": os.getenv("DATABASE_PASSWORD", "password"),
+    "database": os.getenv("DATABASE_NAME", "liver_disease_db"),
+}
 
-# Step 2: Clean and preprocess the data
 # Rename columns for consistency
-data.rename(columns={
+COLUMN_RENAMES = {
     'Total_Protiens': 'Total_Proteins',  # Fix column name
     'Dataset': 'Diagnosis'  # Rename 'Dataset' to 'Diagnosis'
-}, inplace=True)
-
-# Fill missing values in 'Albumin_and_Globulin_Ratio' with the mean
-data['Albumin_and_Globulin_Ratio'] = data['Albumin_and_Globulin_Ratio'].fillna(data['Albumin_and_Globulin_Ratio'].mean())
-
-# Convert 'Gender' to binary (1 for Male, 0 for Female)
-data['Gender'] = data['Gender'].apply(lambda x: 1 if x == 'Male' else 0)
-
-# Convert 'Diagnosis' to binary (1 for Liver disease, 0 for No disease)
-data['Diagnosis'] = data['Diagnosis'].apply(lambda x: 1 if x == 1 else 0)
-
-# Step 3: Connect to the MySQL database
-# Replace with your database credentials
-db_username = 'Ashleen'
-db_password = 'password'
-db_host = 'localhost'
-db_name = 'liver_disease_db'
-
-# Create a connection string
-connection_string = f"mysql+pymysql://{db_username}:{db_password}@{db_host}/{db_name}"
-
-# Create a SQLAlchemy engine
-engine = create_engine(connection_string)
-
-# Step 4: Insert data into the database
-# Insert into 'patients' table
-patients_data = data[['Age', 'Gender']].copy()
-patients_data.to_sql('patients', con=engine, if_exists='append', index=False)
-
-# Retrieve the auto-generated patient_ids
-query = "SELECT patient_id FROM patients"
-patient_ids = pd.read_sql(query, con=engine)
-
-# Add patient_ids to the original data
-data['patient_id'] = patient_ids['patient_id']
-
-# Insert into 'medical_tests' table
-medical_tests_data = data[[
-    'patient_id', 'Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase',
-    'Alamine_Aminotransferase', 'Aspartate_Aminotransferase', 'Total_Proteins',
-    'Albumin', 'Albumin_and_Globulin_Ratio'
-]].copy()
-medical_tests_data.to_sql('medical_tests', con=engine, if_exists='append', index=False)
-
-# Retrieve the auto-generated test_ids
-query = "SELECT test_id FROM medical_tests"
-test_ids = pd.read_sql(query, con=engine)
-
-# Add test_ids to the original data
-data['test_id'] = test_ids['test_id']
-
-# Insert into 'diagnosis' table
-diagnosis_data = data[['patient_id', 'Diagnosis']].copy()
-diagnosis_data.to_sql('diagnosis', con=engine, if_exists='append', index=False)
-
-print("Data inserted successfully!")
+}
+
+CREATE_CHECKPOINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS load_checkpoints (
+    source VARCHAR(255) PRIMARY KEY,
+    rows_loaded BIGINT NOT NULL,
+    chunks_loaded INT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+PATIENT_COLUMNS = ("age", "gender")
+MEDICAL_TEST_COLUMNS = (
+    "patient_id", "total_bilirubin", "direct_bilirubin", "alkaline_phosphotase",
+    "alamine_aminotransferase", "aspartate_aminotransferase", "total_proteins",
+    "albumin", "albumin_and_globulin_ratio",
+)
+DIAGNOSIS_COLUMNS = ("patient_id", "diagnosis")
+# Rows per INSERT statement, keeping each well under max_allowed_packet
+INSERT_BATCH_ROWS = 5000
+# Single-row upsert; executemany folds it into multi-row statements
+UPSERT_FEATURE_VECTORS = upsert_query(1)
+
+
+def source_key(csv_file):
+    """Checkpoint key: file name plus size, so a different export starts over"""
+    return f"{os.path.basename(csv_file)}:{os.path.getsize(csv_file)}"
+
+
+def column_mean(csv_file, column, chunk_size):
+    """Mean of one column, streamed, for imputing missing values"""
+    total, count = 0.0, 0
+    for chunk in pd.read_csv(csv_file, usecols=[column], chunksize=chunk_size):
+        values = chunk[column].dropna()
+        total += float(values.sum())
+        count += len(values)
+    return total / count if count else 0.0
+
+
+def clean_chunk(chunk, ratio_fill):
+    """Same cleaning as before, vectorized per chunk"""
+    chunk = chunk.rename(columns=COLUMN_RENAMES)
+    # Fill missing values in 'Albumin_and_Globulin_Ratio' with the mean of the whole file
+    chunk['Albumin_and_Globulin_Ratio'] = chunk['Albumin_and_Globulin_Ratio'].fillna(ratio_fill)
+    # Convert 'Gender' to binary (1 for Male, 0 for Female)
+    chunk['Gender'] = (chunk['Gender'] == 'Male').astype(int)
+    # Convert 'Diagnosis' to binary (1 for Liver disease, 0 for No disease)
+    chunk['Diagnosis'] = (chunk['Diagnosis'] == 1).astype(int)
+    return chunk
+
+
+def insert_rows(cursor, table, columns, rows, step):
+    """
+    Insert rows with one explicit multi-row INSERT per INSERT_BATCH_ROWS and
+    return their AUTO_INCREMENT IDs in order.
+
+    A multi-row INSERT without explicit IDs is a "simple insert": InnoDB
+    knows its row count up front and reserves all of its IDs at once, in
+    every innodb_autoinc_lock_mode, so they are LAST_INSERT_ID() onwards in
+    steps of auto_increment_increment even with other writers running. The
+    statements are built here rather than by executemany, which may split
+    its rewritten INSERT into several statements and report only the last.
+    """
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    ids = []
+    for start in range(0, len(rows), INSERT_BATCH_ROWS):
+        batch = rows[start:start + INSERT_BATCH_ROWS]
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([row_placeholder] * len(batch))
+        inserted = cursor.execute(query, [value for row in batch for value in row])
+        if inserted != len(batch):
+            raise RuntimeError(f"Inserted {inserted} of {len(batch)} rows into {table}")
+        ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(batch) * step, step))
+    return ids
+
+
+def insert_chunk(connection, chunk, source, rows_loaded, chunks_loaded):
+    """Insert one cleaned chunk into all three tables and feature_vectors and advance the checkpoint, atomically"""
+    n = len(chunk)
+    with connection.cursor() as cursor:
+        try:
+            connection.begin()
+            cursor.execute("SELECT @@SESSION.auto_increment_increment")
+            step = int(cursor.fetchone()[0])
+
+            # Plain Python values, so pymysql escapes them directly
+            patient_ids = insert_rows(cursor, "patients", PATIENT_COLUMNS, list(zip(
+                chunk['Age'].tolist(), chunk['Gender'].astype(str).tolist(),
+            )), step)
+            test_ids = insert_rows(cursor, "medical_tests", MEDICAL_TEST_COLUMNS, list(zip(
+                patient_ids,
+                chunk['Total_Bilirubin'].tolist(), chunk['Direct_Bilirubin'].tolist(),
+                chunk['Alkaline_Phosphotase'].tolist(), chunk['Alamine_Aminotransferase'].tolist(),
+                chunk['Aspartate_Aminotransferase'].tolist(), chunk['Total_Proteins'].tolist(),
+                chunk['Albumin'].tolist(), chunk['Albumin_and_Globulin_Ratio'].tolist(),
+            )), step)
+            insert_rows(cursor, "diagnosis", DIAGNOSIS_COLUMNS, list(zip(
+                patient_ids, chunk['Diagnosis'].tolist(),
+            )), step)
+            # Model input built from the chunk the way vector_rows builds it from the stored rows
+            X = build_feature_matrix(chunk, FEATURE_COLUMNS)
+            cursor.executemany(UPSERT_FEATURE_VECTORS, [
+                (test_id, patient_id, *values)
+                for test_id, patient_id, values in zip(test_ids, patient_ids, X.tolist())
+            ])
+
+            cursor.execute(
+                "INSERT INTO load_checkpoints (source, rows_loaded, chunks_loaded) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE rows_loaded = VALUES(rows_loaded), chunks_loaded = VALUES(chunks_loaded)",
+                (source, rows_loaded + n, chunks_loaded + 1),
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def load_checkpoint(connection, source, restart):
+    """(rows, chunks) already loaded from this source"""
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_CHECKPOINTS_TABLE)
+        if restart:
+            cursor.execute("DELETE FROM load_checkpoints WHERE source = %s", (source,))
+        cursor.execute("SELECT rows_loaded, chunks_loaded FROM load_checkpoints WHERE source = %s", (source,))
+        row = cursor.fetchone()
+    connection.commit()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+
+def upload(csv_file, chunk_size, restart=False):
+    # feature_vectors, for databases the API has not migrated yet
+    ensure_schema(DB_CONFIG)
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        source = source_key(csv_file)
+        rows_loaded, chunks_loaded = load_checkpoint(connection, source, restart)
+        if rows_loaded:
+            print(f"Resuming {source} after {rows_loaded} rows ({chunks_loaded} chunks)")
+
+        ratio_fill = column_mean(csv_file, 'Albumin_and_Globulin_Ratio', chunk_size)
+        # Skip data rows that are already loaded, keeping the header line; a
+        # callable, since pandas turns a list or range into a set of every row
+        # (bound to a copy: rows_loaded grows while the reader is still skipping)
+        loaded = rows_loaded
+        reader = pd.read_csv(csv_file, chunksize=chunk_size, skiprows=lambda line: 0 < line <= loaded)
+
+        started = time.perf_counter()
+        new_rows = 0
+        for chunk in reader:
+            chunk_start = time.perf_counter()
+            insert_chunk(connection, clean_chunk(chunk, ratio_fill), source, rows_loaded, chunks_loaded)
+            rows_loaded += len(chunk)
+            chunks_loaded += 1
+            new_rows += len(chunk)
+            elapsed = time.perf_counter() - chunk_start
+            print(f"Chunk {chunks_loaded}: {len(chunk)} rows in {elapsed:.2f}s "
+                  f"({len(chunk) / elapsed:,.0f} rows/s), {rows_loaded} total")
+
+        total = time.perf_counter() - started
+        rate = new_rows / total if total > 0 else 0.0
+        print(f"Data inserted successfully! {new_rows} rows in {total:.2f}s ({rate:,.0f} rows/s)")
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="indian_liver_patient.csv", help="Path to the CSV file")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="CSV rows per transaction")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load the whole file again")
+    args = parser.parse_args()
+    upload(args.csv, args.chunk_size, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Columnar snapshot of patients, medical_tests and diagnosis as Parquet files.
+
+Every table is written to its own directory, partitioned by the date of the
+export run (Hive-style, so pyarrow and pandas see load_date as a column):
+
+    parquet/
+        medical_tests/
+            load_date=2024-05-01/part-0000000001-0000100000.parquet
+            load_date=2024-05-02/part-0000100001-0000100417.parquet
+
+Rows are streamed from MySQL through a server-side cursor in primary key
+order and written with explicit column types and zstd compression. Exports
+are incremental: the part file names record the primary key range they
+hold, so a run only selects rows with a key above the highest one already
+exported. Each part is written to a temporary file and renamed into place,
+so an interrupted run leaves no partial file and the next run picks up
+after the last complete part. Only new rows are appended; changes to rows
+that were already exported need a fresh snapshot in an empty directory.
+
+Usage:
+    python export_parquet.py [--output parquet] [--tables patients medical_tests diagnosis]
+"""
+import argparse
+import datetime
+import os
+import re
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pymysql
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "parquet")
+
+# Database credentials; override with environment variables
+DB_CONFIG = {
+    "host": os.getenv("DATABASE_HOST", "localhost"),
+    "user": os.getenv("DATABASE_USER", "Ashleen"),
+    "password": os.getenv("DATABASE_PASSWORD", "password"),
+    "database": os.getenv("DATABASE_NAME", "liver_disease_db"),
+}
+
+# Primary key and Arrow schema of each exported table
+TABLES = {
+    "patients": ("patient_id", pa.schema([
+        ("patient_id", pa.int32()),
+        ("age", pa.int16()),
+        ("gender", pa.string()),
+    ])),
+    "medical_tests": ("test_id", pa.schema([
+        ("test_id", pa.int32()),
+        ("patient_id", pa.int32()),
+        ("total_bilirubin", pa.float32()),
+        ("direct_bilirubin", pa.float32()),
+        ("alkaline_phosphotase", pa.int32()),
+        ("alamine_aminotransferase", pa.int32()),
+        ("aspartate_aminotransferase", pa.int32()),
+        ("total_proteins", pa.float32()),
+        ("albumin", pa.float32()),
+        ("albumin_and_globulin_ratio", pa.float32()),
+    ])),
+    "diagnosis": ("diagnosis_id", pa.schema([
+        ("diagnosis_id", pa.int32()),
+        ("patient_id", pa.int32()),
+        ("diagnosis", pa.int8()),
+    ])),
+}
+
+_PART_FILE = re.compile(r"^part-(\d+)-(\d+)\.parquet$")
+
+
+def exported_key(root, table):
+    """Highest primary key already exported for a table (0 if none)"""
+    highest = 0
+    for _, _, filenames in os.walk(os.path.join(root, table)):
+        for filename in filenames:
+            match = _PART_FILE.match(filename)
+            if match:
+                highest = max(highest, int(match.group(2)))
+    return highest
+
+
+def write_part(root, table, data, load_date, compression="zstd"):
+    """
+    Write one Arrow table of rows as a part file of the load_date partition.
+
+    Args:
+        root (str): Snapshot directory
+        table (str): Table name, a key of TABLES
+        data (pyarrow.Table): Rows in primary key order, with the table's schema
+        load_date (str): Partition value, YYYY-MM-DD
+        compression (str): Parquet codec
+
+    Returns:
+        str: Path of the part file
+    """
+    key = TABLES[table][0]
+    keys = data.column(key)
+    first, last = keys[0].as_py(), keys[-1].as_py()
+    directory = os.path.join(root, table, f"load_date={load_date}")
+    os.makedirs(directory, exist_ok=True)
+    filename = f"part-{first:010d}-{last:010d}.parquet"
+    path = os.path.join(directory, filename)
+    # Dot-prefixed, so dataset readers skip a leftover from an interrupted run
+    tmp_path = os.path.join(directory, f".{filename}.tmp")
+    pq.write_table(data, tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_table(connection, root, table, batch_size, load_date, compression="zstd"):
+    """
+    Append the rows of a table that are not in the snapshot yet.
+
+    Returns:
+        int: Rows exported
+    """
+    key, schema = TABLES[table]
+    after = exported_key(root, table)
+    rows = 0
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(schema.names)} FROM {table} WHERE {key} > %s ORDER BY {key}", (after,)
+        )
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            columns = list(zip(*batch))
+            data = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+            write_part(root, table, data, load_date, compression)
+            rows += len(batch)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Snapshot directory")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), default=list(TABLES))
+    parser.add_argument("--batch-size", type=int, default=100000, help="Rows per part file")
+    parser.add_argument("--load-date", default=datetime.date.today().isoformat(), help="Partition to append to")
+    parser.add_argument("--compression", default="zstd", help="Parquet codec (zstd, snappy, gzip, none)")
+    args = parser.parse_args()
+
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        for table in args.tables:
+            start = time.perf_counter()
+            after = exported_key(args.output, table)
+            rows = export_table(connection, args.output, table, args.batch_size, args.load_date, args.compression)
+            elapsed = time.perf_counter() - start
+            print(f"{table}: {rows} rows after key {after} exported in {elapsed:.2f}s")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()